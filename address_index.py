@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Address Index for LAAA BOV Builds
+=================================
+Normalizes street addresses to a structured key (street number, directional,
+street name, suffix, zip) and hashes the geocoded coordinates under it, so a
+comp's coordinates are a dictionary lookup instead of a scan of every known
+address. Exact keys also end the prefix collisions of substring matching
+("121 S Oxford" can no longer match "1121 S Oxford Ave").
+
+Lookups fall back from the most to the least specific key: with zip, without
+zip, without the directional, then without the street suffix (comp sheets
+often drop the "N"/"S" or the "Ave"/"St"). A looser key only matches when one
+side simply omits the field; a different zip, directional or suffix is never
+a match. When two addresses share a looser key, the
+first one added wins.
+
+Usage:
+    This module is imported by build_bov.py. It is NOT run directly.
+
+    index = AddressIndex(ADDRESSES)           # {"101 S Kenmore Ave, Los Angeles, CA 90004": (lat, lng)}
+    index.lookup("101 South Kenmore Avenue")  # -> (34.0728, -118.2936)
+"""
+
+import re
+from typing import NamedTuple, Optional
+
+
+# ============================================================
+# NORMALIZATION
+# ============================================================
+
+DIRECTIONALS = {
+    "N": "N", "NORTH": "N", "S": "S", "SOUTH": "S", "E": "E", "EAST": "E", "W": "W", "WEST": "W",
+    "NE": "NE", "NORTHEAST": "NE", "NW": "NW", "NORTHWEST": "NW",
+    "SE": "SE", "SOUTHEAST": "SE", "SW": "SW", "SOUTHWEST": "SW",
+}
+
+# USPS standard suffix abbreviations (the common ones on LA comp sheets)
+SUFFIXES = {
+    "AVENUE": "AVE", "AVE": "AVE", "AV": "AVE",
+    "STREET": "ST", "ST": "ST",
+    "BOULEVARD": "BLVD", "BLVD": "BLVD",
+    "PLACE": "PL", "PL": "PL",
+    "DRIVE": "DR", "DR": "DR",
+    "ROAD": "RD", "RD": "RD",
+    "LANE": "LN", "LN": "LN",
+    "COURT": "CT", "CT": "CT",
+    "TERRACE": "TER", "TER": "TER",
+    "CIRCLE": "CIR", "CIR": "CIR",
+    "PARKWAY": "PKWY", "PKWY": "PKWY",
+    "HIGHWAY": "HWY", "HWY": "HWY",
+    "WAY": "WAY",
+}
+
+# Words inside street names with a standard short form ("Saint Andrews" == "St Andrews")
+NAME_WORDS = {"SAINT": "ST", "MOUNT": "MT", "FORT": "FT"}
+
+UNIT_DESIGNATORS = {"APT", "UNIT", "STE", "SUITE", "#", "NO"}
+
+_ZIP_RE = re.compile(r"\b(\d{5})(?:-\d{4})?\s*$")
+_TOKEN_RE = re.compile(r"[A-Z0-9#]+")
+
+
+class AddressKey(NamedTuple):
+    number: str
+    directional: str
+    name: str
+    suffix: str
+    zip: str
+
+
+def normalize_address(address: str) -> AddressKey:
+    """Structured key for a one-line address ("101 S Kenmore Ave, Los Angeles, CA 90004")."""
+    text = address.upper().strip()
+    zip_match = _ZIP_RE.search(text)
+    zip_code = zip_match.group(1) if zip_match else ""
+    tokens = _TOKEN_RE.findall(text.split(",")[0].replace(".", ""))
+    for i, token in enumerate(tokens):
+        if token in UNIT_DESIGNATORS or token.startswith("#"):
+            tokens = tokens[:i]
+            break
+
+    number = tokens.pop(0) if tokens and tokens[0][0].isdigit() else ""
+    directional = DIRECTIONALS[tokens.pop(0)] if len(tokens) > 1 and tokens[0] in DIRECTIONALS else ""
+    if not directional and len(tokens) > 2 and tokens[-1] in DIRECTIONALS:   # trailing: "123 Main St W"
+        directional = DIRECTIONALS[tokens.pop()]
+    suffix = SUFFIXES[tokens.pop()] if len(tokens) > 1 and tokens[-1] in SUFFIXES else ""
+    name = " ".join(NAME_WORDS.get(t, t) for t in tokens)
+    return AddressKey(number, directional, name, suffix, zip_code)
+
+
+# ============================================================
+# INDEX
+# ============================================================
+
+def _compatible(query: AddressKey, found: AddressKey) -> bool:
+    return all(not a or not b or a == b for a, b in ((query.zip, found.zip), (query.directional, found.directional),
+                                                     (query.suffix, found.suffix)))
+
+
+class AddressIndex:
+    """Hash index from normalized address keys to values (coordinates)."""
+
+    def __init__(self, addresses: Optional[dict] = None):
+        self._exact = {}
+        self._street = {}
+        self._loose = {}
+        self._bare = {}
+        for address, value in (addresses or {}).items():
+            self.add(address, value)
+
+    def add(self, address: str, value):
+        key = normalize_address(address)
+        self._exact[key] = value
+        self._street.setdefault(key._replace(zip=""), (key, value))
+        self._loose.setdefault(key._replace(zip="", directional=""), (key, value))
+        self._bare.setdefault(key._replace(zip="", directional="", suffix=""), (key, value))
+
+    def lookup(self, address: str, default=None):
+        """Value for the best-matching indexed address, or default."""
+        key = normalize_address(address)
+        if key in self._exact:
+            return self._exact[key]
+        # Looser keys only match where one side leaves the field blank, never on a conflict
+        for table, k in ((self._street, key._replace(zip="")), (self._loose, key._replace(zip="", directional="")),
+                         (self._bare, key._replace(zip="", directional="", suffix=""))):
+            found, value = table.get(k, (None, None))
+            if found is not None and _compatible(key, found):
+                return value
+        return default
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def __contains__(self, address: str) -> bool:
+        return self.lookup(address) is not None
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Loan Amortization for LAAA BOV Builds
+=====================================
+Closed-form amortization for fully amortizing, monthly-pay loans: payment,
+remaining balance, principal paydown and balloon at any month, without
+stepping through the schedule month by month.
+
+Every function takes plain floats or NumPy arrays (loan amounts, rates, terms
+and months broadcast together), so the same code serves calc_metrics() for one
+price and pricing_engine.py across large grids.
+
+With G(k) = (1 + r)^k and n = amortization months, the balance after k
+payments is  B(k) = L * (G(n) - G(k)) / (G(n) - 1),  or L * (1 - k/n) at r = 0.
+
+Usage:
+    This module is imported by build_bov.py and pricing_engine.py. It is NOT run directly.
+    numpy is only needed when arrays are passed in.
+"""
+
+
+# ============================================================
+# HELPERS
+# ============================================================
+
+def _is_array(*values) -> bool:
+    return any(hasattr(v, "__array__") or isinstance(v, (list, tuple)) for v in values)
+
+
+def _where(cond, a, b):
+    """np.where for arrays, a plain conditional for scalars."""
+    if _is_array(cond, a, b):
+        import numpy as np
+        return np.where(cond, a, b)
+    return a if cond else b
+
+
+def _prepare(*values):
+    """Coerce list/tuple inputs to float arrays so the arithmetic broadcasts."""
+    if _is_array(*values):
+        import numpy as np
+        return tuple(np.asarray(v, dtype=float) for v in values)
+    return values
+
+
+# ============================================================
+# CLOSED FORMS
+# ============================================================
+
+def payment_factor(annual_rate, amort_years):
+    """Monthly payment per dollar of loan."""
+    annual_rate, amort_years = _prepare(annual_rate, amort_years)
+    r = annual_rate / 12
+    n = amort_years * 12
+    growth = (1 + r) ** n
+    return _where(r > 0, r * growth / (growth - 1 + (r <= 0)), 1 / n)
+
+
+def loan_constant(annual_rate, amort_years):
+    """Annual debt service per dollar of loan."""
+    return payment_factor(annual_rate, amort_years) * 12
+
+
+def monthly_payment(loan_amount, annual_rate, amort_years):
+    return loan_amount * payment_factor(annual_rate, amort_years)
+
+
+def remaining_balance(loan_amount, annual_rate, amort_years, month):
+    """Balance outstanding after `month` payments (0 once the loan is fully amortized)."""
+    loan_amount, annual_rate, amort_years, month = _prepare(loan_amount, annual_rate, amort_years, month)
+    r = annual_rate / 12
+    n = amort_years * 12
+    k = _where(month < n, month, n)
+    growth_n = (1 + r) ** n
+    fraction = _where(r > 0, (growth_n - (1 + r) ** k) / (growth_n - 1 + (r <= 0)), 1 - k / n)
+    return loan_amount * fraction
+
+
+def principal_paid(loan_amount, annual_rate, amort_years, month):
+    """Cumulative principal repaid over the first `month` payments."""
+    return loan_amount - remaining_balance(loan_amount, annual_rate, amort_years, month)
+
+
+def interest_paid(loan_amount, annual_rate, amort_years, month):
+    """Cumulative interest paid over the first `month` payments."""
+    loan_amount, annual_rate, amort_years, month = _prepare(loan_amount, annual_rate, amort_years, month)
+    n = amort_years * 12
+    k = _where(month < n, month, n)
+    return monthly_payment(loan_amount, annual_rate, amort_years) * k - principal_paid(loan_amount, annual_rate, amort_years, k)
+
+
+def principal_reduction(loan_amount, annual_rate, amort_years, year=1):
+    """Principal repaid during loan year `year` (1-based)."""
+    year = _prepare(year)[0]
+    return (remaining_balance(loan_amount, annual_rate, amort_years, (year - 1) * 12)
+            - remaining_balance(loan_amount, annual_rate, amort_years, year * 12))
+
+
+def balloon(loan_amount, annual_rate, amort_years, term_years):
+    """Balance due at maturity of a loan that amortizes over amort_years but is due in term_years."""
+    return remaining_balance(loan_amount, annual_rate, amort_years, _prepare(term_years)[0] * 12)
+
+
+# ============================================================
+# SCHEDULE
+# ============================================================
+
+def schedule(loan_amount: float, annual_rate: float, amort_years: int, years=None, annual=True) -> list[dict]:
+    """
+    Amortization schedule rows for one loan:
+    {"period", "payment", "interest", "principal", "balance"} per year (or per month with annual=False).
+    years limits the schedule (e.g. to the loan term); defaults to the full amortization.
+    """
+    years = amort_years if years is None else min(years, amort_years)
+    step = 12 if annual else 1
+    pmt = monthly_payment(loan_amount, annual_rate, amort_years) * step
+    rows = []
+    prev_balance = loan_amount
+    for period in range(1, years * 12 // step + 1):
+        balance = remaining_balance(loan_amount, annual_rate, amort_years, period * step)
+        principal = prev_balance - balance
+        rows.append({"period": period, "payment": pmt, "interest": pmt - principal,
+                     "principal": principal, "balance": balance})
+        prev_balance = balance
+    return rows
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Assumption Model for LAAA BOV Builds
+====================================
+A small dependency graph for the figures a BOV derives from its inputs. Every
+input (LIST_PRICE, TAX_RATE, the rent roll, ...) and every derived figure or
+HTML fragment is a named node; derived nodes declare the nodes they read and
+are computed lazily, once, on first access.
+
+Changing an input with set() drops the cached value of exactly the nodes that
+depend on it, directly or transitively, so the next access recomputes only
+those. Across builds, persisted nodes are stored on disk under a fingerprint
+of their own source code and their dependencies' fingerprints (inputs are
+fingerprinted by value). A rebuild after a broker changes one number reuses
+every node that does not depend on it without evaluating it at all.
+
+A node function must read its inputs only through its declared dependencies.
+Code a node calls outside its own body (calculation helpers, formatters, the
+engine modules) is tracked by passing it as `code`: its source is hashed into
+every node's fingerprint, so editing any of it recomputes the whole model
+instead of serving figures from the old code.
+
+Usage:
+    This module is imported by build_bov.py. It is NOT run directly.
+
+    model = AssumptionModel(store_path, code=(calc_metrics, fc, "pricing_engine"))
+    model.inputs(price=1_275_000, tax_rate=0.0117)
+
+    @model.node("price", "tax_rate")
+    def taxes(price, tax_rate):
+        return price * tax_rate
+
+    model["taxes"]                  # computed (or loaded from the store)
+    model.set("tax_rate", 0.012)    # -> {"taxes"} invalidated
+    model.save()
+"""
+
+import os
+import json
+import hashlib
+import inspect
+import importlib.util
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+
+@dataclass
+class _Node:
+    fn: Callable
+    deps: tuple
+    persist: bool
+    source_hash: str
+
+
+def _value_hash(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=repr).encode()).hexdigest()
+
+
+def code_fingerprint(code: Iterable) -> str:
+    """
+    Hash of the source of functions, modules, or module names (read from their
+    file by import spec, so modules that failed to import are still tracked).
+    """
+    sources = []
+    for obj in code:
+        if isinstance(obj, str):
+            spec = importlib.util.find_spec(obj)
+            if spec is None or not spec.origin or not os.path.isfile(spec.origin):
+                raise ValueError(f"Cannot locate source of module {obj}")
+            with open(spec.origin, "rb") as f:
+                sources.append(hashlib.sha256(f.read()).hexdigest())
+        else:
+            sources.append(hashlib.sha256(inspect.getsource(obj).encode()).hexdigest())
+    return _value_hash(sources)
+
+
+class AssumptionModel:
+    """Inputs plus lazily computed, dependency-tracked derived nodes."""
+
+    def __init__(self, store_path: Optional[str] = None, version: str = "", code: Iterable = ()):
+        self.store_path = store_path
+        self.version = f"{version}:{code_fingerprint(code)}"
+        self._inputs = {}
+        self._nodes = {}
+        self._dependents = {}
+        self._values = {}
+        self._fingerprints = {}
+        self._store = self._load()
+        self._dirty = False
+        self.computed = []
+        self.reused = []
+
+    # ---- inputs ----
+
+    def inputs(self, **values) -> set:
+        """Set several inputs; returns every derived node invalidated."""
+        stale = set()
+        for name, value in values.items():
+            stale |= self.set(name, value)
+        return stale
+
+    def set(self, name: str, value) -> set:
+        """Set one input; returns the derived nodes invalidated (none if the value is unchanged)."""
+        if name in self._nodes:
+            raise ValueError(f"{name} is a derived node, not an input")
+        if name in self._inputs and _value_hash(self._inputs[name]) == _value_hash(value):
+            return set()
+        self._inputs[name] = value
+        stale = self.dependents(name)
+        for n in stale | {name}:
+            self._values.pop(n, None)
+            self._fingerprints.pop(n, None)
+        return stale
+
+    # ---- derived nodes ----
+
+    def node(self, *deps: str, persist: bool = True):
+        """
+        Decorator registering fn as the derived node fn.__name__, computed as
+        fn(*[model[d] for d in deps]). Persisted nodes must return JSON-compatible
+        values (they are normalized through JSON, so tuples come back as lists).
+        """
+        def register(fn):
+            name = fn.__name__
+            if name in self._inputs or name in self._nodes:
+                raise ValueError(f"Model node {name} is already defined")
+            try:
+                source = inspect.getsource(fn)
+            except (OSError, TypeError):
+                source = fn.__code__.co_code.hex()
+            self._nodes[name] = _Node(fn, deps, persist, hashlib.sha256(source.encode()).hexdigest())
+            for dep in deps:
+                self._dependents.setdefault(dep, set()).add(name)
+            return fn
+        return register
+
+    def dependents(self, name: str) -> set:
+        """Every node that reads name, directly or transitively."""
+        seen = set()
+        frontier = [name]
+        while frontier:
+            for child in self._dependents.get(frontier.pop(), ()):
+                if child not in seen:
+                    seen.add(child)
+                    frontier.append(child)
+        return seen
+
+    def fingerprint(self, name: str) -> str:
+        """Identity of a node's value: input values, or node source plus dependency fingerprints."""
+        if name not in self._fingerprints:
+            if name in self._inputs:
+                fp = _value_hash(self._inputs[name])
+            elif name in self._nodes:
+                node = self._nodes[name]
+                fp = _value_hash([self.version, name, node.source_hash, [self.fingerprint(d) for d in node.deps]])
+            else:
+                raise KeyError(f"Unknown model input or node: {name}")
+            self._fingerprints[name] = fp
+        return self._fingerprints[name]
+
+    def __getitem__(self, name: str):
+        if name in self._inputs:
+            return self._inputs[name]
+        if name in self._values:
+            return self._values[name]
+        if name not in self._nodes:
+            raise KeyError(f"Unknown model input or node: {name}")
+        node = self._nodes[name]
+        key = self.fingerprint(name)
+        stored = self._store.get(name)
+        if node.persist and stored is not None and stored.get("key") == key:
+            value = stored["value"]
+            self.reused.append(name)
+        else:
+            value = node.fn(*(self[d] for d in node.deps))
+            self.computed.append(name)
+            if node.persist:
+                value = json.loads(json.dumps(value))
+                self._store[name] = {"key": key, "value": value}
+                self._dirty = True
+        self._values[name] = value
+        return value
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._inputs or name in self._nodes
+
+    # ---- persistence ----
+
+    def _load(self) -> dict:
+        if not self.store_path:
+            return {}
+        try:
+            with open(self.store_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        """Write persisted node values (only those still defined) back to the store."""
+        if not self.store_path or not self._dirty:
+            return
+        store = {k: v for k, v in self._store.items() if k in self._nodes and self._nodes[k].persist}
+        os.makedirs(os.path.dirname(self.store_path) or ".", exist_ok=True)
+        tmp = f"{self.store_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(store, f)
+        os.replace(tmp, self.store_path)
+        self._dirty = False
@@ -3,7 +3,28 @@
 Build script for 500 N Alexandria Ave BOV — Los Angeles, CA 90004
 Generates a single index.html file for the BOV web presentation.
 """
-import base64, json, os, sys, time, urllib.request, urllib.parse, io, statistics, math
+import base64, json, os, re, shutil, sys, time, urllib.request, urllib.parse, io, statistics, math
+from image_pipeline import (
+    ImageCache, ImageSlot, optimized_data_uri, placeholder_data_uri, data_uri_payload_bytes,
+    dedupe_inline_images, externalize_inline_images,
+)
+import amortization
+from geocode_store import GeocodeStore, StaticProvider, NominatimProvider, ChainProvider
+from comp_store import CompStore
+from spatial_index import SpatialIndex
+from assumption_model import AssumptionModel
+from rent_roll import RentRoll
+from comp_maps import MAP_CSS, MAP_JS, cluster_assets, map_data_html, map_layer
+from pricing_calculator import CALCULATOR_JS, calculator_payload, parity_check
+from static_maps import TileCache, TileFetcher, MapRenderCache, StaticMapSession, open_tile_source
+try:
+    from pricing_engine import Assumptions, price_metrics, metrics_rows, sensitivity, goal_seek
+    from dcf import DCFAssumptions, hold_period_dcf
+    from simulation import DealInputs, MarketAssumptions, run_simulation
+    from debt_products import DebtProduct, compare_products
+    HAVE_NUMPY = True
+except ImportError:
+    HAVE_NUMPY = False
 
 if sys.platform == "win32":
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
@@ -12,9 +33,50 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 IMAGES_DIR = os.path.join(SCRIPT_DIR, "images")
 OUTPUT = os.path.join(SCRIPT_DIR, "index.html")
 BOV_BASE_URL = "https://500nalexandria.laaa.com"
+
+# Asset output mode:
+#   "inline"   - one self-contained index.html with every image as a data: URI (default)
+#   "external" - images written to assets/<content-hash>.<ext> and referenced by URL;
+#                a self-contained print.html is still written for the PDF worker
+# Run with --external-assets to switch modes.
+ASSET_MODE = "external" if "--external-assets" in sys.argv else "inline"
+ASSETS_DIR = os.path.join(SCRIPT_DIR, "assets")
+ASSET_BASE_URL = "assets/"   # or a shared CDN prefix, e.g. "https://cdn.laaa.com/bov-assets/"
+PRINT_OUTPUT = os.path.join(SCRIPT_DIR, "print.html")
+
 PDF_WORKER_URL = "https://laaa-pdf-worker.laaa-team.workers.dev"
 PDF_FILENAME = "BOV - 500 N Alexandria Ave, Los Angeles.pdf"
-PDF_LINK = PDF_WORKER_URL + "/?url=" + urllib.parse.quote(BOV_BASE_URL + "/", safe="") + "&filename=" + urllib.parse.quote(PDF_FILENAME, safe="")
+PDF_PAGE_URL = BOV_BASE_URL + "/" + (os.path.basename(PRINT_OUTPUT) if ASSET_MODE == "external" else "")
+PDF_LINK = PDF_WORKER_URL + "/?url=" + urllib.parse.quote(PDF_PAGE_URL, safe="") + "&filename=" + urllib.parse.quote(PDF_FILENAME, safe="")
+
+# Comp exports (CoStar-style CSV, imported into CACHE_DIR/comps.sqlite): (path, "sale" | "listing" | "rent")
+COMPS_DIR = os.path.join(SCRIPT_DIR, "comps")
+COMP_EXPORTS = [
+    (os.path.join(COMPS_DIR, "sale_comps.csv"), "sale"),
+    (os.path.join(COMPS_DIR, "listings.csv"), "listing"),
+    (os.path.join(COMPS_DIR, "rent_comps.csv"), "rent"),
+]
+
+# Shared build cache (encoded images, etc.), reused across every BOV site on this machine
+CACHE_DIR = os.environ.get("LAAA_BOV_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "laaa-bov")
+IMAGE_CACHE_MAX_MB = 512
+OPTIMIZE_IMAGES = True   # resize/recompress images to their display size (requires Pillow)
+TILE_CACHE_TTL_DAYS = 30
+TILE_CACHE_MAX_MB = 200
+# Offline: render static maps from cached tiles only (--offline or LAAA_BOV_OFFLINE=1)
+STATIC_MAP_OFFLINE = "--offline" in sys.argv or os.environ.get("LAAA_BOV_OFFLINE") == "1"
+# Geocoder for comp addresses not yet in CACHE_DIR/geocode.sqlite: "nominatim" (default) or
+# "none" (store, seed and pinned coordinates only; also implied by --offline). Override with LAAA_BOV_GEOCODER.
+GEOCODER = os.environ.get("LAAA_BOV_GEOCODER") or "nominatim"
+# Static map tile source: "osm" (default), an XYZ URL template, a .mbtiles file or a z/x/y
+# tile directory. Local sources need no network. Override with LAAA_BOV_TILE_SOURCE.
+STATIC_MAP_TILE_SOURCE = os.environ.get("LAAA_BOV_TILE_SOURCE") or "osm"
+
+# Monte Carlo downside analysis (requires numpy). Skip with --no-simulation.
+ENABLE_SIMULATION = "--no-simulation" not in sys.argv
+SIMULATION_PATHS = 20_000
+SIMULATION_SEED = 500          # fixed so rebuilds print the same bands
+SIMULATION_WORKERS = None      # None = one process per CPU
 
 # ============================================================
 # RAG CHATBOT CONFIG
@@ -33,37 +95,128 @@ STARTER_QUESTIONS = [
 # ============================================================
 # IMAGE LOADING
 # ============================================================
-def load_image_b64(filename):
+IMAGE_CACHE = ImageCache(os.path.join(CACHE_DIR, "images"), max_bytes=IMAGE_CACHE_MAX_MB * 1024 * 1024)
+
+# Display slots, sized at 2x the largest CSS box each image is rendered in
+IMAGE_SLOTS = {
+    "logo": ImageSlot(640, 640, quality=None),            # .cover-logo 320px wide
+    "headshot": ImageSlot(200, 200, fit="cover"),         # .bio-headshot 100px circle
+    "photo": ImageSlot(1600, 1000, quality=82),           # full-bleed cover hero
+    "map": ImageSlot(1600, 900, quality=85),              # print maps, keep labels legible
+}
+
+if OPTIMIZE_IMAGES:
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        print("WARNING: Pillow not installed. Images will be inlined at full size. Install with: pip install Pillow")
+        OPTIMIZE_IMAGES = False
+
+image_bytes_original = image_bytes_inlined = 0
+
+def load_image_b64(filename, slot=None):
+    global image_bytes_original, image_bytes_inlined
     path = os.path.join(IMAGES_DIR, filename)
     if not os.path.exists(path):
         print(f"WARNING: Image not found: {path}")
         return ""
-    ext = filename.rsplit(".", 1)[-1].lower()
-    mime = {"png": "image/png", "jpg": "image/jpeg", "jpeg": "image/jpeg"}.get(ext, "image/png")
-    with open(path, "rb") as f:
-        data = base64.b64encode(f.read()).decode("ascii")
-    print(f"  Loaded image: {filename} ({len(data)//1024}KB b64)")
-    return f"data:{mime};base64,{data}"
+    hits = IMAGE_CACHE.hits
+    data_uri = None
+    if slot and OPTIMIZE_IMAGES:
+        target = IMAGE_SLOTS[slot]
+        try:
+            data_uri = IMAGE_CACHE.fetch(path, target.variant, lambda raw: optimized_data_uri(raw, target)).decode("ascii")
+        except Exception as e:
+            print(f"WARNING: Could not optimize {filename} ({e}); inlining original")
+    if data_uri is None:
+        ext = filename.rsplit(".", 1)[-1].lower()
+        mime = {"png": "image/png", "jpg": "image/jpeg", "jpeg": "image/jpeg"}.get(ext, "image/png")
+        def encode(raw):
+            return f"data:{mime};base64,{base64.b64encode(raw).decode('ascii')}".encode("ascii")
+        data_uri = IMAGE_CACHE.fetch(path, "datauri", encode).decode("ascii")
+    src = "cached" if IMAGE_CACHE.hits > hits else "encoded"
+    orig_bytes = os.path.getsize(path)
+    new_bytes = data_uri_payload_bytes(data_uri)
+    image_bytes_original += orig_bytes
+    image_bytes_inlined += new_bytes
+    if new_bytes < orig_bytes:
+        fmt = data_uri[5:data_uri.index(";")].split("/")[-1]
+        print(f"  Loaded image: {filename} ({orig_bytes//1024}KB -> {new_bytes//1024}KB {fmt}, saved {(orig_bytes - new_bytes)//1024}KB, {src})")
+    else:
+        print(f"  Loaded image: {filename} ({len(data_uri)//1024}KB b64, {src})")
+    return data_uri
+
+IMG_FILES = {
+    "logo": ("LAAA_Team_White.png", "logo"),
+    "glen": ("Glen_Scher.png", "headshot"),
+    "filip": ("Filip_Niculete.png", "headshot"),
+    "hero": ("Street_View_Front.png", "photo"),
+    "aerial": ("Aerial_View.png", "photo"),
+    "loc_map": ("Location_Map_Google.png", "map"),
+    "closings_map": ("closings-map.png", "map"),
+    "team_aida": ("Aida_Memary_Scher.png", "headshot"),
+    "team_logan": ("Logan_Ward.png", "headshot"),
+    "team_morgan": ("Morgan_Wetmore.png", "headshot"),
+    "team_luka": ("Luka_Leader.png", "headshot"),
+    "team_jason": ("Jason_Mandel.png", "headshot"),
+    "team_alexandro": ("Alexandro_Tapia.png", "headshot"),
+    "team_blake": ("Blake_Lewitt.png", "headshot"),
+    "team_mike": ("Mike_Palade.png", "headshot"),
+    "team_tony": ("Tony_Dang.png", "headshot"),
+}
+# Multi-resolution srcset variants. Only emitted in external asset mode; inline
+# mode would embed every size in index.html.
+SRCSET_WIDTHS = {"photo": [480, 960], "map": [640, 1200]}
+# Tiny blurred placeholders painted behind the large photos while they load
+PLACEHOLDER_KEYS = ["hero", "aerial"]
 
 print("Loading images...")
-IMG = {
-    "logo": load_image_b64("LAAA_Team_White.png"),
-    "glen": load_image_b64("Glen_Scher.png"),
-    "filip": load_image_b64("Filip_Niculete.png"),
-    "hero": load_image_b64("Street_View_Front.png"),
-    "aerial": load_image_b64("Aerial_View.png"),
-    "loc_map": load_image_b64("Location_Map_Google.png"),
-    "closings_map": load_image_b64("closings-map.png"),
-    "team_aida": load_image_b64("Aida_Memary_Scher.png"),
-    "team_logan": load_image_b64("Logan_Ward.png"),
-    "team_morgan": load_image_b64("Morgan_Wetmore.png"),
-    "team_luka": load_image_b64("Luka_Leader.png"),
-    "team_jason": load_image_b64("Jason_Mandel.png"),
-    "team_alexandro": load_image_b64("Alexandro_Tapia.png"),
-    "team_blake": load_image_b64("Blake_Lewitt.png"),
-    "team_mike": load_image_b64("Mike_Palade.png"),
-    "team_tony": load_image_b64("Tony_Dang.png"),
-}
+IMG = {key: load_image_b64(filename, slot) for key, (filename, slot) in IMG_FILES.items()}
+
+IMG_SRCSET, IMG_PLACEHOLDER = {}, {}
+if OPTIMIZE_IMAGES:
+    for key, (filename, slot) in IMG_FILES.items():
+        path = os.path.join(IMAGES_DIR, filename)
+        if not IMG[key]:
+            continue
+        try:
+            if ASSET_MODE == "external" and slot in SRCSET_WIDTHS:
+                from PIL import Image
+                with Image.open(path) as src:
+                    src_size = src.size
+                full = IMAGE_SLOTS[slot]
+                full_width = full.fitted_size(*src_size)[0]
+                candidates = []
+                for w in SRCSET_WIDTHS[slot]:
+                    if w >= full_width:
+                        continue
+                    variant = full.scaled(w)
+                    uri = IMAGE_CACHE.fetch(path, variant.variant, lambda raw, v=variant: optimized_data_uri(raw, v)).decode("ascii")
+                    candidates.append(f"{uri} {variant.fitted_size(*src_size)[0]}w")
+                if candidates:
+                    candidates.append(f"{IMG[key]} {full_width}w")
+                    IMG_SRCSET[key] = ", ".join(candidates)
+            if key in PLACEHOLDER_KEYS:
+                IMG_PLACEHOLDER[key] = IMAGE_CACHE.fetch(path, "lqip-24", placeholder_data_uri).decode("ascii")
+        except Exception as e:
+            print(f"WARNING: Could not build responsive variants for {filename} ({e})")
+
+def img_attrs(key, sizes="100vw", lazy=True):
+    """src plus srcset/sizes, placeholder and loading hints for an <img> showing IMG[key]."""
+    attrs = f'src="{IMG[key]}"'
+    if key in IMG_SRCSET:
+        attrs += f' srcset="{IMG_SRCSET[key]}" sizes="{sizes}"'
+    if key in IMG_PLACEHOLDER:
+        attrs += f' style="background:url(\'{IMG_PLACEHOLDER[key]}\') center/cover no-repeat"'
+    if lazy:
+        attrs += ' loading="lazy"'
+    return attrs + ' decoding="async"'
+
+IMAGE_CACHE.save()
+print(f"Image cache: {IMAGE_CACHE.hits} hits, {IMAGE_CACHE.misses} misses ({CACHE_DIR})")
+if image_bytes_inlined < image_bytes_original:
+    print(f"Image optimization: {image_bytes_original/1024/1024:.2f} MB -> {image_bytes_inlined/1024/1024:.2f} MB "
+          f"({(image_bytes_original - image_bytes_inlined)/1024/1024:.2f} MB saved)")
 
 # ============================================================
 # SUBJECT COORDINATES
@@ -71,9 +224,11 @@ IMG = {
 SUBJECT_LAT, SUBJECT_LNG = 34.079304, -118.297881
 
 # ============================================================
-# GEOCODING — Cached coordinates
+# GEOCODING — Seed and pinned coordinates
 # ============================================================
-ADDRESSES = {
+# Known comp coordinates, written to CACHE_DIR/geocode.sqlite the first time each address
+# is resolved (StaticProvider ahead of the live geocoder) and read back from the store after.
+GEOCODE_SEED = {
     "101 S Kenmore Ave, Los Angeles, CA 90004": (34.0728, -118.2936),
     "212 S Berendo St, Los Angeles, CA 90004": (34.0688, -118.2933),
     "247 N New Hampshire Ave, Los Angeles, CA 90004": (34.0765, -118.2927),
@@ -98,108 +253,9 @@ ADDRESSES = {
     "516 S St Andrews Pl, Los Angeles, CA 90020": (34.0642, -118.3090),
     "132 Westmoreland Ave, Los Angeles, CA 90004": (34.0750, -118.2942),
 }
-print(f"Using cached geocode data ({len(ADDRESSES)} addresses)")
-
-# ============================================================
-# STATIC MAP GENERATOR (for PDF print)
-# ============================================================
-def generate_static_map(markers, subject_coords, width=800, height=400, zoom=14):
-    """Generate a static map PNG using OSM tiles + Pillow. Returns base64 or empty string."""
-    try:
-        from PIL import Image, ImageDraw, ImageFont
-    except ImportError:
-        print("WARNING: Pillow not installed. Static maps for PDF will be empty. Install with: pip install Pillow")
-        return ""
-    try:
-        import math as _math
-        def lat_lng_to_tile(lat, lng, z):
-            n = 2 ** z
-            x = int((lng + 180) / 360 * n)
-            lat_rad = _math.radians(lat)
-            y = int((1 - _math.log(_math.tan(lat_rad) + 1 / _math.cos(lat_rad)) / _math.pi) / 2 * n)
-            return x, y
-
-        def lat_lng_to_pixel(lat, lng, z, origin_x, origin_y):
-            n = 2 ** z
-            px = int((lng + 180) / 360 * n * 256 - origin_x)
-            lat_rad = _math.radians(lat)
-            py = int((1 - _math.log(_math.tan(lat_rad) + 1 / _math.cos(lat_rad)) / _math.pi) / 2 * n * 256 - origin_y)
-            return px, py
-
-        all_lats = [subject_coords[0]] + [m[1] for m in markers]
-        all_lngs = [subject_coords[1]] + [m[2] for m in markers]
-        center_lat = sum(all_lats) / len(all_lats)
-        center_lng = sum(all_lngs) / len(all_lngs)
-
-        cx, cy = lat_lng_to_tile(center_lat, center_lng, zoom)
-        origin_x = cx * 256 - width // 2
-        origin_y = cy * 256 - height // 2
-        tile_x_start = origin_x // 256
-        tile_y_start = origin_y // 256
-        tile_x_end = (origin_x + width) // 256 + 1
-        tile_y_end = (origin_y + height) // 256 + 1
-
-        canvas = Image.new("RGB", (width, height), (240, 240, 240))
-        for tx in range(tile_x_start, tile_x_end + 1):
-            for ty in range(tile_y_start, tile_y_end + 1):
-                url = f"https://tile.openstreetmap.org/{zoom}/{tx}/{ty}.png"
-                req = urllib.request.Request(url, headers={"User-Agent": "LAAA-BOV-Builder/1.0"})
-                try:
-                    tile_data = urllib.request.urlopen(req, timeout=10).read()
-                    tile_img = Image.open(io.BytesIO(tile_data))
-                    paste_x = tx * 256 - origin_x
-                    paste_y = ty * 256 - origin_y
-                    canvas.paste(tile_img, (paste_x, paste_y))
-                except Exception:
-                    pass
-
-        draw = ImageDraw.Draw(canvas)
-        r = 13
-        for num, lat, lng in markers:
-            px, py = lat_lng_to_pixel(lat, lng, zoom, origin_x, origin_y)
-            if 0 <= px < width and 0 <= py < height:
-                draw.ellipse([px - r, py - r, px + r, py + r], fill="#1B3A5C", outline="#fff", width=2)
-                label = str(num)
-                bbox = draw.textbbox((0, 0), label)
-                tw, th = bbox[2] - bbox[0], bbox[3] - bbox[1]
-                draw.text((px - tw // 2, py - th // 2 - 1), label, fill="#fff")
-
-        sx, sy = lat_lng_to_pixel(subject_coords[0], subject_coords[1], zoom, origin_x, origin_y)
-        if 0 <= sx < width and 0 <= sy < height:
-            draw.ellipse([sx - r, sy - r, sx + r, sy + r], fill="#C5A258", outline="#fff", width=2)
-            draw.text((sx - 2, sy - 6), "S", fill="#fff")
-
-        buf = io.BytesIO()
-        canvas.save(buf, format="PNG", optimize=True)
-        b64 = base64.b64encode(buf.getvalue()).decode("ascii")
-        return f"data:image/png;base64,{b64}"
-    except Exception as e:
-        print(f"WARNING: Static map generation failed: {e}")
-        return ""
-
-# Generate static maps for PDF
-print("Generating static maps for PDF...")
-SALE_COMP_COORDS = [
-    (1, 34.0728, -118.2936), (2, 34.0688, -118.2933),
-    (3, 34.0765, -118.2927), (4, 34.0749, -118.2876),
-]
-ACTIVE_COMP_COORDS = [
-    (1, 34.0795, -118.3068), (2, 34.0723, -118.2981),
-    (3, 34.0721, -118.2981), (4, 34.0807, -118.2999),
-    (5, 34.0774, -118.3090), (6, 34.0786, -118.2867),
-    (7, 34.0788, -118.2959),
-]
-RENT_COMP_COORDS = [
-    (1, 34.0738, -118.2979), (2, 34.0836, -118.2980),
-    (3, 34.0681, -118.3009), (4, 34.0831, -118.2942),
-    (5, 34.0767, -118.3010), (6, 34.0645, -118.2966),
-    (7, 34.0697, -118.2978), (8, 34.0663, -118.3010),
-    (9, 34.0641, -118.2948), (10, 34.0577, -118.3011),
-    (11, 34.0642, -118.3090), (12, 34.0750, -118.2942),
-]
-STATIC_MAP_SALE = generate_static_map(SALE_COMP_COORDS, (SUBJECT_LAT, SUBJECT_LNG))
-STATIC_MAP_ACTIVE = generate_static_map(ACTIVE_COMP_COORDS, (SUBJECT_LAT, SUBJECT_LNG))
-STATIC_MAP_RENT = generate_static_map(RENT_COMP_COORDS, (SUBJECT_LAT, SUBJECT_LNG))
+# Hand-verified points for addresses a geocoder places wrong; these override the store and
+# provider and are never stored. Keep this to the few addresses that need it.
+GEOCODE_PINNED = {}
 
 # ============================================================
 # FINANCIAL DATA
@@ -223,27 +279,16 @@ LOAN_TERM_YEARS = 5
 LOT_SIZE_ACRES = 0.10
 
 def calc_loan_constant(annual_rate, amort_years):
-    r = annual_rate / 12
-    n = amort_years * 12
-    monthly = (r * (1 + r)**n) / ((1 + r)**n - 1)
-    return monthly * 12
+    return amortization.loan_constant(annual_rate, amort_years)
 
 LOAN_CONSTANT = calc_loan_constant(INTEREST_RATE, AMORTIZATION_YEARS)
 
 def calc_principal_reduction_yr1(loan_amount, annual_rate, amort_years):
-    r = annual_rate / 12
-    n = amort_years * 12
-    monthly_pmt = loan_amount * (r * (1 + r)**n) / ((1 + r)**n - 1)
-    balance = loan_amount
-    total_principal = 0
-    for _ in range(12):
-        interest = balance * r
-        principal = monthly_pmt - interest
-        total_principal += principal
-        balance -= principal
-    return total_principal
-
-def calc_metrics(price):
+    return amortization.principal_reduction(loan_amount, annual_rate, amort_years, 1)
+
+def calc_metrics(price, interest_rate=INTEREST_RATE, max_ltv=MAX_LTV):
+    """Every pricing metric at one price; interest_rate / max_ltv override the base financing."""
+    loan_constant = calc_loan_constant(interest_rate, AMORTIZATION_YEARS)
     taxes = price * TAX_RATE
     cur_egi = GSR * (1 - VACANCY_PCT) + OTHER_INCOME
     pf_egi = PF_GSR * (1 - VACANCY_PCT) + OTHER_INCOME
@@ -251,20 +296,21 @@ def calc_metrics(price):
     pf_exp = NON_TAX_PF_EXP + taxes
     cur_noi = cur_egi - cur_exp
     pf_noi = pf_egi - pf_exp
-    ltv_max_loan = price * MAX_LTV
-    dcr_max_loan = cur_noi / (MIN_DCR * LOAN_CONSTANT) if LOAN_CONSTANT > 0 else ltv_max_loan
+    ltv_max_loan = price * max_ltv
+    dcr_max_loan = cur_noi / (MIN_DCR * loan_constant) if loan_constant > 0 else ltv_max_loan
     loan_amount = min(ltv_max_loan, dcr_max_loan)
     actual_ltv = loan_amount / price if price > 0 else 0
     loan_constraint = "LTV" if ltv_max_loan <= dcr_max_loan else "DCR"
     down_payment = price - loan_amount
-    debt_service = loan_amount * LOAN_CONSTANT
+    debt_service = loan_amount * loan_constant
     net_cf_cur = cur_noi - debt_service
     net_cf_pf = pf_noi - debt_service
     coc_cur = net_cf_cur / down_payment * 100 if down_payment > 0 else 0
     coc_pf = net_cf_pf / down_payment * 100 if down_payment > 0 else 0
     dcr_cur = cur_noi / debt_service if debt_service > 0 else 0
     dcr_pf = pf_noi / debt_service if debt_service > 0 else 0
-    prin_red = calc_principal_reduction_yr1(loan_amount, INTEREST_RATE, AMORTIZATION_YEARS)
+    prin_red = calc_principal_reduction_yr1(loan_amount, interest_rate, AMORTIZATION_YEARS)
+    balance_at_term = amortization.balloon(loan_amount, interest_rate, AMORTIZATION_YEARS, LOAN_TERM_YEARS)
     total_return_cur = net_cf_cur + prin_red
     total_return_pf = net_cf_pf + prin_red
     total_return_pct_cur = total_return_cur / down_payment * 100 if down_payment > 0 else 0
@@ -279,13 +325,224 @@ def calc_metrics(price):
             "debt_service": debt_service, "net_cf_cur": net_cf_cur, "net_cf_pf": net_cf_pf,
             "coc_cur": coc_cur, "coc_pf": coc_pf, "dcr_cur": dcr_cur, "dcr_pf": dcr_pf,
             "prin_red": prin_red, "total_return_cur": total_return_cur, "total_return_pf": total_return_pf,
-            "total_return_pct_cur": total_return_pct_cur, "total_return_pct_pf": total_return_pct_pf}
+            "total_return_pct_cur": total_return_pct_cur, "total_return_pct_pf": total_return_pct_pf,
+            "balloon": balance_at_term, "prin_red_term": loan_amount - balance_at_term}
 
 MATRIX_PRICES = list(range(1_400_000, 1_125_000, -25_000))
-MATRIX = [calc_metrics(p) for p in MATRIX_PRICES]
-AT_LIST = calc_metrics(LIST_PRICE)
 
-print(f"Financials at list ${LIST_PRICE:,.0f}: Cap {AT_LIST['cur_cap']:.2f}%")
+# Hold-period DCF behind the matrix IRR columns; exit cap = going-in cap at list + spread
+DCF_RENT_GROWTH = 0.03
+DCF_EXPENSE_GROWTH = 0.03
+DCF_EXIT_CAP_SPREAD = 0.0025
+DCF_SELLING_COSTS = 0.03
+
+# Pricing guidance: the exact price that hits each target (goal-seek, numpy only).
+# (metric, label, format, targets); each metric's targets are solved in one batched call.
+PRICING_TARGETS = [
+    ("cur_cap", "Current Cap Rate", "pct", [5.50, 5.75, 6.00]),
+    ("pf_cap", "Pro Forma Cap Rate", "pct", [7.50, 8.00]),
+    ("coc_cur", "Cash-on-Cash (Current)", "pct", [4.00, 5.00]),
+    ("dcr_cur", "DCR (Current)", "x", [1.30, 1.40]),
+]
+
+# Sensitivity grid: every metric across the Cartesian product of these axes (numpy only).
+# The Financials section renders price x one assumption slices, selectable in the browser.
+SENSITIVITY_AXES = {
+    "price": MATRIX_PRICES,
+    "interest_rate": [0.055, 0.06, 0.065, 0.07, 0.075],
+    "vacancy_pct": [0.03, 0.05, 0.065, 0.08],
+    "max_ltv": [0.50, 0.55, 0.60, 0.65],
+    "min_dcr": [1.20, 1.25, 1.35],
+}
+SENSITIVITY_METRICS = {
+    "coc_cur": ("Cash-on-Cash (Current)", "pct"),
+    "dcr_cur": ("DCR (Current)", "x"),
+    "total_return_pct_cur": ("Total Return (Current)", "pct"),
+    "net_cf_cur": ("Net Cash Flow (Current)", "usd"),
+}
+
+# Live calculator (pricing_calculator.py): slider ranges as (min, max, step). The
+# browser re-runs calc_metrics on the embedded assumptions; the build checks the
+# JS port against calc_metrics on a grid of prices x slider settings under Node.js.
+CALCULATOR_SLIDERS = {
+    "price": (1_000_000, 1_600_000, 5_000),
+    "interest_rate": (0.04, 0.09, 0.00125),
+    "max_ltv": (0.40, 0.75, 0.01),
+}
+# Calculator summary card and matrix columns: (label, calc_metrics key, format)
+CALCULATOR_SUMMARY = [
+    ("Loan Amount", "loan_amount", "usd"), ("Down Payment", "down_payment", "usd"),
+    ("Loan-to-Value", "actual_ltv", "ltv"), ("Annual Debt Service", "debt_service", "usd"),
+    ("Current Cap Rate", "cur_cap", "pct"), ("Pro Forma Cap Rate", "pf_cap", "pct"),
+    ("Cash-on-Cash (Current)", "coc_cur", "pct"), ("DCR (Current)", "dcr_cur", "x"),
+    ("Total Return (Current)", "total_return_pct_cur", "pct"), ("Balloon at Maturity", "balloon", "usd"),
+    ("Price / Unit", "per_unit", "usd"), ("Price / SF", "per_sf", "usd"),
+]
+CALCULATOR_MATRIX = [
+    ("Loan Amount", "loan_amount", "usd"), ("Current Cap", "cur_cap", "pct"), ("Pro Forma Cap", "pf_cap", "pct"),
+    ("Cash-on-Cash", "coc_cur", "pct"), ("DCR", "dcr_cur", "x"), ("Total Return", "total_return_pct_cur", "pct"),
+    ("$/Unit", "per_unit", "usd"),
+]
+
+# Debt product comparison (debt_products.py, numpy only): every product sized at every
+# matrix price in one batched pass. Fields as in DebtProduct; first entry = proposed financing.
+DEBT_PRODUCTS = [
+    {"name": "Bank 5-Yr Fixed (Proposed)", "interest_rate": INTEREST_RATE, "amortization_years": AMORTIZATION_YEARS,
+     "max_ltv": MAX_LTV, "min_dcr": MIN_DCR, "term_years": LOAN_TERM_YEARS},
+    {"name": "Agency Small Balance 10-Yr", "interest_rate": 0.0625, "amortization_years": 30,
+     "max_ltv": 0.70, "min_dcr": 1.25, "term_years": 10},
+    {"name": "Bank 5-Yr, 2 Yrs Interest-Only", "interest_rate": 0.0625, "amortization_years": 30,
+     "max_ltv": 0.55, "min_dcr": 1.25, "term_years": 5, "io_years": 2},
+    {"name": "Bank 5-Yr + 10% Seller Carry", "interest_rate": INTEREST_RATE, "amortization_years": AMORTIZATION_YEARS,
+     "max_ltv": MAX_LTV, "min_dcr": MIN_DCR, "term_years": LOAN_TERM_YEARS,
+     "seller_carry_pct": 0.10, "seller_carry_rate": 0.06},
+]
+
+# Currency / percent formatters for every table (used by the model's HTML nodes)
+def fc(n):
+    if n is None: return "n/a"
+    return f"${n:,.0f}"
+def fp(n):
+    if n is None: return "n/a"
+    return f"{n:.2f}%"
+def fx(n, template):
+    if n is None: return "n/a"
+    return template.format(n)
+
+# ------------------------------------------------------------
+# Assumption model (assumption_model.py): the figures and HTML fragments derived
+# from the inputs above are cached nodes with declared dependencies. Changing one
+# input recomputes only the nodes that read it; everything else is reused from
+# the previous build's store. The source of MODEL_CODE (the helpers above and the
+# engine modules) is part of every node's fingerprint, so editing any of it
+# recomputes the model.
+# ------------------------------------------------------------
+MODEL_VERSION = "1"
+MODEL_CODE = (calc_loan_constant, calc_principal_reduction_yr1, calc_metrics, fc, fp,
+              "amortization", "pricing_engine", "dcf", "simulation", "debt_products", "pricing_calculator", "rent_roll")
+MODEL = AssumptionModel(os.path.join(CACHE_DIR, "models", f"{BOV_NAMESPACE}.json"), version=MODEL_VERSION,
+                        code=MODEL_CODE)
+ASSUMPTION_FIELDS = ("tax_rate", "units", "sf", "gsr", "pf_gsr", "vacancy_pct", "other_income",
+                     "non_tax_cur_exp", "non_tax_pf_exp", "interest_rate", "amortization_years",
+                     "max_ltv", "min_dcr", "loan_term_years")
+MODEL.inputs(
+    list_price=LIST_PRICE, tax_rate=TAX_RATE, units=UNITS, sf=SF, gsr=GSR, pf_gsr=PF_GSR,
+    vacancy_pct=VACANCY_PCT, other_income=OTHER_INCOME,
+    non_tax_cur_exp=NON_TAX_CUR_EXP, non_tax_pf_exp=NON_TAX_PF_EXP,
+    interest_rate=INTEREST_RATE, amortization_years=AMORTIZATION_YEARS,
+    max_ltv=MAX_LTV, min_dcr=MIN_DCR, loan_term_years=LOAN_TERM_YEARS,
+    matrix_prices=MATRIX_PRICES, have_numpy=HAVE_NUMPY,
+    dcf_rent_growth=DCF_RENT_GROWTH, dcf_expense_growth=DCF_EXPENSE_GROWTH,
+    dcf_exit_cap_spread=DCF_EXIT_CAP_SPREAD, dcf_selling_costs=DCF_SELLING_COSTS,
+    pricing_targets=PRICING_TARGETS, sensitivity_axes=SENSITIVITY_AXES, sensitivity_metrics=SENSITIVITY_METRICS,
+    calculator_sliders=CALCULATOR_SLIDERS, calculator_summary=CALCULATOR_SUMMARY, calculator_matrix=CALCULATOR_MATRIX,
+    calculator_js=CALCULATOR_JS, debt_products=DEBT_PRODUCTS, have_node=shutil.which("node") is not None,
+)
+
+@MODEL.node("have_numpy", *ASSUMPTION_FIELDS, persist=False)
+def assumptions(have_numpy, *values):
+    """Inputs of the vectorized engine (pricing_engine.py); None without numpy."""
+    return Assumptions(**dict(zip(ASSUMPTION_FIELDS, values))) if have_numpy else None
+
+@MODEL.node("assumptions", "list_price")
+def at_list_metrics(a, list_price):
+    if a is None:
+        return calc_metrics(list_price)
+    return metrics_rows(price_metrics([list_price], a))[0]
+
+@MODEL.node("at_list_metrics", "have_numpy", "loan_term_years", "dcf_rent_growth", "dcf_expense_growth",
+            "dcf_exit_cap_spread", "dcf_selling_costs", persist=False)
+def dcf_assumptions(at_list, have_numpy, hold_years, rent_growth, expense_growth, exit_cap_spread, selling_costs):
+    if not have_numpy:
+        return None
+    return DCFAssumptions(hold_years=hold_years, rent_growth=rent_growth, expense_growth=expense_growth,
+                          exit_cap=round(at_list["cur_cap"] / 100 + exit_cap_spread, 4), selling_costs=selling_costs)
+
+@MODEL.node("assumptions", "matrix_prices", "dcf_assumptions")
+def matrix(a, prices, dcf):
+    if a is None:
+        return [calc_metrics(p) for p in prices]
+    columns = price_metrics(prices, a)
+    rows = metrics_rows(columns)
+    returns = hold_period_dcf(columns, a, dcf)
+    for m, lev, unlev in zip(rows, returns["levered_irr"].tolist(), returns["unlevered_irr"].tolist()):
+        m["levered_irr"], m["unlevered_irr"] = lev, unlev
+    return rows
+
+@MODEL.node("assumptions", "list_price", "at_list_metrics", "dcf_assumptions")
+def at_list(a, list_price, metrics, dcf):
+    if dcf is None:
+        return metrics
+    returns = hold_period_dcf(price_metrics([list_price], a), a, dcf)
+    return {**metrics, "levered_irr": returns["levered_irr"][0].item(), "unlevered_irr": returns["unlevered_irr"][0].item()}
+
+@MODEL.node("assumptions", "pricing_targets")
+def pricing_guidance(a, targets):
+    if a is None:
+        return []
+    guidance = []
+    for metric, label, kind, values in targets:
+        for target, price in zip(values, goal_seek(a, metric, values).tolist()):
+            guidance.append({"label": label, "kind": kind, "target": target,
+                             "metrics": None if math.isnan(price) else metrics_rows(price_metrics([price], a))[0]})
+    return guidance
+
+@MODEL.node("assumptions", "sensitivity_axes", persist=False)
+def sensitivity_grid(a, axes):
+    if a is None:
+        return None
+    grid = sensitivity(a, axes)
+    print(f"Sensitivity grid: {' x '.join(map(str, grid.shape))} = {grid.columns['price'].size:,} scenarios")
+    return grid
+
+@MODEL.node("assumptions", "debt_products", "matrix_prices", "list_price")
+def debt_comparison(a, products, matrix_prices, list_price):
+    """Every debt product at every matrix price (plus list): {"prices", "products": [{name, terms, metrics by price}]}."""
+    if a is None:
+        return None
+    prices = sorted(set(matrix_prices) | {list_price}, reverse=True)
+    result = compare_products(prices, a, [DebtProduct(**p) for p in products])
+    return {"prices": prices,
+            "products": [{**p, **{k: v[i].tolist() for k, v in result.items() if k != "price"}}
+                         for i, p in enumerate(products)]}
+
+@MODEL.node("list_price", "matrix_prices", "calculator_sliders", *ASSUMPTION_FIELDS)
+def live_calculator(list_price, prices, sliders, *values):
+    return calculator_payload(dict(zip(ASSUMPTION_FIELDS, values)), list_price, prices, sliders)
+
+@MODEL.node("live_calculator", "calculator_js", "have_node", persist=False)
+def calculator_parity(payload, calculator_js, have_node):
+    """
+    Parity of the browser calculator with calc_metrics: matrix prices and slider ends x rate x LTV.
+    Not persisted: the check guards against drift between the two, so it runs every build.
+    """
+    (p_lo, p_hi, _), (r_lo, r_hi, _), (l_lo, l_hi, _) = (payload["sliders"][k] for k in ("price", "interest_rate", "max_ltv"))
+    a = payload["a"]
+    prices = payload["prices"] + [payload["list_price"], p_lo, p_hi]
+    cases = [(p, {"interest_rate": r, "max_ltv": l})
+             for p in prices for r in (r_lo, a["interest_rate"], r_hi) for l in (l_lo, a["max_ltv"], l_hi)]
+    result = parity_check(payload, calc_metrics, cases)
+    return {"cases": result.cases, "mismatches": result.mismatches[:10], "skipped": result.skipped}
+
+CALCULATOR_PARITY = MODEL["calculator_parity"]
+if CALCULATOR_PARITY["skipped"]:
+    print(f"WARNING: live calculator parity check skipped ({CALCULATOR_PARITY['skipped']}). Install Node.js to verify the in-browser calculator.")
+elif CALCULATOR_PARITY["mismatches"]:
+    price, overrides, metric, expected, actual = CALCULATOR_PARITY["mismatches"][0]
+    raise RuntimeError(f"Live calculator disagrees with calc_metrics: {metric} at ${price:,.0f} {overrides}: "
+                       f"python {expected!r} vs js {actual!r}")
+else:
+    print(f"Live calculator: parity with calc_metrics on {CALCULATOR_PARITY['cases']} cases")
+
+if not HAVE_NUMPY:
+    print("WARNING: numpy not installed. Using scalar calc_metrics; IRR, guidance and sensitivity tables skipped. Install with: pip install numpy")
+ASSUMPTIONS = MODEL["assumptions"]
+DCF_ASSUMPTIONS = MODEL["dcf_assumptions"]
+MATRIX = MODEL["matrix"]
+AT_LIST = MODEL["at_list"]
+
+print(f"Financials at list ${LIST_PRICE:,.0f}: Cap {AT_LIST['cur_cap']:.2f}%"
+      + (f", {LOAN_TERM_YEARS}-yr levered IRR {AT_LIST['levered_irr']:.2f}%" if "levered_irr" in AT_LIST else ""))
 
 # ============================================================
 # UNIT MIX DATA
@@ -299,54 +556,162 @@ RENT_ROLL = [
     ("508(2)", "Studio", 400, 895, 1450),
     ("510", "ADU", 248, 1875, 1875),
 ]
+ROLL = RentRoll.from_rows(RENT_ROLL)
+# Display names for the unit summary (unlisted types show as-is)
+UNIT_TYPE_LABELS = {"2BR/1BA": "2 Bed / 1 Bath"}
 
-SALE_COMPS = [
-    {"num": 1, "addr": "101 S Kenmore Ave", "city": "Los Angeles", "units": 8, "sf": 7806, "yr": 1925, "price": 1595000, "ppu": 199375, "psf": 204.33, "cap": 7.29, "grm": 9.08, "date": "07/21/2025", "notes": "Anchor comp; 8\u00d7 1BR, RSO, on-site laundry, best data quality"},
-    {"num": 2, "addr": "212 S Berendo St", "city": "Los Angeles", "units": 8, "sf": 6680, "yr": 1923, "price": 1525000, "ppu": 190625, "psf": 228.29, "cap": 4.15, "grm": 12.61, "date": "08/28/2025", "notes": "8\u00d7 2BR, deep RSO, 108% rent upside, 1031 exchange"},
-    {"num": 3, "addr": "247 N New Hampshire Ave", "city": "Los Angeles", "units": 12, "sf": 7736, "yr": 1922, "price": 1400000, "ppu": 116667, "psf": 180.97, "cap": None, "grm": 9.59, "date": "08/27/2025", "notes": "12 studios, off-market, financial data unreliable"},
-    {"num": 4, "addr": "143 N Commonwealth Ave", "city": "Los Angeles", "units": 6, "sf": 5258, "yr": 1951, "price": 1425000, "ppu": 237500, "psf": 271.02, "cap": None, "grm": 11.10, "date": "01/21/2026", "notes": "DISTRESSED \u2014 Auction/Trust sale, SP/LP 79.2%"},
-]
+# ============================================================
+# COMPS — queried from the local comp store (CACHE_DIR/comps.sqlite)
+# ============================================================
+# The comp set is whatever this site's exports (COMP_EXPORTS, imported under
+# BOV_NAMESPACE) hold that matches these filters, in export order; add comps by
+# adding rows or exports, not by editing lists here.
+COMP_ZIPS = ["90004", "90005", "90020"]
+SALE_COMP_FILTERS = {"site": BOV_NAMESPACE, "zips": COMP_ZIPS, "units": (5, 12), "sold_since": "2025-07-01"}
+ACTIVE_COMP_FILTERS = {"site": BOV_NAMESPACE, "zips": COMP_ZIPS, "units": (5, 12), "status": ["Active", "Pending"]}
+RENT_COMP_FILTERS = {"site": BOV_NAMESPACE, "zips": COMP_ZIPS}
+
+COMP_STORE = CompStore(os.path.join(CACHE_DIR, "comps.sqlite"))
+for path, kind in COMP_EXPORTS:
+    COMP_STORE.import_csv(path, kind, site=BOV_NAMESPACE)
+SALE_COMPS = COMP_STORE.sales(**SALE_COMP_FILTERS)
+ACTIVE_COMPS = COMP_STORE.listings(**ACTIVE_COMP_FILTERS)
+RENT_COMPS_2BR = COMP_STORE.rents(unit_type="2BR", **RENT_COMP_FILTERS)
+RENT_COMPS_STUDIO = COMP_STORE.rents(unit_type="Studio", **RENT_COMP_FILTERS)
+print(f"Comp store: {len(SALE_COMPS)} sale, {len(ACTIVE_COMPS)} on-market, "
+      f"{len(RENT_COMPS_2BR) + len(RENT_COMPS_STUDIO)} rent comps selected from {len(COMP_STORE)} stored "
+      f"({COMP_STORE.imported} rows imported, {COMP_STORE.skipped} exports unchanged)")
+COMP_STORE.close()
+for export, line, missing in COMP_STORE.rejected:
+    print(f"WARNING: {os.path.basename(export)} line {line} skipped, missing {', '.join(missing)}")
+if not SALE_COMPS:
+    print("WARNING: no sale comps match SALE_COMP_FILTERS; the sale comp section will be empty")
+
+def comp_stat(fn, values):
+    """fn over the values present (None skipped), or None when there are none, for comp summary rows."""
+    values = [v for v in values if v is not None]
+    return fn(values) if values else None
+
+def int_mean(values):
+    return sum(values) // len(values)
 
-ACTIVE_COMPS = [
-    {"num": 1, "addr": "502 N Serrano Ave", "units": 8, "price": 1795000, "ppu": 224375, "cap": 5.57, "grm": 10.97, "dom": 145, "status": "Pending", "notes": "Copper, seismic retrofit, CBRE listing"},
-    {"num": 2, "addr": "121 S Oxford Ave", "units": 9, "price": 1800000, "ppu": 200000, "cap": 5.66, "grm": 13.73, "dom": 1, "status": "Active", "notes": "9\u00d7 1BR, 3 garage; brand new listing"},
-    {"num": 3, "addr": "127 S Oxford Ave", "units": 8, "price": 1800000, "ppu": 225000, "cap": 5.51, "grm": 12.34, "dom": 1, "status": "Active", "notes": "8\u00d7 1BR, 0 parking; adjacent to 121 S Oxford"},
-    {"num": 4, "addr": "543 N Ardmore Ave", "units": 12, "price": 2300000, "ppu": 191667, "cap": 4.77, "grm": 11.36, "dom": 12, "status": "Active", "notes": "New roof 2025, seismic retrofit, 12 parking"},
-    {"num": 5, "addr": "310 N St Andrews Pl", "units": 8, "price": 2490000, "ppu": 311250, "cap": 5.06, "grm": 13.72, "dom": 20, "status": "Active", "notes": "6 main + 2 ADU (2025), renovated"},
-    {"num": 6, "addr": "426 N Virgil Ave", "units": 5, "price": 1599000, "ppu": 319800, "cap": 5.95, "grm": 14.08, "dom": 133, "status": "Active", "notes": "Price reduced from $1,799K; market resistant"},
-    {"num": 7, "addr": "4053 Oakwood Ave", "units": 12, "price": 2600000, "ppu": 216667, "cap": 5.83, "grm": 10.47, "dom": 285, "status": "Active", "notes": "Price reduced from $2,800K; very stale"},
-]
+# ============================================================
+# GEOCODING — Comp coordinates (one bulk store lookup; new addresses geocoded once)
+# ============================================================
+def comp_address(c):
+    return f'{c["addr"]}, {c.get("city", "Los Angeles")}, CA'
+
+GEOCODE_STORE = GeocodeStore(os.path.join(CACHE_DIR, "geocode.sqlite"))
+GEOCODE_PROVIDER = (StaticProvider(GEOCODE_SEED) if STATIC_MAP_OFFLINE or GEOCODER == "none"
+                    else ChainProvider([StaticProvider(GEOCODE_SEED), NominatimProvider()]))
+ADDRESS_INDEX = GEOCODE_STORE.resolve(
+    [comp_address(c) for c in SALE_COMPS + ACTIVE_COMPS + RENT_COMPS_2BR + RENT_COMPS_STUDIO],
+    GEOCODE_PROVIDER, pinned=GEOCODE_PINNED,
+)
+GEOCODE_STORE.close()
+print(f"Geocoding: {GEOCODE_STORE.pinned} pinned, {GEOCODE_STORE.hits} from store, "
+      f"{GEOCODE_STORE.geocoded} geocoded ({GEOCODE_STORE.path})")
+if GEOCODE_STORE.not_found:
+    print(f"WARNING: {len(GEOCODE_STORE.not_found)} comp addresses could not be geocoded and are left off the maps: "
+          f"{', '.join(GEOCODE_STORE.not_found[:5])}{', ...' if len(GEOCODE_STORE.not_found) > 5 else ''}")
+
+# Spatial index over every geocoded comp; rent comp distances are computed from the
+# subject rather than typed in
+COMP_RADIUS_MILES = 1.0
+COMP_INDEX = SpatialIndex()
+for kind, comps in (("sale", SALE_COMPS), ("active", ACTIVE_COMPS), ("rent", RENT_COMPS_2BR + RENT_COMPS_STUDIO)):
+    for c in comps:
+        latlng = ADDRESS_INDEX.lookup(c["addr"])
+        if latlng:
+            COMP_INDEX.add((kind, c), *latlng)
+COMP_DISTANCES = COMP_INDEX.nearest(SUBJECT_LAT, SUBJECT_LNG, k=len(COMP_INDEX))
+for n in COMP_DISTANCES:
+    kind, c = n.item
+    if kind == "rent":
+        c["dist"] = f"{n.miles:.1f} mi"
+print(f"Comp index: {sum(1 for n in COMP_DISTANCES if n.miles <= COMP_RADIUS_MILES)} of {len(COMP_INDEX)} comps "
+      f"within {COMP_RADIUS_MILES:g} mi of the subject (nearest: {COMP_DISTANCES[0].item[1]['addr']}, {COMP_DISTANCES[0].miles:.2f} mi)"
+      if COMP_DISTANCES else "Comp index: no geocoded comps")
 
-RENT_COMPS_2BR = [
-    {"addr": "313 N Alexandria Ave", "rent": 2150, "reno": "Classic", "dist": "0.4 mi", "features": "New stove, laminate floors, 2-car tandem parking"},
-    {"addr": "634 N Alexandria Ave", "rent": 2200, "reno": "Classic", "dist": "0.3 mi", "features": "Newly renovated, on-site manager"},
-    {"addr": "229 S Normandie Ave", "rent": 2150, "reno": "Classic", "dist": "0.7 mi", "features": "Wood-style flooring, on-site laundry"},
-    {"addr": "466 N Westmoreland Ave", "rent": 2095, "reno": "Classic", "dist": "0.4 mi", "features": "Renovated, near Virgil/Melrose"},
-    {"addr": "111 N Normandie Ave", "rent": 2200, "reno": "Classic", "dist": "0.6 mi", "features": "Recently renovated (within 6 yrs)"},
-    {"addr": "955 Fedora St", "rent": 2350, "reno": "Classic/Premium", "dist": "0.8 mi", "features": "Modern renovated, Koreatown"},
-]
+# ============================================================
+# STATIC MAPS (PDF)
+# ============================================================
+def comp_coords(comps):
+    """(label, lat, lng) for each geocoded comp; labels are list positions, as on the interactive maps."""
+    coords = []
+    for i, c in enumerate(comps):
+        latlng = ADDRESS_INDEX.lookup(c["addr"])
+        if latlng:
+            coords.append((i + 1, *latlng))
+    return coords
 
-RENT_COMPS_STUDIO = [
-    {"addr": "247 S Alexandria Ave", "rent": 1395, "reno": "Classic", "dist": "0.5 mi", "features": "Marble tile, SS appliances, hardwood"},
-    {"addr": "326 S Normandie Ave", "rent": 1445, "reno": "Classic", "dist": "0.8 mi", "features": "Granite counters, exposed brick"},
-    {"addr": "520 S Mariposa Ave", "rent": 1425, "reno": "Classic", "dist": "0.9 mi", "features": "Renovated, appliances included"},
-    {"addr": "739 S Normandie Ave", "rent": 1425, "reno": "Classic", "dist": "1.1 mi", "features": "Spacious renovated studio"},
-    {"addr": "516 S St Andrews Pl", "rent": 1395, "reno": "Classic", "dist": "0.9 mi", "features": "Built-in shelving, charming kitchen"},
-    {"addr": "132 Westmoreland Ave", "rent": 1425, "reno": "Classic", "dist": "0.5 mi", "features": "Updated kitchen + bath"},
-]
+SALE_COMP_COORDS = comp_coords(SALE_COMPS)
+ACTIVE_COMP_COORDS = comp_coords(ACTIVE_COMPS)
+RENT_COMP_COORDS = comp_coords(RENT_COMPS_2BR + RENT_COMPS_STUDIO)
+
+print("Generating static maps for PDF...")
+TILE_CACHE = TileCache(os.path.join(CACHE_DIR, "tiles"), ttl_days=TILE_CACHE_TTL_DAYS,
+                       max_bytes=TILE_CACHE_MAX_MB * 1024 * 1024)
+TILE_FETCHER = open_tile_source(STATIC_MAP_TILE_SOURCE, TILE_CACHE, offline=STATIC_MAP_OFFLINE)
+MAP_RENDER_CACHE = MapRenderCache(os.path.join(CACHE_DIR, "static-maps"), ttl_days=TILE_CACHE_TTL_DAYS)
+map_session = StaticMapSession(TILE_FETCHER, memo=MAP_RENDER_CACHE)
+map_session.add("sale", SALE_COMP_COORDS, (SUBJECT_LAT, SUBJECT_LNG))
+map_session.add("active", ACTIVE_COMP_COORDS, (SUBJECT_LAT, SUBJECT_LNG))
+map_session.add("rent", RENT_COMP_COORDS, (SUBJECT_LAT, SUBJECT_LNG))
+static_maps = map_session.render_all()
+STATIC_MAP_SALE = static_maps["sale"]
+STATIC_MAP_ACTIVE = static_maps["active"]
+STATIC_MAP_RENT = static_maps["rent"]
+MAP_RENDER_CACHE.evict()
+print(f"Static maps: {MAP_RENDER_CACHE.hits} reused, {map_session.rendered} rendered")
+if isinstance(TILE_FETCHER, TileFetcher):
+    TILE_CACHE.evict()
+    print(f"Tile cache: {TILE_CACHE.hits} fresh hits, {TILE_CACHE.stale_hits} stale hits, "
+          f"{TILE_FETCHER.downloaded} downloaded, {map_session.tiles_decoded} decoded into shared mosaic"
+          f"{' (offline)' if STATIC_MAP_OFFLINE else ''}")
+else:
+    print(f"Local tiles: {TILE_FETCHER.read} read from {STATIC_MAP_TILE_SOURCE}, "
+          f"{map_session.tiles_decoded} decoded into shared mosaic")
+if TILE_FETCHER.missing:
+    shown = ", ".join(f"{z}/{x}/{y}" for z, x, y in TILE_FETCHER.missing[:5])
+    print(f"WARNING: {len(TILE_FETCHER.missing)} map tiles unavailable, static maps have gray gaps ({shown}"
+          f"{', ...' if len(TILE_FETCHER.missing) > 5 else ''})")
+    if TILE_FETCHER.unreachable:
+        print(f"  Tile server unreachable: {', '.join(sorted(TILE_FETCHER.unreachable))}")
 
 # ============================================================
 # OPERATING STATEMENT DATA
 # ============================================================
-TAXES_AT_LIST = LIST_PRICE * TAX_RATE
-CUR_EGI = GSR * (1 - VACANCY_PCT) + OTHER_INCOME
-PF_EGI = PF_GSR * (1 - VACANCY_PCT) + OTHER_INCOME
-CUR_MGMT = max(CUR_EGI * 0.04, 18000)
-PF_MGMT = max(PF_EGI * 0.04, 18000)
-CUR_TOTAL_EXP = TAXES_AT_LIST + NON_TAX_CUR_EXP
-PF_TOTAL_EXP = TAXES_AT_LIST + NON_TAX_PF_EXP
-CUR_NOI_AT_LIST = CUR_EGI - CUR_TOTAL_EXP
-PF_NOI_AT_LIST = PF_EGI - PF_TOTAL_EXP
+# At-list figures come straight from the AT_LIST metrics node, so they can never
+# drift from calc_metrics / the pricing engine.
+@MODEL.node("at_list")
+def taxes_at_list(m): return m["taxes"]
+@MODEL.node("at_list")
+def cur_egi(m): return m["cur_egi"]
+@MODEL.node("at_list")
+def pf_egi(m): return m["pf_egi"]
+@MODEL.node("at_list")
+def cur_total_exp(m): return m["cur_exp"]
+@MODEL.node("at_list")
+def pf_total_exp(m): return m["pf_exp"]
+@MODEL.node("at_list")
+def cur_noi_at_list(m): return m["cur_noi"]
+@MODEL.node("at_list")
+def pf_noi_at_list(m): return m["pf_noi"]
+@MODEL.node("cur_egi")
+def cur_mgmt(egi): return max(egi * 0.04, 18000)
+@MODEL.node("pf_egi")
+def pf_mgmt(egi): return max(egi * 0.04, 18000)
+
+TAXES_AT_LIST = MODEL["taxes_at_list"]
+CUR_EGI = MODEL["cur_egi"]
+PF_EGI = MODEL["pf_egi"]
+CUR_MGMT = MODEL["cur_mgmt"]
+PF_MGMT = MODEL["pf_mgmt"]
+CUR_TOTAL_EXP = MODEL["cur_total_exp"]
+PF_TOTAL_EXP = MODEL["pf_total_exp"]
+CUR_NOI_AT_LIST = MODEL["cur_noi_at_list"]
+PF_NOI_AT_LIST = MODEL["pf_noi_at_list"]
 
 EXPENSE_ITEMS = [
     ("Real Estate Taxes", TAXES_AT_LIST, 2),
@@ -364,56 +729,304 @@ EXPENSE_ITEMS = [
     ("Other", 250, 14),
 ]
 
+# ============================================================
+# MONTE CARLO SIMULATION
+# ============================================================
+# Vacancy and exit cap come from the base case; the rest are the sampled distributions
+SIMULATION_MARKET = {
+    "rent_growth": 0.03, "rent_growth_sd": 0.02,
+    "turnover": 0.15, "rso_increase": 0.03,
+    "vacancy_sd": 0.02,
+    "expense_growth": 0.03, "expense_growth_sd": 0.01,
+    "exit_cap_sd": 0.005,
+}
+MODEL.inputs(rent_roll=RENT_ROLL, enable_simulation=ENABLE_SIMULATION and HAVE_NUMPY,
+             simulation_market=SIMULATION_MARKET, simulation_paths=SIMULATION_PATHS,
+             simulation_seed=SIMULATION_SEED)
+
+@MODEL.node("simulation_market", "vacancy_pct", "dcf_assumptions", persist=False)
+def sim_market(market, vacancy_pct, dcf):
+    return MarketAssumptions(vacancy=vacancy_pct, exit_cap=dcf.exit_cap, **market) if dcf else None
+
+@MODEL.node("list_price", "at_list", "interest_rate", "amortization_years", "loan_term_years", "rent_roll",
+            "other_income", "non_tax_cur_exp", "tax_rate", "dcf_assumptions", persist=False)
+def sim_deal(list_price, at_list, interest_rate, amortization_years, hold_years, rent_roll,
+             other_income, non_tax_exp, tax_rate, dcf):
+    if dcf is None:
+        return None
+    roll = RentRoll.from_rows(rent_roll)
+    return DealInputs(
+        price=list_price, loan_amount=at_list["loan_amount"],
+        interest_rate=interest_rate, amortization_years=amortization_years, hold_years=hold_years,
+        current_rents=tuple(roll.current.tolist()), market_rents=tuple(roll.market.tolist()),
+        other_income=other_income, non_tax_expenses=non_tax_exp, tax_rate=tax_rate,
+        tax_growth=dcf.tax_growth, selling_costs=dcf.selling_costs,
+    )
+
+@MODEL.node("enable_simulation", "sim_deal", "sim_market", "simulation_paths", "simulation_seed")
+def simulation_bands(enabled, deal, market, paths, seed):
+    """5th/25th/50th/75th/95th percentiles of each simulated metric (None when disabled)."""
+    if not enabled:
+        return None
+    result = run_simulation(deal, market, paths=paths, workers=SIMULATION_WORKERS, seed=seed)
+    print(f"Monte Carlo: {result.paths:,} paths in {result.seconds:.2f}s "
+          f"({result.paths_per_sec:,.0f} paths/sec, {result.workers} worker{'s' if result.workers != 1 else ''}), "
+          f"median IRR {result.percentiles('irr', [50])[0]:.1f}%")
+    return {"paths": result.paths, "total_loss": int((result.metrics["irr"] == -100).sum()),
+            "irr_excluded": result.excluded("irr"),
+            **{k: result.percentiles(k).tolist() for k in ("noi", "cash_flow", "exit_value", "irr", "equity_multiple")}}
+
+if ENABLE_SIMULATION and not HAVE_NUMPY:
+    print("WARNING: numpy not installed. Skipping Monte Carlo downside analysis. Install with: pip install numpy")
+
 # ============================================================
 # HELPER FUNCTIONS
 # ============================================================
-def fc(n):
-    if n is None: return "n/a"
-    return f"${n:,.0f}"
-def fp(n):
-    if n is None: return "n/a"
-    return f"{n:.2f}%"
+SUBJECT_MAP_POPUP = "<b>500 N Alexandria Ave</b><br>Subject Property<br>7 Units | 4,360 SF"
 
-def build_map_js(map_id, comps, comp_color, subject_lat, subject_lng):
-    js = f"var {map_id} = L.map('{map_id}').setView([{subject_lat}, {subject_lng}], 14);\n"
-    js += f"L.tileLayer('https://{{s}}.tile.openstreetmap.org/{{z}}/{{x}}/{{y}}.png', {{attribution: '&copy; OpenStreetMap'}}).addTo({map_id});\n"
-    js += f"""L.marker([{subject_lat}, {subject_lng}], {{icon: L.divIcon({{className: 'custom-marker', html: '<div style="background:#C5A258;color:#fff;border-radius:50%;width:32px;height:32px;display:flex;align-items:center;justify-content:center;font-weight:700;font-size:14px;border:2px solid #fff;box-shadow:0 2px 6px rgba(0,0,0,0.3);">&#9733;</div>', iconSize: [32, 32], iconAnchor: [16, 16]}})}})\n.addTo({map_id}).bindPopup('<b>500 N Alexandria Ave</b><br>Subject Property<br>7 Units | 4,360 SF');\n"""
+def comp_map_points(comps):
+    """(lat, lng, label, popup) for each geocoded comp; labels are list positions, as in the comp tables."""
+    points = []
     for i, c in enumerate(comps):
-        lat, lng = None, None
-        for a, coords in ADDRESSES.items():
-            if c["addr"].lower() in a.lower() and coords:
-                lat, lng = coords
-                break
-        if lat is None: continue
-        label = str(i + 1)
-        popup = f"<b>#{label}: {c['addr']}</b><br>{c.get('units', '')} Units | {fc(c.get('price', 0))}"
-        js += f"""L.marker([{lat}, {lng}], {{icon: L.divIcon({{className: 'custom-marker', html: '<div style="background:{comp_color};color:#fff;border-radius:50%;width:26px;height:26px;display:flex;align-items:center;justify-content:center;font-weight:700;font-size:12px;border:2px solid #fff;box-shadow:0 2px 4px rgba(0,0,0,0.3);">{label}</div>', iconSize: [26, 26], iconAnchor: [13, 13]}})}})\n.addTo({map_id}).bindPopup('{popup}');\n"""
-    return js
-
-sale_map_js = build_map_js("saleMap", SALE_COMPS, "#1B3A5C", SUBJECT_LAT, SUBJECT_LNG)
-active_map_js = build_map_js("activeMap", ACTIVE_COMPS, "#2E7D32", SUBJECT_LAT, SUBJECT_LNG)
+        latlng = ADDRESS_INDEX.lookup(c["addr"])
+        if latlng is None: continue
+        popup = f"<b>#{i + 1}: {c['addr']}</b><br>{c.get('units', '')} Units | {fc(c.get('price', 0))}"
+        points.append((*latlng, i + 1, popup))
+    return points
+
 rent_comps_for_map = [{"addr": c["addr"], "price": 0, "units": ""} for c in RENT_COMPS_2BR + RENT_COMPS_STUDIO]
-rent_map_js = build_map_js("rentMap", rent_comps_for_map, "#1B3A5C", SUBJECT_LAT, SUBJECT_LNG)
+COMP_MAPS = [
+    map_layer("saleMap", comp_map_points(SALE_COMPS), "#1B3A5C", (SUBJECT_LAT, SUBJECT_LNG), SUBJECT_MAP_POPUP),
+    map_layer("activeMap", comp_map_points(ACTIVE_COMPS), "#2E7D32", (SUBJECT_LAT, SUBJECT_LNG), SUBJECT_MAP_POPUP),
+    map_layer("rentMap", comp_map_points(rent_comps_for_map), "#1B3A5C", (SUBJECT_LAT, SUBJECT_LNG), SUBJECT_MAP_POPUP),
+]
 
 # ============================================================
 # COMP NARRATIVES
 # ============================================================
-COMP_NARRATIVES = [
-    """<p><strong>101 S Kenmore Ave (8 units, $1,595,000, 07/2025):</strong> The anchor comparable and highest-quality data point in the comp set. This 1925-vintage 8-unit building features all one-bedroom units under RSO with on-site laundry. At $199,375/unit with a 7.29% adjusted cap rate, it establishes the premium end of the market for well-maintained vintage RSO buildings in the 90004 zip code. The strong cap rate reflects reliable income documentation and stabilized operations. The subject at $182,143/unit represents an 8.6% discount to this benchmark, an appropriate adjustment for the smaller building size (7 vs 8 units), mixed unit types, and limited parking. Sold at 94.1% SP/LP, this comp confirms approximately 3-6% negotiation from list price in the current market.</p>""",
-    """<p><strong>212 S Berendo St (8 units, $1,525,000, 08/2025):</strong> An 8-unit building composed entirely of 2-bedroom units, making it the closest unit-mix match to the subject's 2BR-heavy configuration. Built in 1923  -  the same year as the subject's front building  -  this comp traded at $190,625/unit with a deeply compressed 4.15% cap rate. The low cap reflects 108% rent upside embedded in deeply below-market RSO leases, demonstrating that buyers willingly accept lower current yields when the embedded upside is substantial and clearly documented. Purchased by a 1031 exchange buyer, confirming the active exchange market at this price point. The subject offers a more balanced risk-return profile: higher current yield (5.48% cap) with a more moderate 18.5% rent upside. Sold at 90.8% SP/LP after significant negotiation.</p>""",
-    """<p><strong>247 N New Hampshire Ave (12 units, $1,400,000, 08/2025):</strong> An off-market sale of 12 studios with unreliable financial data. At $116,667/unit, this represents the floor of the comp range and reflects the significant discount applied to studio-heavy buildings with limited income transparency. The off-market nature (100% SP/LP) suggests a relationship sale or principal-to-principal transaction. While the per-unit price is dramatically below the subject's $182,143, the comparison is of limited direct relevance due to the fundamentally different unit mix (100% studios vs. subject's 57% 2BR / 29% studio / 14% ADU) and the absence of verifiable income data. This comp serves primarily as a floor reference.</p>""",
-    """<p><strong>143 N Commonwealth Ave (6 units, $1,425,000, 01/2026):</strong> A DISTRESSED sale through auction/trust with an SP/LP ratio of just 79.2%, indicating significant negotiation from the original ask. The 1951 vintage is newer than the subject (1923/1929), and the $237,500/unit price is the highest in the comp set  -  but the distressed circumstances and smaller unit count (6 units) make it an outlier. The absence of verifiable cap rate or financial data limits its analytical utility. This comp is used as a ceiling reference for distressed pricing, demonstrating that even under duress, Koreatown multifamily commands $237K+ per unit for post-war product. The subject's non-distressed, fully occupied positioning supports a more favorable marketing outcome.</p>""",
-]
+# Keyed by comp address; rendered in sale comp order, and only for comps in the set
+COMP_NARRATIVES = {
+    "101 S Kenmore Ave": """<p><strong>101 S Kenmore Ave (8 units, $1,595,000, 07/2025):</strong> The anchor comparable and highest-quality data point in the comp set. This 1925-vintage 8-unit building features all one-bedroom units under RSO with on-site laundry. At $199,375/unit with a 7.29% adjusted cap rate, it establishes the premium end of the market for well-maintained vintage RSO buildings in the 90004 zip code. The strong cap rate reflects reliable income documentation and stabilized operations. The subject at $182,143/unit represents an 8.6% discount to this benchmark, an appropriate adjustment for the smaller building size (7 vs 8 units), mixed unit types, and limited parking. Sold at 94.1% SP/LP, this comp confirms approximately 3-6% negotiation from list price in the current market.</p>""",
+    "212 S Berendo St": """<p><strong>212 S Berendo St (8 units, $1,525,000, 08/2025):</strong> An 8-unit building composed entirely of 2-bedroom units, making it the closest unit-mix match to the subject's 2BR-heavy configuration. Built in 1923  -  the same year as the subject's front building  -  this comp traded at $190,625/unit with a deeply compressed 4.15% cap rate. The low cap reflects 108% rent upside embedded in deeply below-market RSO leases, demonstrating that buyers willingly accept lower current yields when the embedded upside is substantial and clearly documented. Purchased by a 1031 exchange buyer, confirming the active exchange market at this price point. The subject offers a more balanced risk-return profile: higher current yield (5.48% cap) with a more moderate 18.5% rent upside. Sold at 90.8% SP/LP after significant negotiation.</p>""",
+    "247 N New Hampshire Ave": """<p><strong>247 N New Hampshire Ave (12 units, $1,400,000, 08/2025):</strong> An off-market sale of 12 studios with unreliable financial data. At $116,667/unit, this represents the floor of the comp range and reflects the significant discount applied to studio-heavy buildings with limited income transparency. The off-market nature (100% SP/LP) suggests a relationship sale or principal-to-principal transaction. While the per-unit price is dramatically below the subject's $182,143, the comparison is of limited direct relevance due to the fundamentally different unit mix (100% studios vs. subject's 57% 2BR / 29% studio / 14% ADU) and the absence of verifiable income data. This comp serves primarily as a floor reference.</p>""",
+    "143 N Commonwealth Ave": """<p><strong>143 N Commonwealth Ave (6 units, $1,425,000, 01/2026):</strong> A DISTRESSED sale through auction/trust with an SP/LP ratio of just 79.2%, indicating significant negotiation from the original ask. The 1951 vintage is newer than the subject (1923/1929), and the $237,500/unit price is the highest in the comp set  -  but the distressed circumstances and smaller unit count (6 units) make it an outlier. The absence of verifiable cap rate or financial data limits its analytical utility. This comp is used as a ceiling reference for distressed pricing, demonstrating that even under duress, Koreatown multifamily commands $237K+ per unit for post-war product. The subject's non-distressed, fully occupied positioning supports a more favorable marketing outcome.</p>""",
+}
 
 # ============================================================
 # GENERATE DYNAMIC TABLE HTML
 # ============================================================
 
 # Pricing matrix
-matrix_html = ""
-for m in MATRIX:
-    cls = ' class="highlight"' if m["price"] == LIST_PRICE else ""
-    matrix_html += f'<tr{cls}><td class="num">{fc(m["price"])}</td><td class="num">{fp(m["cur_cap"])}</td><td class="num">{fp(m["pf_cap"])}</td><td class="num">{fp(m["coc_cur"])}</td><td class="num">${m["per_sf"]:.0f}</td><td class="num">{fc(m["per_unit"])}</td><td class="num">{m["pf_grm"]:.2f}x</td></tr>\n'
+@MODEL.node("matrix", "list_price", "dcf_assumptions")
+def matrix_table(matrix, list_price, dcf):
+    rows = ""
+    for m in matrix:
+        cls = ' class="highlight"' if m["price"] == list_price else ""
+        irr_cells = f'<td class="num">{fp(m["levered_irr"])}</td><td class="num">{fp(m["unlevered_irr"])}</td>' if dcf else ""
+        rows += f'<tr{cls}><td class="num">{fc(m["price"])}</td><td class="num">{fp(m["cur_cap"])}</td><td class="num">{fp(m["pf_cap"])}</td><td class="num">{fp(m["coc_cur"])}</td>{irr_cells}<td class="num">${m["per_sf"]:.0f}</td><td class="num">{fc(m["per_unit"])}</td><td class="num">{m["pf_grm"]:.2f}x</td></tr>\n'
+    irr_head = f'<th class="num">{dcf.hold_years}-Yr Levered IRR</th><th class="num">Unlevered IRR</th>' if dcf else ""
+    irr_note = (f" IRRs assume a {dcf.hold_years}-year hold on in-place rents with {dcf.rent_growth:.0%} rent and "
+                f"{dcf.expense_growth:.0%} expense growth, sale at a {dcf.exit_cap:.2%} cap on forward NOI "
+                f"less {dcf.selling_costs:.0%} costs and the loan balloon." if dcf else "")
+    return {"rows": rows, "irr_head": irr_head, "irr_note": irr_note}
+
+matrix_html = MODEL["matrix_table"]["rows"]
+matrix_irr_head = MODEL["matrix_table"]["irr_head"]
+matrix_irr_note = MODEL["matrix_table"]["irr_note"]
+
+# Pricing guidance (goal-seek results)
+@MODEL.node("pricing_guidance", "list_price")
+def guidance_html(guidance, list_price):
+    if not guidance:
+        return ""
+    rows = ""
+    for g in guidance:
+        target = f"{g['target']:.2f}x" if g["kind"] == "x" else fp(g["target"])
+        m = g["metrics"]
+        if m is None:
+            rows += f'<tr><td>{g["label"]} of {target}</td><td class="num" colspan="6">Not attainable under current financing terms</td></tr>\n'
+            continue
+        vs_list = (m["price"] / list_price - 1) * 100
+        rows += (f'<tr><td>{g["label"]} of {target}</td><td class="num">{fc(m["price"])}</td><td class="num">{vs_list:+.1f}%</td>'
+                 f'<td class="num">{fc(m["per_unit"])}</td><td class="num">{fp(m["cur_cap"])}</td>'
+                 f'<td class="num">{fp(m["coc_cur"])}</td><td class="num">{m["dcr_cur"]:.2f}x</td></tr>\n')
+    return f"""
+<h3 class="sub-heading">Pricing Guidance</h3>
+<p style="font-size:12px;color:#666;margin-bottom:12px;"><em>Exact purchase price at which each return target is met, solved from the same tax-adjusted model and financing terms as the pricing matrix.</em></p>
+<div class="table-scroll"><table>
+<thead><tr><th>Target</th><th class="num">Purchase Price</th><th class="num">vs. List</th><th class="num">$/Unit</th><th class="num">Current Cap</th><th class="num">Cash-on-Cash</th><th class="num">DCR</th></tr></thead>
+<tbody>{rows}</tbody>
+</table></div>
+"""
+
+guidance_html = MODEL["guidance_html"]
+
+# Sensitivity slice (server-rendered default: price x interest rate at the base assumptions)
+@MODEL.node("sensitivity_grid", "sensitivity_metrics", "list_price", "interest_rate", "vacancy_pct", "max_ltv", "min_dcr")
+def sensitivity_html(grid, metrics, list_price, interest_rate, vacancy_pct, max_ltv, min_dcr):
+    if grid is None:
+        return ""
+    axis_labels = {"price": "Purchase Price", "interest_rate": "Interest Rate",
+                   "vacancy_pct": "Vacancy", "max_ltv": "Max LTV", "min_dcr": "Min DCR"}
+
+    def fmt_axis(axis, v):
+        if axis == "price": return fc(v)
+        if axis == "min_dcr": return f"{v:.2f}x"
+        return f"{v * 100:.1f}%"
+
+    def fmt_metric(kind, v):
+        if kind == "usd": return fc(v)
+        if kind == "x": return f"{v:.2f}x"
+        return fp(v)
+
+    base = {"interest_rate": interest_rate, "vacancy_pct": vacancy_pct, "max_ltv": max_ltv, "min_dcr": min_dcr}
+    metric = next(iter(metrics))
+    values = grid.slice(metric, "price", "interest_rate", **base)
+    head = "".join(f'<th class="num">{fmt_axis("interest_rate", v)}</th>' for v in grid.axes["interest_rate"])
+    rows = ""
+    for i, price in enumerate(grid.axes["price"]):
+        cls = ' class="highlight"' if price == list_price else ""
+        cells = "".join(f'<td class="num">{fmt_metric(metrics[metric][1], v)}</td>' for v in values[i])
+        rows += f'<tr{cls}><td class="num">{fc(price)}</td>{cells}</tr>\n'
+    metric_opts = "".join(f'<option value="{k}">{label}</option>' for k, (label, _) in metrics.items())
+    col_opts = "".join(f'<option value="{a}"{" selected" if a == "interest_rate" else ""}>{axis_labels[a]}</option>'
+                       for a in grid.axes if a != "price")
+    fixed_selects = ""
+    for axis, axis_values in grid.axes.items():
+        if axis == "price":
+            continue
+        base_idx = grid.index(axis, base[axis])
+        opts = "".join(f'<option value="{j}"{" selected" if j == base_idx else ""}>{fmt_axis(axis, v)}</option>' for j, v in enumerate(axis_values))
+        fixed_selects += f'<label data-axis="{axis}"{" hidden" if axis == "interest_rate" else ""}>{axis_labels[axis]} <select data-fixed="{axis}">{opts}</select></label>'
+    data = {"table": grid.to_table(list(metrics), decimals=6), "list_price": list_price,
+            "formats": {k: kind for k, (_, kind) in metrics.items()}}
+    return f"""
+<h3 class="sub-heading">Sensitivity Analysis</h3>
+<p style="font-size:12px;color:#666;margin-bottom:12px;"><em>Each cell re-runs the pricing model at that purchase price and assumption. Choose the metric, the assumption across the columns, and hold the remaining assumptions at the values selected; defaults are the base case.</em></p>
+<div class="sens-controls">
+<label>Metric <select id="sens-metric">{metric_opts}</select></label>
+<label>Columns <select id="sens-cols">{col_opts}</select></label>
+{fixed_selects}
+</div>
+<div class="table-scroll"><table id="sens-table">
+<thead><tr><th class="num">Purchase Price</th>{head}</tr></thead>
+<tbody>{rows}</tbody>
+</table></div>
+<script type="application/json" id="sens-data">{json.dumps(data, separators=(",", ":"))}</script>
+"""
+
+sensitivity_html = MODEL["sensitivity_html"]
+
+# Monte Carlo percentile bands
+@MODEL.node("simulation_bands", "sim_market", "dcf_assumptions")
+def simulation_html(bands, market, dcf):
+    if bands is None:
+        return ""
+    rows = ""
+    for y, noi in enumerate(zip(*bands["noi"])):
+        rows += f'<tr><td>Year {y + 1} NOI</td>' + "".join(f'<td class="num">{fc(v)}</td>' for v in noi) + '</tr>\n'
+    for y, cf in enumerate(zip(*bands["cash_flow"])):
+        rows += f'<tr><td>Year {y + 1} Cash Flow</td>' + "".join(f'<td class="num">{fc(v)}</td>' for v in cf) + '</tr>\n'
+    rows += '<tr><td>Exit Value</td>' + "".join(f'<td class="num">{fc(v)}</td>' for v in bands["exit_value"]) + '</tr>\n'
+    rows += '<tr class="highlight"><td>Levered IRR</td>' + "".join(f'<td class="num">{fp(v)}</td>' for v in bands["irr"]) + '</tr>\n'
+    rows += '<tr><td>Equity Multiple</td>' + "".join(f'<td class="num">{v:.2f}x</td>' for v in bands["equity_multiple"]) + '</tr>\n'
+    irr_note = ""
+    if bands["total_loss"]:
+        irr_note += f' {bands["total_loss"]:,} scenarios lose all equity and count as a -100% IRR.'
+    if bands["irr_excluded"]:
+        irr_note += f' {bands["irr_excluded"]:,} scenarios have no defined IRR and are excluded from the IRR percentiles.'
+    return f"""
+<h3 class="sub-heading">Downside Analysis ({dcf.hold_years}-Year Hold, {bands["paths"]:,} Scenarios)</h3>
+<p style="font-size:12px;color:#666;margin-bottom:12px;"><em>Monte Carlo simulation at the list price and proposed financing. Each scenario samples market rent growth ({market.rent_growth:.0%} &plusmn; {market.rent_growth_sd:.0%}), annual unit turnover ({market.turnover:.0%}; turned units mark to market, in-place tenants receive {market.rso_increase:.0%} RSO increases), vacancy ({market.vacancy:.0%} &plusmn; {market.vacancy_sd:.0%}), expense growth ({market.expense_growth:.0%} &plusmn; {market.expense_growth_sd:.0%}) and exit cap rate ({market.exit_cap:.2%} &plusmn; {market.exit_cap_sd:.2%}). Sale net of {dcf.selling_costs:.0%} costs and loan payoff.{irr_note}</em></p>
+<div class="table-scroll"><table>
+<thead><tr><th></th><th class="num">5th Pct</th><th class="num">25th Pct</th><th class="num">Median</th><th class="num">75th Pct</th><th class="num">95th Pct</th></tr></thead>
+<tbody>{rows}</tbody>
+</table></div>
+"""
+
+simulation_html = MODEL["simulation_html"]
+
+# Live pricing calculator (server-rendered at the base case; re-rendered in the browser on slider input)
+@MODEL.node("live_calculator", "matrix", "at_list", "calculator_summary", "calculator_matrix")
+def calculator_html(payload, matrix, at_list, summary_rows, matrix_columns):
+    def fmt(kind, v):
+        if kind == "usd": return fc(v)
+        if kind == "x": return f"{v:.2f}x"
+        if kind == "ltv": return f"{v * 100:.1f}%"
+        return fp(v)
+
+    sliders = ""
+    for key, label, value, kind in (("price", "Purchase Price", payload["list_price"], "usd"),
+                                    ("interest_rate", "Interest Rate", payload["a"]["interest_rate"], "rate"),
+                                    ("max_ltv", "Max LTV", payload["a"]["max_ltv"], "ltv")):
+        lo, hi, step = payload["sliders"][key]
+        shown = fc(value) if kind == "usd" else f"{value * 100:.{3 if kind == 'rate' else 0}f}%"
+        sliders += (f'<label>{label} <output id="calc-{key}-value">{shown}</output>'
+                    f'<input type="range" id="calc-{key}" min="{lo}" max="{hi}" step="{step}" value="{value}"></label>')
+    summary = "".join(f'<tr><td>{label}</td><td class="num" data-calc="{key}" data-kind="{kind}">{fmt(kind, at_list[key])}</td></tr>'
+                      for label, key, kind in summary_rows)
+    head = "".join(f'<th class="num">{label}</th>' for label, _, _ in matrix_columns)
+    rows = ""
+    for m in matrix:
+        cls = ' class="highlight"' if m["price"] == payload["list_price"] else ""
+        cells = "".join(f'<td class="num">{fmt(kind, m[key])}</td>' for _, key, kind in matrix_columns)
+        rows += f'<tr{cls}><td class="num">{fc(m["price"])}</td>{cells}</tr>\n'
+    columns = [[key, kind] for _, key, kind in matrix_columns]
+    return f"""
+<h3 class="sub-heading">Live Pricing Calculator</h3>
+<p style="font-size:12px;color:#666;margin-bottom:12px;"><em>Move the sliders to re-price the deal: loan sizing (the lesser of the LTV limit and a {payload["a"]["min_dcr"]:.2f}x DCR), cash flow and returns are recalculated instantly with the same tax-adjusted model as the pricing matrix.</em></p>
+<div class="calc-controls">{sliders}</div>
+<div class="table-scroll"><table id="calc-summary">
+<thead><tr><th>At Selected Price</th><th class="num">Value</th></tr></thead>
+<tbody>{summary}</tbody>
+</table></div>
+<div class="table-scroll"><table id="calc-matrix">
+<thead><tr><th class="num">Purchase Price</th>{head}</tr></thead>
+<tbody>{rows}</tbody>
+</table></div>
+<script type="application/json" id="calc-data">{json.dumps({**payload, "columns": columns}, separators=(",", ":"))}</script>
+"""
+
+calculator_html = MODEL["calculator_html"]
+
+# Debt product comparison
+@MODEL.node("debt_comparison", "list_price", "matrix_prices")
+def debt_html(comparison, list_price, matrix_prices):
+    if comparison is None:
+        return ""
+    at = comparison["prices"].index(list_price)
+    rows = ""
+    for d in comparison["products"]:
+        terms = f'{d["interest_rate"] * 100:.2f}% / {d["amortization_years"]}-yr amort / {d["term_years"]}-yr term'
+        if d.get("io_years"):
+            terms += f' / {d["io_years"]}-yr I/O'
+        carry = fc(d["seller_carry"][at]) if d["seller_carry"][at] else "-"
+        rows += (f'<tr><td>{d["name"]}<br><span style="font-size:11px;color:#666;">{terms}</span></td>'
+                 f'<td class="num">{fc(d["loan_amount"][at])}</td><td class="num">{d["loan_constraint"][at]}</td>'
+                 f'<td class="num">{carry}</td><td class="num">{fc(d["down_payment"][at])}</td>'
+                 f'<td class="num">{fc(d["debt_service"][at])}</td><td class="num">{fp(d["coc_cur"][at])}</td>'
+                 f'<td class="num">{d["dcr_cur"][at]:.2f}x</td><td class="num">{fc(d["balloon"][at])}</td></tr>\n')
+    head = "".join(f'<th class="num">{d["name"]}</th>' for d in comparison["products"])
+    coc_rows = ""
+    for i, price in enumerate(comparison["prices"]):
+        if price not in matrix_prices:
+            continue
+        cls = ' class="highlight"' if price == list_price else ""
+        coc_rows += f'<tr{cls}><td class="num">{fc(price)}</td>' + "".join(f'<td class="num">{fp(d["coc_cur"][i])}</td>' for d in comparison["products"]) + '</tr>\n'
+    return f"""
+<h3 class="sub-heading">Financing Alternatives</h3>
+<p style="font-size:12px;color:#666;margin-bottom:12px;"><em>Each program sized at the {fc(list_price)} list price: the loan is the lesser of the LTV limit and the amount supported at the minimum DCR on the amortizing payment (the binding constraint is shown). Interest-only programs carry interest-only debt service in year 1; seller carry-back is an interest-only second due at term. Debt service, DCR and balloon include both liens.</em></p>
+<div class="table-scroll"><table>
+<thead><tr><th>Program</th><th class="num">Loan Amount</th><th class="num">Constraint</th><th class="num">Seller Carry</th><th class="num">Down Payment</th><th class="num">Debt Service (Yr 1)</th><th class="num">Cash-on-Cash</th><th class="num">DCR</th><th class="num">Balloon</th></tr></thead>
+<tbody>{rows}</tbody>
+</table></div>
+<div class="table-scroll"><table>
+<thead><tr><th class="num">Cash-on-Cash by Price</th>{head}</tr></thead>
+<tbody>{coc_rows}</tbody>
+</table></div>
+"""
+
+debt_html = MODEL["debt_html"]
 
 # Summary page expense rows (at list price, Current vs Pro Forma)
 sum_taxes = AT_LIST['taxes']
@@ -437,85 +1050,90 @@ for label, cur_val, pf_val in sum_expense_items:
     sum_expense_html += f'<tr><td>{label}</td><td class="num">${cur_val:,.0f}</td><td class="num">${pf_val:,.0f}</td></tr>\n'
 
 # Unit summary for summary page (aggregated from rent roll)
-br2_units = [(u, s, c, m) for u, t, s, c, m in RENT_ROLL if t == "2BR/1BA"]
-studio_units = [(u, s, c, m) for u, t, s, c, m in RENT_ROLL if t == "Studio"]
-adu_units = [(u, s, c, m) for u, t, s, c, m in RENT_ROLL if t == "ADU"]
-br2_avg_cur = sum(c for _, _, c, _ in br2_units) / len(br2_units) if br2_units else 0
-br2_avg_mkt = sum(m for _, _, _, m in br2_units) / len(br2_units) if br2_units else 0
-studio_avg_cur = sum(c for _, _, c, _ in studio_units) / len(studio_units) if studio_units else 0
-studio_avg_mkt = sum(m for _, _, _, m in studio_units) / len(studio_units) if studio_units else 0
-adu_avg_cur = sum(c for _, _, c, _ in adu_units) / len(adu_units) if adu_units else 0
-adu_avg_mkt = sum(m for _, _, _, m in adu_units) / len(adu_units) if adu_units else 0
+unit_summary_html = ""
+for utype, g in ROLL.by_type.items():
+    unit_summary_html += f'<tr><td>{UNIT_TYPE_LABELS.get(utype, utype)}</td><td class="num">{g.count}</td><td class="num">{g.avg_sf:,.0f}</td><td class="num">${g.avg_current:,.0f}</td><td class="num">${g.avg_market:,.0f}</td></tr>\n'
 
 # Rent roll
 rent_roll_html = ""
-total_sf = total_cur = total_mkt = 0
-for unit, utype, sqft, cur, mkt in RENT_ROLL:
-    rent_roll_html += f"<tr><td>{unit}</td><td>{utype}</td><td>{sqft:,}</td><td>${cur:,}</td><td>${cur/sqft:.2f}</td><td>${mkt:,}</td><td>${mkt/sqft:.2f}</td></tr>\n"
-    total_sf += sqft; total_cur += cur; total_mkt += mkt
-rent_roll_html += f'<tr style="font-weight:700;background:#1B3A5C;color:#fff;"><td>TOTAL</td><td>7 Units</td><td>{total_sf:,}</td><td>${total_cur:,}</td><td>${total_cur/total_sf:.2f}</td><td>${total_mkt:,}</td><td>${total_mkt/total_sf:.2f}</td></tr>'
+for (unit, utype, sqft, cur, mkt), cur_psf, mkt_psf in zip(ROLL.rows(), ROLL.current_psf, ROLL.market_psf):
+    rent_roll_html += f"<tr><td>{unit}</td><td>{utype}</td><td>{sqft:,.0f}</td><td>${cur:,.0f}</td><td>${cur_psf:.2f}</td><td>${mkt:,.0f}</td><td>${mkt_psf:.2f}</td></tr>\n"
+t = ROLL.totals
+rent_roll_html += f'<tr style="font-weight:700;background:#1B3A5C;color:#fff;"><td>TOTAL</td><td>{t.count} Units</td><td>{t.sf:,.0f}</td><td>${t.current:,.0f}</td><td>${t.current_psf:.2f}</td><td>${t.market:,.0f}</td><td>${t.market_psf:.2f}</td></tr>'
+print(f"Rent roll: {t.count} units, ${t.current:,.0f}/mo in place, ${t.upside:,.0f}/mo ({t.upside_pct:.1f}%) mark-to-market upside")
 
 # Sale comps table
 sale_comps_html = ""
 sale_comps_html += f'<tr class="highlight" style="font-weight:700;"><td>S</td><td>500 N Alexandria Ave</td><td>Los Angeles</td><td>{UNITS}</td><td>Proposed</td><td>{fc(LIST_PRICE)}</td><td>{fc(LIST_PRICE // UNITS)}</td><td>${LIST_PRICE / SF:.0f}</td><td>{AT_LIST["cur_cap"]:.2f}%</td><td>{AT_LIST["grm"]:.2f}</td><td>1923</td><td style="font-size:11px;">Subject Property</td></tr>\n'
 for c in SALE_COMPS:
     cap_str = fp(c["cap"]) if c["cap"] else "n/a"
-    grm_str = f'{c["grm"]:.2f}' if c["grm"] else "n/a"
+    grm_str = fx(c["grm"] or None, "{:.2f}")
     hl = ' class="highlight"' if "Anchor" in (c.get("notes") or "") else ""
-    sale_comps_html += f'<tr{hl}><td>{c["num"]}</td><td>{c["addr"]}</td><td>{c["city"]}</td><td>{c["units"]}</td><td>{c["date"]}</td><td>{fc(c["price"])}</td><td>{fc(c["ppu"])}</td><td>${c["psf"]:.0f}</td><td>{cap_str}</td><td>{grm_str}</td><td>{c["yr"]}</td><td style="font-size:11px;">{c["notes"]}</td></tr>\n'
+    sale_comps_html += f'<tr{hl}><td>{c["num"]}</td><td>{c["addr"]}</td><td>{c["city"]}</td><td>{fx(c["units"], "{}")}</td><td>{c["date"]}</td><td>{fc(c["price"])}</td><td>{fc(c["ppu"])}</td><td>{fx(c["psf"], "${:.0f}")}</td><td>{cap_str}</td><td>{grm_str}</td><td>{fx(c["yr"], "{}")}</td><td style="font-size:11px;">{c["notes"]}</td></tr>\n'
 caps = [c["cap"] for c in SALE_COMPS if c["cap"]]
 grms = [c["grm"] for c in SALE_COMPS if c["grm"]]
 ppus = [c["ppu"] for c in SALE_COMPS]
 psfs = [c["psf"] for c in SALE_COMPS]
 prices = [c["price"] for c in SALE_COMPS]
 units_list = [c["units"] for c in SALE_COMPS]
-sale_comps_html += f'<tr style="font-weight:600;background:#f0f4f8;"><td></td><td>Averages</td><td></td><td>{sum(units_list)//len(units_list)}</td><td></td><td>{fc(sum(prices)//len(prices))}</td><td>{fc(sum(ppus)//len(ppus))}</td><td>${sum(psfs)/len(psfs):.0f}</td><td>{fp(sum(caps)/len(caps)) if caps else "n/a"}</td><td>{sum(grms)/len(grms):.2f}</td><td></td><td></td></tr>'
-med_units = int(statistics.median(units_list))
-med_price = int(statistics.median(prices))
-med_ppu = int(statistics.median(ppus))
-med_psf = statistics.median(psfs)
-med_cap = statistics.median(caps) if caps else None
-med_grm = statistics.median(grms)
-sale_comps_html += f'<tr style="font-weight:600;background:#f0f4f8;"><td></td><td>Medians</td><td></td><td>{med_units}</td><td></td><td>{fc(med_price)}</td><td>{fc(med_ppu)}</td><td>${med_psf:.0f}</td><td>{fp(med_cap) if med_cap else "n/a"}</td><td>{med_grm:.2f}</td><td></td><td></td></tr>'
+sale_comps_html += f'<tr style="font-weight:600;background:#f0f4f8;"><td></td><td>Averages</td><td></td><td>{fx(comp_stat(int_mean, units_list), "{}")}</td><td></td><td>{fc(comp_stat(int_mean, prices))}</td><td>{fc(comp_stat(int_mean, ppus))}</td><td>{fx(comp_stat(statistics.fmean, psfs), "${:.0f}")}</td><td>{fp(comp_stat(statistics.fmean, caps))}</td><td>{fx(comp_stat(statistics.fmean, grms), "{:.2f}")}</td><td></td><td></td></tr>'
+med_units = comp_stat(lambda v: int(statistics.median(v)), units_list)
+med_price = comp_stat(lambda v: int(statistics.median(v)), prices)
+med_ppu = comp_stat(lambda v: int(statistics.median(v)), ppus)
+med_psf = comp_stat(statistics.median, psfs)
+med_cap = comp_stat(statistics.median, caps)
+med_grm = comp_stat(statistics.median, grms)
+sale_comps_html += f'<tr style="font-weight:600;background:#f0f4f8;"><td></td><td>Medians</td><td></td><td>{fx(med_units, "{}")}</td><td></td><td>{fc(med_price)}</td><td>{fc(med_ppu)}</td><td>{fx(med_psf, "${:.0f}")}</td><td>{fp(med_cap)}</td><td>{fx(med_grm, "{:.2f}")}</td><td></td><td></td></tr>'
 
 # Operating statement
-income_lines = [
-    ("Gross Scheduled Rent", GSR, False, None),
-    ("Less: Vacancy (5%)", -(GSR * VACANCY_PCT), False, None),
-    ("Other Income", OTHER_INCOME, False, 1),
-]
-expense_lines = [
-    ("Real Estate Taxes", TAXES_AT_LIST, 2),
-    ("Insurance", 6300, 3),
-    ("Water / Sewer", 4400, 4),
-    ("Trash", 2450, 5),
-    ("Common Area Electric", 1500, 6),
-    ("Repairs & Maintenance", 8400, 7),
-    ("Contract Services", 1500, 8),
-    ("Administrative", 1000, 9),
-    ("Marketing", 0, 10),
-    ("Management Fee", 18000, 11),
-    ("Reserves", 2100, 12),
-    ("LAHD Registration", 303, 13),
-    ("Other", 250, 14),
-]
-
-op_income_html = ""
-for label, val, _, note_num in income_lines:
-    v_str = f"${val:,.0f}" if val >= 0 else f"(${abs(val):,.0f})"
-    pu = f"${val/UNITS:,.0f}" if val >= 0 else f"(${abs(val)/UNITS:,.0f})"
-    psf = f"${val/SF:.2f}" if val >= 0 else f"(${abs(val)/SF:.2f})"
-    note_ref = f'<span class="note-ref">[{note_num}]</span>' if note_num else ""
-    op_income_html += f"<tr><td>{label} {note_ref}</td><td class='num'>{v_str}</td><td class='num'>{pu}</td><td class='num'>{psf}</td><td class='num'> - </td></tr>\n"
-op_income_html += f'<tr class="summary"><td><strong>Effective Gross Income</strong></td><td class="num"><strong>${CUR_EGI:,.0f}</strong></td><td class="num"><strong>${CUR_EGI/UNITS:,.0f}</strong></td><td class="num"><strong>${CUR_EGI/SF:.2f}</strong></td><td class="num"><strong>100.0%</strong></td></tr>'
-
-op_expense_html = ""
-for label, val, note_num in expense_lines:
-    pct = f"{val/CUR_EGI*100:.1f}%"
-    note_ref = f'<span class="note-ref">[{note_num}]</span>' if note_num else ""
-    op_expense_html += f"<tr><td>{label} {note_ref}</td><td class='num'>${val:,.0f}</td><td class='num'>${val/UNITS:,.0f}</td><td class='num'>${val/SF:.2f}</td><td class='num'>{pct}</td></tr>\n"
-op_expense_html += f'<tr class="summary"><td><strong>Total Expenses</strong></td><td class="num"><strong>${CUR_TOTAL_EXP:,.0f}</strong></td><td class="num"><strong>${CUR_TOTAL_EXP/UNITS:,.0f}</strong></td><td class="num"><strong>${CUR_TOTAL_EXP/SF:.2f}</strong></td><td class="num"><strong>{CUR_TOTAL_EXP/CUR_EGI*100:.1f}%</strong></td></tr>'
-op_expense_html += f'\n<tr class="summary"><td><strong>Net Operating Income</strong></td><td class="num"><strong>${CUR_NOI_AT_LIST:,.0f}</strong></td><td class="num"><strong>${CUR_NOI_AT_LIST/UNITS:,.0f}</strong></td><td class="num"><strong>${CUR_NOI_AT_LIST/SF:.2f}</strong></td><td class="num"><strong>{CUR_NOI_AT_LIST/CUR_EGI*100:.1f}%</strong></td></tr>'
+@MODEL.node("gsr", "vacancy_pct", "other_income", "units", "sf", "cur_egi")
+def op_income_html(gsr, vacancy_pct, other_income, units, sf, egi):
+    income_lines = [
+        ("Gross Scheduled Rent", gsr, False, None),
+        ("Less: Vacancy (5%)", -(gsr * vacancy_pct), False, None),
+        ("Other Income", other_income, False, 1),
+    ]
+    html = ""
+    for label, val, _, note_num in income_lines:
+        v_str = f"${val:,.0f}" if val >= 0 else f"(${abs(val):,.0f})"
+        pu = f"${val/units:,.0f}" if val >= 0 else f"(${abs(val)/units:,.0f})"
+        psf = f"${val/sf:.2f}" if val >= 0 else f"(${abs(val)/sf:.2f})"
+        note_ref = f'<span class="note-ref">[{note_num}]</span>' if note_num else ""
+        html += f"<tr><td>{label} {note_ref}</td><td class='num'>{v_str}</td><td class='num'>{pu}</td><td class='num'>{psf}</td><td class='num'> - </td></tr>\n"
+    html += f'<tr class="summary"><td><strong>Effective Gross Income</strong></td><td class="num"><strong>${egi:,.0f}</strong></td><td class="num"><strong>${egi/units:,.0f}</strong></td><td class="num"><strong>${egi/sf:.2f}</strong></td><td class="num"><strong>100.0%</strong></td></tr>'
+    return html
+
+@MODEL.node("taxes_at_list", "units", "sf", "cur_egi", "cur_total_exp", "cur_noi_at_list")
+def op_expense_html(taxes, units, sf, egi, total_exp, noi):
+    expense_lines = [
+        ("Real Estate Taxes", taxes, 2),
+        ("Insurance", 6300, 3),
+        ("Water / Sewer", 4400, 4),
+        ("Trash", 2450, 5),
+        ("Common Area Electric", 1500, 6),
+        ("Repairs & Maintenance", 8400, 7),
+        ("Contract Services", 1500, 8),
+        ("Administrative", 1000, 9),
+        ("Marketing", 0, 10),
+        ("Management Fee", 18000, 11),
+        ("Reserves", 2100, 12),
+        ("LAHD Registration", 303, 13),
+        ("Other", 250, 14),
+    ]
+    html = ""
+    for label, val, note_num in expense_lines:
+        pct = f"{val/egi*100:.1f}%"
+        note_ref = f'<span class="note-ref">[{note_num}]</span>' if note_num else ""
+        html += f"<tr><td>{label} {note_ref}</td><td class='num'>${val:,.0f}</td><td class='num'>${val/units:,.0f}</td><td class='num'>${val/sf:.2f}</td><td class='num'>{pct}</td></tr>\n"
+    html += f'<tr class="summary"><td><strong>Total Expenses</strong></td><td class="num"><strong>${total_exp:,.0f}</strong></td><td class="num"><strong>${total_exp/units:,.0f}</strong></td><td class="num"><strong>${total_exp/sf:.2f}</strong></td><td class="num"><strong>{total_exp/egi*100:.1f}%</strong></td></tr>'
+    html += f'\n<tr class="summary"><td><strong>Net Operating Income</strong></td><td class="num"><strong>${noi:,.0f}</strong></td><td class="num"><strong>${noi/units:,.0f}</strong></td><td class="num"><strong>${noi/sf:.2f}</strong></td><td class="num"><strong>{noi/egi*100:.1f}%</strong></td></tr>'
+    return html
+
+op_income_html = MODEL["op_income_html"]
+op_expense_html = MODEL["op_expense_html"]
+
+MODEL.save()
+print(f"Assumption model: {len(MODEL.computed)} nodes computed, {len(MODEL.reused)} reused from cache")
 
 print("Building HTML...")
 
@@ -543,12 +1161,12 @@ html_parts.append(f"""<!DOCTYPE html>
 <style>@import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');</style>
 <link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css"/>
 <script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
-<style>
+{cluster_assets(COMP_MAPS)}<style>
 *{{margin:0;padding:0;box-sizing:border-box;}}
 body{{font-family:'Inter',sans-serif;color:#333;line-height:1.6;background:#fff;}}
 html{{scroll-padding-top:50px;}}
 .cover{{position:relative;min-height:100vh;display:flex;align-items:center;justify-content:center;text-align:center;color:#fff;overflow:hidden;}}
-.cover-bg{{position:absolute;inset:0;background-size:cover;background-position:center;filter:brightness(0.45);z-index:0;}}
+.cover-bg{{position:absolute;inset:0;width:100%;height:100%;object-fit:cover;object-position:center;filter:brightness(0.45);z-index:0;}}
 .cover-content{{position:relative;z-index:2;padding:60px 40px;max-width:860px;}}
 .cover-logo{{width:320px;margin:0 auto 30px;display:block;filter:drop-shadow(0 2px 8px rgba(0,0,0,0.3));}}
 .cover-label{{font-size:13px;font-weight:500;letter-spacing:3px;text-transform:uppercase;color:#C5A258;margin-bottom:18px;}}
@@ -576,13 +1194,13 @@ html{{scroll-padding-top:50px;}}
 .metric-card{{background:#1B3A5C;border-radius:12px;padding:24px;text-align:center;color:#fff;}}
 .metric-value{{display:block;font-size:28px;font-weight:700;color:#fff;margin-bottom:4px;}}.metric-label{{display:block;font-size:11px;font-weight:600;text-transform:uppercase;letter-spacing:1px;color:rgba(255,255,255,0.6);margin-top:6px;}}.metric-sub{{display:block;font-size:12px;color:#C5A258;margin-top:4px;}}
 table{{width:100%;border-collapse:collapse;margin-bottom:24px;font-size:13px;}}th{{background:#1B3A5C;color:#fff;padding:10px 12px;text-align:left;font-size:11px;font-weight:600;text-transform:uppercase;letter-spacing:0.5px;}}td{{padding:8px 12px;border-bottom:1px solid #eee;}}tr:nth-child(even){{background:#f5f5f5;}}tr.highlight{{background:#FFF8E7 !important;border-left:3px solid #C5A258;}}
-.table-scroll{{overflow-x:auto;-webkit-overflow-scrolling:touch;margin-bottom:24px;}}.table-scroll table{{min-width:700px;margin-bottom:0;}}
+.table-scroll{{overflow-x:auto;-webkit-overflow-scrolling:touch;margin-bottom:24px;}}.table-scroll table{{min-width:700px;margin-bottom:0;}}.sens-controls{{display:flex;flex-wrap:wrap;gap:10px 18px;margin-bottom:12px;font-size:12px;color:#1B3A5C;font-weight:600;}}.sens-controls select{{margin-left:6px;padding:3px 6px;border:1px solid #dce3eb;border-radius:4px;font-size:12px;}}.sens-controls label[hidden]{{display:none;}}.calc-controls{{display:flex;flex-wrap:wrap;gap:10px 24px;margin-bottom:12px;font-size:12px;color:#1B3A5C;font-weight:600;}}.calc-controls label{{display:flex;flex-direction:column;gap:4px;min-width:200px;}}.calc-controls output{{font-weight:700;}}.calc-controls input[type=range]{{width:100%;accent-color:#1B3A5C;}}
 .info-table{{width:100%;}}.info-table td{{padding:8px 12px;border-bottom:1px solid #eee;font-size:13px;}}.info-table td:first-child{{font-weight:600;color:#1B3A5C;width:40%;}}
 .two-col{{display:grid;grid-template-columns:1fr 1fr;gap:30px;margin-bottom:30px;}}
 .photo-grid{{display:grid;grid-template-columns:1fr 1fr;gap:12px;margin-bottom:30px;border-radius:8px;overflow:hidden;}}.photo-grid img{{width:100%;height:180px;object-fit:cover;border-radius:4px;}}
 .condition-note{{background:#FFF8E7;border-left:4px solid #C5A258;padding:16px 20px;margin:24px 0;border-radius:0 4px 4px 0;font-size:13px;line-height:1.6;}}
 .buyer-profile{{background:#f0f4f8;border-left:4px solid #1B3A5C;padding:20px 24px;margin:24px 0;border-radius:0 4px 4px 0;}}.buyer-profile-label{{font-size:12px;font-weight:700;text-transform:uppercase;letter-spacing:1.5px;color:#1B3A5C;margin-bottom:12px;}}.buyer-profile ul{{list-style:none;padding:0;margin:0;}}.buyer-profile li{{padding:8px 0;border-bottom:1px solid #dce3eb;font-size:14px;line-height:1.6;color:#333;}}.buyer-profile li:last-child{{border-bottom:none;}}.buyer-profile li strong{{color:#1B3A5C;}}.buyer-profile .bp-closing{{font-size:13px;color:#555;margin-top:12px;font-style:italic;}}
-.leaflet-map{{height:400px;border-radius:4px;border:1px solid #ddd;margin-bottom:30px;z-index:1;}}.map-fallback{{display:none;font-size:12px;color:#666;font-style:italic;margin-bottom:30px;}}.comp-map-print{{display:none;}}
+.leaflet-map{{height:400px;border-radius:4px;border:1px solid #ddd;margin-bottom:30px;z-index:1;}}.map-fallback{{display:none;font-size:12px;color:#666;font-style:italic;margin-bottom:30px;}}.comp-map-print{{display:none;}}{MAP_CSS}
 .embed-map-wrap{{position:relative;width:100%;margin-bottom:20px;border-radius:8px;overflow:hidden;box-shadow:0 2px 12px rgba(0,0,0,0.08);}}.embed-map-wrap iframe{{display:block;width:100%;height:420px;border:0;}}.embed-map-caption{{font-size:12px;color:#888;text-align:center;margin-top:8px;font-style:italic;}}.embed-map-fallback{{display:none;font-size:12px;color:#666;font-style:italic;margin-bottom:30px;}}
 .adu-img-wrap{{margin-bottom:20px;border-radius:8px;overflow:hidden;box-shadow:0 2px 12px rgba(0,0,0,0.08);}}.adu-img-wrap img{{width:100%;display:block;}}
 .footer{{background:#1B3A5C;color:#fff;padding:50px 40px;text-align:center;}}.footer-logo{{width:180px;margin-bottom:30px;filter:drop-shadow(0 2px 6px rgba(0,0,0,0.3));}}.footer-team{{display:flex;justify-content:center;gap:40px;margin-bottom:30px;flex-wrap:wrap;}}.footer-person{{text-align:center;flex:1;min-width:280px;}}.footer-headshot{{width:70px;height:70px;border-radius:50%;border:2px solid #C5A258;margin-bottom:10px;object-fit:cover;}}.footer-name{{font-size:16px;font-weight:600;}}.footer-title{{font-size:12px;color:#C5A258;margin-bottom:8px;}}.footer-contact{{font-size:12px;color:rgba(255,255,255,0.7);line-height:1.8;}}.footer-contact a{{color:rgba(255,255,255,0.7);text-decoration:none;}}.footer-office{{font-size:12px;color:rgba(255,255,255,0.5);margin-top:20px;}}.footer-disclaimer{{font-size:10px;color:rgba(255,255,255,0.35);margin-top:20px;max-width:800px;margin-left:auto;margin-right:auto;line-height:1.6;}}
@@ -622,7 +1240,7 @@ td.num,th.num{{text-align:right;}}
 @media(max-width:420px){{.cover-content{{padding:24px 16px;}}.cover-logo{{width:180px;}}.cover-title{{font-size:24px;}}.cover-subtitle{{font-size:15px;}}.cover-price{{font-size:28px;}}.cover-stats{{gap:10px;}}.cover-stat-value{{font-size:18px;}}.cover-stat-label{{font-size:9px;}}.cover-label{{font-size:11px;}}.cover-headshots{{gap:16px;margin-top:16px;}}.cover-headshot{{width:50px;height:50px;}}.pdf-float-btn{{padding:10px 14px;font-size:0;bottom:14px;right:14px;}}.pdf-float-btn svg{{width:22px;height:22px;}}.metrics-grid,.metrics-grid-4{{grid-template-columns:1fr;}}.metric-card{{padding:12px 10px;}}.metric-value{{font-size:20px;}}.section{{padding:24px 12px;}}.section-title{{font-size:20px;}}.footer{{padding:24px 12px;}}.footer-team{{gap:16px;}}.toc-nav{{padding:0 4px;}}.toc-nav a{{font-size:8px;padding:10px 4px;letter-spacing:0;}}.leaflet-map{{height:240px;}}}}
 @media print{{
 @page{{size:letter landscape;margin:0.4in 0.5in;}}
-.pdf-float-btn,.toc-nav,.leaflet-map,.embed-map-wrap,.embed-map-caption,.embed-map-fallback,.page-break-marker{{display:none !important;}}
+.pdf-float-btn,.toc-nav,.sens-controls,.calc-controls,.leaflet-map,.embed-map-wrap,.embed-map-caption,.embed-map-fallback,.page-break-marker{{display:none !important;}}
 .map-fallback{{display:block !important;}}
 body{{font-size:11px;line-height:1.5;color:#222;}}
 p{{font-size:11px;line-height:1.5;margin-bottom:8px;orphans:3;widows:3;}}
@@ -711,7 +1329,7 @@ td{{padding:4px 8px;font-size:10px;}}
 # ==================== COVER ====================
 html_parts.append(f"""
 <div class="cover">
-<div class="cover-bg" style="background-image:url('{IMG['hero']}');"></div>
+<img class="cover-bg" {img_attrs('hero', lazy=False)} alt="">
 <div class="cover-content">
 <img src="{IMG['logo']}" class="cover-logo" alt="LAAA Team">
 <div class="cover-label">Confidential Broker Opinion of Value</div>
@@ -780,7 +1398,7 @@ html_parts.append(f"""
 <div class="embed-map-wrap"><iframe src="https://www.google.com/maps/d/u/0/embed?mid=1ewCjzE3QX9p6m2MqK-md8b6fZitfIzU&ehbc=2E312F" allowfullscreen loading="lazy"></iframe></div>
 <div class="embed-map-caption">All-Time Closings Map  -  LA Apartment Advisors</div>
 <div class="embed-map-fallback">View our interactive closings map at <strong>www.LAAA.com</strong></div>
-<div class="tr-map-print"><img src="{IMG['closings_map']}" alt="LAAA Team All-Time Closings Map - LA County"></div>
+<div class="tr-map-print"><img {img_attrs('closings_map')} alt="LAAA Team All-Time Closings Map - LA County"></div>
 
 <div class="tr-service-quote">
 <h3>We Didn't Invent Great Service, We Just Work Relentlessly to Provide It</h3>
@@ -803,7 +1421,7 @@ html_parts.append(f"""
 
 <div class="bio-grid">
 <div class="bio-card">
-<img id="bio-glen-headshot" class="bio-headshot" src="{IMG['glen']}" alt="Glen Scher">
+<img id="bio-glen-headshot" class="bio-headshot" {img_attrs('glen')} alt="Glen Scher">
 <div>
 <div class="bio-name">Glen Scher</div>
 <div class="bio-title">Senior Managing Director Investments</div>
@@ -811,7 +1429,7 @@ html_parts.append(f"""
 </div>
 </div>
 <div class="bio-card">
-<img id="bio-filip-headshot" class="bio-headshot" src="{IMG['filip']}" alt="Filip Niculete">
+<img id="bio-filip-headshot" class="bio-headshot" {img_attrs('filip')} alt="Filip Niculete">
 <div>
 <div class="bio-name">Filip Niculete</div>
 <div class="bio-title">Senior Managing Director Investments</div>
@@ -821,15 +1439,15 @@ html_parts.append(f"""
 </div>
 
 <div class="team-grid">
-<div class="team-card"><img class="team-headshot" src="{IMG['team_aida']}" alt="Aida Memary Scher"><div class="team-card-name">Aida Memary Scher</div><div class="team-card-title">Senior Associate</div></div>
-<div class="team-card"><img class="team-headshot" src="{IMG['team_morgan']}" alt="Morgan Wetmore"><div class="team-card-name">Morgan Wetmore</div><div class="team-card-title">Associate</div></div>
-<div class="team-card"><img class="team-headshot" src="{IMG['team_alexandro']}" alt="Alexandro Tapia"><div class="team-card-name">Alexandro Tapia</div><div class="team-card-title">Associate Investments</div></div>
-<div class="team-card"><img class="team-headshot" src="{IMG['team_logan']}" alt="Logan Ward"><div class="team-card-name">Logan Ward</div><div class="team-card-title">Associate</div></div>
-<div class="team-card"><img class="team-headshot" src="{IMG['team_jason']}" alt="Jason Mandel"><div class="team-card-name">Jason Mandel</div><div class="team-card-title">Associate</div></div>
-<div class="team-card"><img class="team-headshot" src="{IMG['team_luka']}" alt="Luka Leader"><div class="team-card-name">Luka Leader</div><div class="team-card-title">Associate</div></div>
-<div class="team-card"><img class="team-headshot" src="{IMG['team_blake']}" alt="Blake Lewitt"><div class="team-card-name">Blake Lewitt</div><div class="team-card-title">Associate Investments</div></div>
-<div class="team-card"><img class="team-headshot" src="{IMG['team_mike']}" alt="Mike Palade"><div class="team-card-name">Mike Palade</div><div class="team-card-title">Agent Assistant</div></div>
-<div class="team-card"><img class="team-headshot" src="{IMG['team_tony']}" alt="Tony H. Dang"><div class="team-card-name">Tony H. Dang</div><div class="team-card-title">Business Operations Manager</div></div>
+<div class="team-card"><img class="team-headshot" {img_attrs('team_aida')} alt="Aida Memary Scher"><div class="team-card-name">Aida Memary Scher</div><div class="team-card-title">Senior Associate</div></div>
+<div class="team-card"><img class="team-headshot" {img_attrs('team_morgan')} alt="Morgan Wetmore"><div class="team-card-name">Morgan Wetmore</div><div class="team-card-title">Associate</div></div>
+<div class="team-card"><img class="team-headshot" {img_attrs('team_alexandro')} alt="Alexandro Tapia"><div class="team-card-name">Alexandro Tapia</div><div class="team-card-title">Associate Investments</div></div>
+<div class="team-card"><img class="team-headshot" {img_attrs('team_logan')} alt="Logan Ward"><div class="team-card-name">Logan Ward</div><div class="team-card-title">Associate</div></div>
+<div class="team-card"><img class="team-headshot" {img_attrs('team_jason')} alt="Jason Mandel"><div class="team-card-name">Jason Mandel</div><div class="team-card-title">Associate</div></div>
+<div class="team-card"><img class="team-headshot" {img_attrs('team_luka')} alt="Luka Leader"><div class="team-card-name">Luka Leader</div><div class="team-card-title">Associate</div></div>
+<div class="team-card"><img class="team-headshot" {img_attrs('team_blake')} alt="Blake Lewitt"><div class="team-card-name">Blake Lewitt</div><div class="team-card-title">Associate Investments</div></div>
+<div class="team-card"><img class="team-headshot" {img_attrs('team_mike')} alt="Mike Palade"><div class="team-card-name">Mike Palade</div><div class="team-card-title">Agent Assistant</div></div>
+<div class="team-card"><img class="team-headshot" {img_attrs('team_tony')} alt="Tony H. Dang"><div class="team-card-name">Tony H. Dang</div><div class="team-card-title">Business Operations Manager</div></div>
 </div>
 
 <div class="condition-note" style="margin-top:20px;">
@@ -978,11 +1596,11 @@ html_parts.append(f"""
 
 <p>Zoned R3-1 with TOC Tier 3 overlay and located within a federally designated Opportunity Zone, 500 N Alexandria presents a compelling value-add opportunity. At a suggested list price of $1,275,000, the property delivers a current-year cap rate of 5.48% with a pro forma cap rate of 7.42% upon full renovation and turnover  -  offering investors attractive risk-adjusted returns with meaningful upside in one of LA's strongest rental markets.</p>
 </div>
-<img class="inv-logo" src="{IMG['logo']}" alt="LAAA Team">
+<img class="inv-logo" {img_attrs('logo')} alt="LAAA Team">
 </div>
 
 <div class="inv-right">
-<div class="inv-photo"><img src="{IMG['hero']}" alt="500 N Alexandria Ave - Street View"></div>
+<div class="inv-photo"><img {img_attrs('hero', sizes="(max-width:768px) 100vw, 550px")} alt="500 N Alexandria Ave - Street View"></div>
 <div class="inv-highlights">
 <h4>Investment Highlights</h4>
 <ul>
@@ -1000,7 +1618,7 @@ html_parts.append(f"""
 """)
 
 # ==================== LOCATION OVERVIEW ====================
-loc_wide_map_html = f'<div class="loc-wide-map"><img src="{IMG["loc_map"]}" alt="Property Location - 500 N Alexandria Ave, Los Angeles"></div>' if IMG.get("loc_map") else ''
+loc_wide_map_html = f'<div class="loc-wide-map"><img {img_attrs("loc_map", sizes="(max-width:1100px) 100vw, 1020px")} alt="Property Location - 500 N Alexandria Ave, Los Angeles"></div>' if IMG.get("loc_map") else ''
 html_parts.append(f"""
 <div class="page-break-marker"></div>
 <div class="section section-alt" id="location">
@@ -1199,7 +1817,7 @@ html_parts.append(f"""
 </div>
 </div>
 
-<div class="buyer-photo"><img src="{IMG['aerial']}" alt="500 N Alexandria Ave - Aerial View"></div>
+<div class="buyer-photo"><img {img_attrs('aerial', sizes="(max-width:768px) 100vw, 510px")} alt="500 N Alexandria Ave - Aerial View"></div>
 
 </div>
 """)
@@ -1213,7 +1831,7 @@ html_parts.append(f"""
 <div class="section-divider"></div>
 
 <div id="saleMap" class="leaflet-map"></div>
-<div class="comp-map-print"><img src="{STATIC_MAP_SALE}" alt="Sale Comps Map"></div>
+<div class="comp-map-print"><img src="{STATIC_MAP_SALE}" loading="lazy" decoding="async" alt="Sale Comps Map"></div>
 <p class="map-fallback">Interactive map available at the live URL.</p>
 
 <div class="table-scroll"><table>
@@ -1225,7 +1843,7 @@ html_parts.append(f"""
 
 <h3 class="sub-heading">Individual Comp Analysis</h3>
 
-{''.join(COMP_NARRATIVES)}
+{''.join(COMP_NARRATIVES[c["addr"]] for c in SALE_COMPS if c["addr"] in COMP_NARRATIVES)}
 
 <h3 class="sub-heading">Market Narrative</h3>
 
@@ -1247,7 +1865,7 @@ html_parts.append(f"""
 <div class="section-divider"></div>
 
 <div id="activeMap" class="leaflet-map"></div>
-<div class="comp-map-print"><img src="{STATIC_MAP_ACTIVE}" alt="On-Market Comps Map"></div>
+<div class="comp-map-print"><img src="{STATIC_MAP_ACTIVE}" loading="lazy" decoding="async" alt="On-Market Comps Map"></div>
 <p class="map-fallback">Interactive map available at the live URL.</p>
 
 <div class="table-scroll"><table>
@@ -1255,7 +1873,7 @@ html_parts.append(f"""
 <tbody>
 """)
 for c in ACTIVE_COMPS:
-    html_parts.append(f'<tr><td>{c["num"]}</td><td>{c["addr"]}</td><td>{c["units"]}</td><td>{fc(c["price"])}</td><td>{fc(c["ppu"])}</td><td>{fp(c["cap"])}</td><td>{c["grm"]:.2f}x</td><td>{c["dom"]}</td><td>{c["status"]}</td><td style="font-size:11px;">{c["notes"]}</td></tr>\n')
+    html_parts.append(f'<tr><td>{c["num"]}</td><td>{c["addr"]}</td><td>{c["units"]}</td><td>{fc(c["price"])}</td><td>{fc(c["ppu"])}</td><td>{fp(c["cap"])}</td><td>{fx(c["grm"], "{:.2f}x")}</td><td>{fx(c["dom"], "{}")}</td><td>{c["status"]}</td><td style="font-size:11px;">{c["notes"]}</td></tr>\n')
 html_parts.append(f"""
 </tbody>
 </table></div>
@@ -1278,7 +1896,7 @@ html_parts.append(f"""
 <div class="section-divider"></div>
 
 <div id="rentMap" class="leaflet-map"></div>
-<div class="comp-map-print"><img src="{STATIC_MAP_RENT}" alt="Rent Comps Map"></div>
+<div class="comp-map-print"><img src="{STATIC_MAP_RENT}" loading="lazy" decoding="async" alt="Rent Comps Map"></div>
 <p class="map-fallback">Interactive map available at the live URL.</p>
 
 <h3 class="sub-heading">2-Bedroom Rent Comparables</h3>
@@ -1289,7 +1907,8 @@ html_parts.append(f"""
 for i, rc in enumerate(RENT_COMPS_2BR):
     html_parts.append(f'<tr><td>{i+1}</td><td>{rc["addr"]}</td><td>${rc["rent"]:,}</td><td>{rc["reno"]}</td><td>{rc["dist"]}</td><td style="font-size:11px;">{rc["features"]}</td></tr>\n')
 br2_rents = [rc["rent"] for rc in RENT_COMPS_2BR]
-html_parts.append(f'<tr style="font-weight:600;background:#FFF8E7;"><td></td><td><strong>Summary</strong></td><td>${min(br2_rents):,}-${max(br2_rents):,}</td><td></td><td></td><td>Avg ${sum(br2_rents)//len(br2_rents):,} | <strong>Median ${int(statistics.median(br2_rents)):,}</strong></td></tr>\n')
+if br2_rents:
+    html_parts.append(f'<tr style="font-weight:600;background:#FFF8E7;"><td></td><td><strong>Summary</strong></td><td>${min(br2_rents):,}-${max(br2_rents):,}</td><td></td><td></td><td>Avg ${int_mean(br2_rents):,} | <strong>Median ${int(statistics.median(br2_rents)):,}</strong></td></tr>\n')
 html_parts.append("""
 </tbody>
 </table></div>
@@ -1302,7 +1921,8 @@ html_parts.append("""
 for i, rc in enumerate(RENT_COMPS_STUDIO):
     html_parts.append(f'<tr><td>{i+1}</td><td>{rc["addr"]}</td><td>${rc["rent"]:,}</td><td>{rc["reno"]}</td><td>{rc["dist"]}</td><td style="font-size:11px;">{rc["features"]}</td></tr>\n')
 studio_rents = [rc["rent"] for rc in RENT_COMPS_STUDIO]
-html_parts.append(f'<tr style="font-weight:600;background:#FFF8E7;"><td></td><td><strong>Summary</strong></td><td>${min(studio_rents):,}-${max(studio_rents):,}</td><td></td><td></td><td>Avg ${sum(studio_rents)//len(studio_rents):,} | <strong>Median ${int(statistics.median(studio_rents)):,}</strong></td></tr>\n')
+if studio_rents:
+    html_parts.append(f'<tr style="font-weight:600;background:#FFF8E7;"><td></td><td><strong>Summary</strong></td><td>${min(studio_rents):,}-${max(studio_rents):,}</td><td></td><td></td><td>Avg ${int_mean(studio_rents):,} | <strong>Median ${int(statistics.median(studio_rents)):,}</strong></td></tr>\n')
 html_parts.append(f"""
 </tbody>
 </table></div>
@@ -1410,16 +2030,14 @@ html_parts.append(f"""
 <tr><td>DSCR (Current)</td><td class="num">{AT_LIST['dcr_cur']:.2f}x</td></tr>
 <tr><td>Constraint</td><td class="num">{AT_LIST['loan_constraint']}</td></tr>
 <tr><td>Year Due</td><td class="num">2031</td></tr>
+<tr><td>Balloon at Maturity</td><td class="num">${AT_LIST['balloon']:,.0f}</td></tr>
 </tbody>
 </table>
 
 <table class="summary-table">
 <thead><tr><th class="summary-header">UNIT SUMMARY</th><th class="num summary-header">#</th><th class="num summary-header">Avg SF</th><th class="num summary-header">Sched.</th><th class="num summary-header">Market</th></tr></thead>
 <tbody>
-<tr><td>2 Bed / 1 Bath</td><td class="num">{len(br2_units)}</td><td class="num">620</td><td class="num">${br2_avg_cur:,.0f}</td><td class="num">${br2_avg_mkt:,.0f}</td></tr>
-<tr><td>Studio</td><td class="num">{len(studio_units)}</td><td class="num">400</td><td class="num">${studio_avg_cur:,.0f}</td><td class="num">${studio_avg_mkt:,.0f}</td></tr>
-<tr><td>ADU</td><td class="num">{len(adu_units)}</td><td class="num">248</td><td class="num">${adu_avg_cur:,.0f}</td><td class="num">${adu_avg_mkt:,.0f}</td></tr>
-</tbody>
+{unit_summary_html}</tbody>
 </table>
 </div>
 
@@ -1476,11 +2094,16 @@ html_parts.append(f"""
 </div>
 
 <h3 class="sub-heading">Pricing Matrix</h3>
-<p style="font-size:12px;color:#666;margin-bottom:12px;"><em>Highlighted row represents the suggested list price. Cap rates are tax-adjusted (property taxes recalculated at 1.17% of sale price per LA County Prop 13 reassessment), which adjusts NOI and cap rate at every row.</em></p>
+<p style="font-size:12px;color:#666;margin-bottom:12px;"><em>Highlighted row represents the suggested list price. Cap rates are tax-adjusted (property taxes recalculated at 1.17% of sale price per LA County Prop 13 reassessment), which adjusts NOI and cap rate at every row.{matrix_irr_note}</em></p>
 <div class="table-scroll"><table>
-<thead><tr><th class="num">Purchase Price</th><th class="num">Current Cap</th><th class="num">Pro Forma Cap</th><th class="num">Cash-on-Cash</th><th class="num">$/SF</th><th class="num">$/Unit</th><th class="num">PF GRM</th></tr></thead>
+<thead><tr><th class="num">Purchase Price</th><th class="num">Current Cap</th><th class="num">Pro Forma Cap</th><th class="num">Cash-on-Cash</th>{matrix_irr_head}<th class="num">$/SF</th><th class="num">$/Unit</th><th class="num">PF GRM</th></tr></thead>
 <tbody>{matrix_html}</tbody>
 </table></div>
+{guidance_html}
+{calculator_html}
+{debt_html}
+{sensitivity_html}
+{simulation_html}
 
 <div class="summary-trade-range">
 <div class="summary-trade-label">A TRADE PRICE IN THE CURRENT INVESTMENT ENVIRONMENT OF</div>
@@ -1504,16 +2127,16 @@ html_parts.append(f"""
 # ==================== FOOTER ====================
 html_parts.append(f"""
 <div class="footer" id="contact">
-<img src="{IMG['logo']}" class="footer-logo" alt="LAAA Team">
+<img {img_attrs('logo')} class="footer-logo" alt="LAAA Team">
 <div class="footer-team">
 <div class="footer-person">
-<img src="{IMG['glen']}" class="footer-headshot" alt="Glen Scher">
+<img {img_attrs('glen')} class="footer-headshot" alt="Glen Scher">
 <div class="footer-name">Glen Scher</div>
 <div class="footer-title">Senior Managing Director Investments</div>
 <div class="footer-contact"><a href="tel:8182122808">(818) 212-2808</a><br><a href="mailto:Glen.Scher@marcusmillichap.com">Glen.Scher@marcusmillichap.com</a><br>CA License: 01962976</div>
 </div>
 <div class="footer-person">
-<img src="{IMG['filip']}" class="footer-headshot" alt="Filip Niculete">
+<img {img_attrs('filip')} class="footer-headshot" alt="Filip Niculete">
 <div class="footer-name">Filip Niculete</div>
 <div class="footer-title">Senior Managing Director Investments</div>
 <div class="footer-contact"><a href="tel:8182122748">(818) 212-2748</a><br><a href="mailto:Filip.Niculete@marcusmillichap.com">Filip.Niculete@marcusmillichap.com</a><br>CA License: 01905352</div>
@@ -1526,6 +2149,7 @@ html_parts.append(f"""
 
 # ==================== JAVASCRIPT ====================
 html_parts.append(f"""
+{map_data_html(COMP_MAPS)}
 <script>
 var params = new URLSearchParams(window.location.search);
 var client = params.get('client');
@@ -1534,9 +2158,49 @@ document.querySelectorAll('.toc-nav a').forEach(function(link) {{ link.addEventL
 var tocLinks = document.querySelectorAll('.toc-nav a'); var tocSections = []; tocLinks.forEach(function(link) {{ var id = link.getAttribute('href').substring(1); var section = document.getElementById(id); if (section) tocSections.push({{ link: link, section: section }}); }});
 function updateActiveTocLink() {{ var navHeight = document.getElementById('toc-nav').offsetHeight + 20; var scrollPos = window.pageYOffset + navHeight; var current = null; tocSections.forEach(function(item) {{ if (item.section.offsetTop <= scrollPos) current = item.link; }}); tocLinks.forEach(function(link) {{ link.classList.remove('toc-active'); }}); if (current) current.classList.add('toc-active'); }}
 window.addEventListener('scroll', updateActiveTocLink); updateActiveTocLink();
-{sale_map_js}
-{active_map_js}
-{rent_map_js}
+function loadAllImages() {{ document.querySelectorAll('img[loading="lazy"]').forEach(function(img) {{ img.loading = 'eager'; }}); }}
+window.addEventListener('beforeprint', loadAllImages); if (/HeadlessChrome/.test(navigator.userAgent)) loadAllImages();
+(function() {{
+  var dataEl = document.getElementById('sens-data'); if (!dataEl) return;
+  var data = JSON.parse(dataEl.textContent), t = data.table, names = Object.keys(t.axes);
+  var strides = []; var s = 1; for (var d = names.length - 1; d >= 0; d--) {{ strides[d] = s; s *= t.shape[d]; }}
+  var labels = {{}}; names.forEach(function(n) {{ var sel = document.querySelector('[data-fixed="' + n + '"]'); if (sel) labels[n] = Array.prototype.map.call(sel.options, function(o) {{ return o.text; }}); }});
+  function fmt(kind, v) {{ if (kind === 'usd') return '$' + Math.round(v).toLocaleString('en-US'); if (kind === 'x') return v.toFixed(2) + 'x'; return v.toFixed(2) + '%'; }}
+  function render() {{
+    var metric = document.getElementById('sens-metric').value, colAxis = document.getElementById('sens-cols').value;
+    var values = t.metrics[metric], kind = data.formats[metric], base = 0, c = names.indexOf(colAxis), p = names.indexOf('price');
+    names.forEach(function(n, d) {{ var label = document.querySelector('label[data-axis="' + n + '"]'); if (label) label.hidden = (n === colAxis); if (n !== 'price' && n !== colAxis) base += parseInt(document.querySelector('[data-fixed="' + n + '"]').value, 10) * strides[d]; }});
+    var head = '<tr><th class="num">Purchase Price</th>' + labels[colAxis].map(function(l) {{ return '<th class="num">' + l + '</th>'; }}).join('') + '</tr>';
+    var body = t.axes.price.map(function(price, i) {{ var cells = ''; for (var j = 0; j < t.shape[c]; j++) cells += '<td class="num">' + fmt(kind, values[base + i * strides[p] + j * strides[c]]) + '</td>'; return '<tr' + (price === data.list_price ? ' class="highlight"' : '') + '><td class="num">$' + price.toLocaleString('en-US') + '</td>' + cells + '</tr>'; }}).join('');
+    var table = document.getElementById('sens-table'); table.tHead.innerHTML = head; table.tBodies[0].innerHTML = body;
+  }}
+  document.querySelectorAll('.sens-controls select').forEach(function(sel) {{ sel.addEventListener('change', render); }});
+}})();
+{CALCULATOR_JS}
+(function() {{
+  var dataEl = document.getElementById('calc-data'); if (!dataEl) return;
+  var data = JSON.parse(dataEl.textContent);
+  function usd(v) {{ return (v < 0 ? '-$' : '$') + Math.abs(Math.round(v)).toLocaleString('en-US'); }}
+  function fmt(kind, v) {{ if (kind === 'usd') return usd(v); if (kind === 'x') return v.toFixed(2) + 'x'; if (kind === 'ltv') return (v * 100).toFixed(1) + '%'; return v.toFixed(2) + '%'; }}
+  function render() {{
+    var a = {{}}; for (var k in data.a) a[k] = data.a[k];
+    var price = parseFloat(document.getElementById('calc-price').value);
+    a.interest_rate = parseFloat(document.getElementById('calc-interest_rate').value);
+    a.max_ltv = parseFloat(document.getElementById('calc-max_ltv').value);
+    document.getElementById('calc-price-value').textContent = usd(price);
+    document.getElementById('calc-interest_rate-value').textContent = (a.interest_rate * 100).toFixed(3) + '%';
+    document.getElementById('calc-max_ltv-value').textContent = (a.max_ltv * 100).toFixed(0) + '%';
+    var m = laaaCalcMetrics(price, a);
+    document.querySelectorAll('#calc-summary [data-calc]').forEach(function(td) {{ td.textContent = fmt(td.getAttribute('data-kind'), m[td.getAttribute('data-calc')]); }});
+    document.querySelector('#calc-matrix tbody').innerHTML = data.prices.map(function(p) {{
+      var row = laaaCalcMetrics(p, a), cells = data.columns.map(function(c) {{ return '<td class="num">' + fmt(c[1], row[c[0]]) + '</td>'; }}).join('');
+      return '<tr' + (p === data.list_price ? ' class="highlight"' : '') + '><td class="num">' + usd(p) + '</td>' + cells + '</tr>';
+    }}).join('');
+  }}
+  document.querySelectorAll('.calc-controls input').forEach(function(input) {{ input.addEventListener('input', render); }});
+}})();
+{MAP_JS}
+laaaCompMaps();
 </script>
 """)
 
@@ -1729,9 +2393,25 @@ html_parts.append("</body></html>")
 
 # Write output
 html = "".join(html_parts)
+if ASSET_MODE == "external":
+    # The PDF worker renders every page at once: one resolution per image, no lazy loading
+    print_html = re.sub(r' (?:srcset|sizes)="[^"]*"| loading="lazy"', "", html)
+    print_html, dedup = dedupe_inline_images(print_html)
+    with open(PRINT_OUTPUT, "w", encoding="utf-8") as f:
+        f.write(print_html)
+    html, assets = externalize_inline_images(html, ASSETS_DIR, ASSET_BASE_URL)
+    print(f"External assets: {assets['files']} files ({assets['written']} new, "
+          f"{assets['bytes']/1024/1024:.2f} MB) in {ASSETS_DIR}")
+else:
+    html, dedup = dedupe_inline_images(html)
+if dedup["payloads"]:
+    print(f"Image dedup: {dedup['payloads']} shared images, {dedup['references']} repeat references, "
+          f"{dedup['bytes_saved']/1024:.0f}KB of duplicate base64 removed")
 with open(OUTPUT, "w", encoding="utf-8") as f:
     f.write(html)
 
 print(f"\nBOV generated: {OUTPUT}")
 print(f"File size: {os.path.getsize(OUTPUT) / 1024 / 1024:.2f} MB")
+if ASSET_MODE == "external":
+    print(f"Self-contained print page (PDF worker): {PRINT_OUTPUT} ({os.path.getsize(PRINT_OUTPUT) / 1024 / 1024:.2f} MB)")
 print("Done!")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Interactive Comp Maps for LAAA BOV Builds
+=========================================
+Data-driven Leaflet maps. Each map is a compact JSON record (container id,
+pin color, subject point and popup, and one [lat, lng, label, popup] array per
+comp) embedded once in a <script type="application/json"> block, and a single
+shared rendering loop (MAP_JS) draws every map from it. Page script no longer
+grows by a full L.marker(...) statement and inline-styled icon per comp; a
+comp costs one short array, and pin styling lives in CSS.
+
+Maps are initialized when their container first scrolls near the viewport
+(IntersectionObserver; immediately on browsers without it), so tiles and
+markers for the comp sections further down the page are not built at load.
+Maps with at least cluster_min points use Leaflet.markercluster when the page
+has loaded it (see cluster_assets); otherwise markers go on a plain layer.
+
+Usage:
+    This module is imported by build_bov.py. It is NOT run directly.
+
+    maps = [map_layer("saleMap", points, "#1B3A5C", (SUBJECT_LAT, SUBJECT_LNG), subject_popup)]
+    <head>{cluster_assets(maps)}</head>
+    {map_data_html(maps)} ... <script>{MAP_JS} laaaCompMaps();</script>
+"""
+
+import json
+from typing import Iterable
+
+MARKERCLUSTER_URL = "https://unpkg.com/leaflet.markercluster@1.5.3/dist/"
+CLUSTER_MIN_POINTS = 50
+
+
+def map_layer(map_id: str, points: Iterable[tuple], color: str, center: tuple, subject_popup: str,
+              zoom: int = 14, cluster_min: int = CLUSTER_MIN_POINTS) -> dict:
+    """One map's data; points are (lat, lng, label, popup HTML)."""
+    points = [[round(lat, 6), round(lng, 6), str(label), popup] for lat, lng, label, popup in points]
+    return {"id": map_id, "color": color, "center": list(center), "zoom": zoom, "subject": subject_popup,
+            "cluster": len(points) >= cluster_min, "points": points}
+
+
+def map_data_html(maps: list, element_id: str = "comp-map-data") -> str:
+    """The maps as one JSON script block ("</" escaped so popup HTML can't end the element)."""
+    data = json.dumps(maps, separators=(",", ":")).replace("</", "<\\/")
+    return f'<script type="application/json" id="{element_id}">{data}</script>'
+
+
+def cluster_assets(maps: list) -> str:
+    """markercluster CSS/JS tags when any map clusters, else nothing (small pages skip the download)."""
+    if not any(m["cluster"] for m in maps):
+        return ""
+    return (f'<link rel="stylesheet" href="{MARKERCLUSTER_URL}MarkerCluster.css"/>\n'
+            f'<link rel="stylesheet" href="{MARKERCLUSTER_URL}MarkerCluster.Default.css"/>\n'
+            f'<script src="{MARKERCLUSTER_URL}leaflet.markercluster.js"></script>\n')
+
+
+# Pin styling shared by every marker; the per-map color is the only inline style
+MAP_CSS = (".map-pin{color:#fff;border-radius:50%;width:26px;height:26px;display:flex;align-items:center;"
+           "justify-content:center;font-weight:700;font-size:12px;border:2px solid #fff;"
+           "box-shadow:0 2px 4px rgba(0,0,0,0.3);box-sizing:border-box;}"
+           ".map-pin-subject{background:#C5A258;width:32px;height:32px;font-size:14px;"
+           "box-shadow:0 2px 6px rgba(0,0,0,0.3);}")
+
+# Shared rendering loop (plain ES5, like the rest of the page script)
+MAP_JS = r"""
+function laaaCompMaps(elementId) {
+  var dataEl = document.getElementById(elementId || 'comp-map-data');
+  if (!dataEl || typeof L === 'undefined') return;
+  var TILES = 'https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png';
+  function pin(html, cls, style, size) {
+    return L.divIcon({className: 'custom-marker', html: '<div class="map-pin' + cls + '"' + style + '>' + html + '</div>',
+                      iconSize: [size, size], iconAnchor: [size / 2, size / 2]});
+  }
+  function draw(m) {
+    var map = L.map(m.id).setView(m.center, m.zoom);
+    L.tileLayer(TILES, {attribution: '&copy; OpenStreetMap'}).addTo(map);
+    L.marker(m.center, {icon: pin('&#9733;', ' map-pin-subject', '', 32)}).addTo(map).bindPopup(m.subject);
+    var layer = m.cluster && L.markerClusterGroup ? L.markerClusterGroup({maxClusterRadius: 40}) : L.layerGroup();
+    var style = ' style="background:' + m.color + '"';
+    for (var i = 0; i < m.points.length; i++) {
+      var p = m.points[i];
+      layer.addLayer(L.marker([p[0], p[1]], {icon: pin(p[2], '', style, 26)}).bindPopup(p[3]));
+    }
+    layer.addTo(map);
+  }
+  var io = 'IntersectionObserver' in window ? new IntersectionObserver(function(entries) {
+    entries.forEach(function(e) {
+      if (!e.isIntersecting) return;
+      io.unobserve(e.target);
+      draw(e.target.laaaMap);
+    });
+  }, {rootMargin: '300px'}) : null;
+  JSON.parse(dataEl.textContent).forEach(function(m) {
+    var el = document.getElementById(m.id);
+    if (!el) return;
+    if (io) { el.laaaMap = m; io.observe(el); } else { draw(m); }
+  });
+}
+"""
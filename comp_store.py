@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Comp Store for LAAA BOV Builds
+==============================
+Local SQLite database of sale comps, on-market listings and rent comps, shared
+by every BOV built on this machine. Comps arrive in bulk from CoStar-style CSV
+exports and each build pulls its comp set with a filtered query (zip, unit
+count, sale date, status, vintage) instead of a hand-copied Python literal.
+
+The comps table is indexed on each filter column (paired with the comp kind),
+so a query over a market-wide export is an index range scan, not a table scan.
+Query results are dicts in exactly the shape build_bov.py renders: sale comps
+{"num", "addr", "city", "units", "sf", "yr", "price", "ppu", "psf", "cap",
+"grm", "date", "notes"}, listings {"num", "addr", "city", "units", "price",
+"ppu", "cap", "grm", "dom", "status", "notes"} and rent comps {"addr", "city",
+"unit_type", "rent", "reno", "dist", "features"}.
+
+Every row belongs to a site (the BOV namespace that imported it), and a
+site's queries only see its own rows, so importing one property's exports
+never changes another property's comp set or numbering. Results come back in
+export order (a "Comp #" column, or the row position in the file), then by
+normalized address, which is stable across rebuilds and re-imports.
+
+Imports are idempotent: a file is skipped when its contents have not changed
+since the site last imported it, and re-importing a changed file replaces
+every row that came from it, so comps deleted from an export leave the store
+too. A comp is identified by its normalized address (address_index.py), plus
+the sale date for sales and the unit type for rent comps; the most recent
+import wins.
+
+Usage:
+    This module is imported by build_bov.py. It is NOT run directly.
+
+    store = CompStore(os.path.join(CACHE_DIR, "comps.sqlite"))
+    store.import_csv("comps/sale_comps.csv", "sale", site=BOV_NAMESPACE)
+    store.sales(site=BOV_NAMESPACE, zips=["90004"], units=(6, 12), sold_since="2025-07-01")
+    store.listings(site=BOV_NAMESPACE, status=["Active", "Pending"])
+    store.rents(site=BOV_NAMESPACE, unit_type="Studio")
+"""
+
+import os
+import csv
+import re
+import time
+import hashlib
+import sqlite3
+from datetime import date, datetime
+from typing import Iterable, Optional
+
+from address_index import normalize_address
+
+KINDS = ("sale", "listing", "rent")
+# Fields a row must have to be imported; the rest may be blank and render as "n/a"
+REQUIRED = {
+    "sale": ("addr", "units", "price", "sale_date"),
+    "listing": ("addr", "units", "price", "status"),
+    "rent": ("addr", "unit_type", "rent"),
+}
+SCHEMA_VERSION = 2   # bump to rebuild older stores (they are re-imported from the exports)
+
+# Store column -> CoStar-style export headers, compared lowercase with punctuation
+# and spaces removed ("Sale Price" == "sale_price" == "SalePrice")
+COLUMN_HEADERS = {
+    "addr": ("propertyaddress", "address", "streetaddress"),
+    "city": ("city", "propertycity"),
+    "zip": ("zip", "zipcode", "postalcode", "propertyzipcode"),
+    "units": ("numberofunits", "units", "ofunits", "unitcount"),
+    "sf": ("rba", "buildingsf", "sf", "buildingsize"),
+    "yr": ("yearbuilt", "yr", "built"),
+    "price": ("saleprice", "askingprice", "price"),
+    "ppu": ("priceperunit", "ppu"),
+    "psf": ("pricepersf", "psf"),
+    "cap": ("actualcaprate", "caprate", "cap"),
+    "grm": ("grm", "grossrentmultiplier"),
+    "sale_date": ("saledate", "date", "closedate"),
+    "status": ("salestatus", "status", "listingstatus"),
+    "dom": ("daysonmarket", "dom"),
+    "unit_type": ("unittype", "bedbath", "type"),
+    "rent": ("askingrent", "rent", "rentperunit"),
+    "reno": ("renovation", "reno", "condition"),
+    "features": ("amenities", "features"),
+    "notes": ("comments", "notes"),
+    "rank": ("comp", "compno", "compnumber", "rank"),
+}
+INTEGER_COLUMNS = {"units", "sf", "yr", "price", "ppu", "dom", "rent", "rank"}
+REAL_COLUMNS = {"psf", "cap", "grm"}
+COLUMNS = tuple(COLUMN_HEADERS)
+
+# Columns a query may order by (guards the ORDER BY clause, which can't be a parameter)
+ORDER_COLUMNS = set(COLUMNS) | {"key"}
+
+_HEADER_RE = re.compile(r"[^a-z0-9]")
+_DATE_FORMATS = ("%m/%d/%Y", "%Y-%m-%d", "%m/%d/%y", "%m-%d-%Y")
+
+
+# ============================================================
+# PARSING
+# ============================================================
+
+def _number(text: str) -> Optional[float]:
+    """"$1,595,000" / "7.29%" / "1595000" -> float; blanks and dashes -> None."""
+    text = text.strip().replace("$", "").replace(",", "").replace("%", "")
+    if text in ("", "-", "--", "N/A", "n/a"):
+        return None
+    return float(text)
+
+
+def _iso_date(text: str) -> str:
+    text = text.strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    if text:
+        raise ValueError(f"Unrecognized date: {text!r}")
+    return ""
+
+
+def _header_map(headers: Iterable[str]) -> dict:
+    """{store column: index of its header in the export}; unknown headers are ignored."""
+    by_name = {_HEADER_RE.sub("", h.lower()): i for i, h in enumerate(headers)}
+    found = {}
+    for column, names in COLUMN_HEADERS.items():
+        for name in names:
+            if name in by_name:
+                found[column] = by_name[name]
+                break
+    return found
+
+
+def parse_row(values: dict) -> dict:
+    """Typed store row from {column: raw text}; derives price per unit / SF when missing."""
+    row = {}
+    for column in COLUMNS:
+        text = (values.get(column) or "").strip()
+        if column in INTEGER_COLUMNS:
+            n = _number(text)
+            row[column] = None if n is None else int(round(n))
+        elif column in REAL_COLUMNS:
+            row[column] = _number(text)
+        elif column == "sale_date":
+            row[column] = _iso_date(text)
+        else:
+            row[column] = text
+    if row["ppu"] is None and row["price"] and row["units"]:
+        row["ppu"] = int(round(row["price"] / row["units"]))
+    if row["psf"] is None and row["price"] and row["sf"]:
+        row["psf"] = round(row["price"] / row["sf"], 2)
+    return row
+
+
+# ============================================================
+# STORE
+# ============================================================
+
+def _store_key(address: str, zip_code: str = "") -> str:
+    return "|".join(normalize_address(f"{address}, {zip_code}" if zip_code else address))
+
+
+def _range(value) -> tuple:
+    """(low, high) from a (low, high) pair or a single value; either end may be None."""
+    if isinstance(value, (tuple, list)):
+        return tuple(value)
+    return value, value
+
+
+class CompStore:
+    """SQLite comps table with per-filter indexes and CSV bulk import."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            with self._conn:
+                self._conn.execute("DROP TABLE IF EXISTS comps")
+                self._conn.execute("DROP TABLE IF EXISTS imports")
+                self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        column_defs = ", ".join(
+            f"{c} {'INTEGER' if c in INTEGER_COLUMNS else 'REAL' if c in REAL_COLUMNS else 'TEXT'}"
+            + (" NOT NULL DEFAULT ''" if c in ("sale_date", "unit_type") else "")
+            for c in COLUMNS)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS comps ("
+                " id INTEGER PRIMARY KEY, site TEXT NOT NULL, kind TEXT NOT NULL, key TEXT NOT NULL,"
+                f" {column_defs}, source TEXT, UNIQUE (site, kind, key, sale_date, unit_type))"
+            )
+            for column in ("zip", "units", "sale_date", "status", "yr"):
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS comps_{column} ON comps (site, kind, {column})")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS imports ("
+                " site TEXT NOT NULL, source TEXT NOT NULL, kind TEXT NOT NULL, digest TEXT NOT NULL,"
+                " rows INTEGER, updated REAL, PRIMARY KEY (site, source))"
+            )
+        self.imported = 0
+        self.skipped = 0
+        self.rejected = []   # (export, line, missing fields) for rows left out of the store
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM comps").fetchone()[0]
+
+    # ---- import ----
+
+    def put_many(self, kind: str, rows: Iterable[dict], source: str = "", site: str = "") -> int:
+        """Insert or replace one site's parsed rows (parse_row) of one kind; returns the row count."""
+        if kind not in KINDS:
+            raise ValueError(f"Unknown comp kind {kind!r}; expected one of {', '.join(KINDS)}")
+        records = []
+        for row in rows:
+            if not row.get("addr"):
+                continue
+            records.append((site, kind, _store_key(row["addr"], row.get("zip") or ""),
+                            *(row.get(c) if c not in ("sale_date", "unit_type") else row.get(c) or "" for c in COLUMNS),
+                            source))
+        with self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO comps (site, kind, key, {', '.join(COLUMNS)}, source) "
+                f"VALUES ({', '.join('?' * (len(COLUMNS) + 4))})", records)
+        return len(records)
+
+    def import_csv(self, path: str, kind: str, site: str = "") -> int:
+        """
+        Bulk-import one CoStar-style export for a site. Returns the rows imported,
+        or 0 when the file is unchanged since the site last imported it. Rows
+        missing a REQUIRED field are left out and listed in rejected.
+        """
+        if kind not in KINDS:
+            raise ValueError(f"Unknown comp kind {kind!r}; expected one of {', '.join(KINDS)}")
+        with open(path, "rb") as f:
+            raw = f.read()
+        digest = hashlib.sha1(raw).hexdigest()
+        source = os.path.abspath(path)
+        seen = self._conn.execute("SELECT kind, digest FROM imports WHERE site = ? AND source = ?",
+                                  (site, source)).fetchone()
+        if seen == (kind, digest):
+            self.skipped += 1
+            return 0
+        reader = csv.reader(raw.decode("utf-8-sig").splitlines())
+        header = _header_map(next(reader, []))
+        if "addr" not in header:
+            raise ValueError(f"{path}: no address column (expected one of: Property Address, Address)")
+        rows = []
+        for line, values in enumerate(reader, 2):
+            if not any(v.strip() for v in values):
+                continue
+            row = parse_row({c: values[i] if i < len(values) else "" for c, i in header.items()})
+            missing = [c for c in REQUIRED[kind] if row[c] in (None, "")]
+            if missing:
+                self.rejected.append((path, line, missing))
+                continue
+            if row["rank"] is None:
+                row["rank"] = len(rows) + 1
+            rows.append(row)
+        with self._conn:
+            self._conn.execute("DELETE FROM comps WHERE site = ? AND source = ?", (site, source))
+        count = self.put_many(kind, rows, source, site)
+        # An export with rejected rows is re-read (and re-reported) every build until it is fixed
+        rejected = any(r[0] == path for r in self.rejected)
+        with self._conn:
+            if rejected:
+                self._conn.execute("DELETE FROM imports WHERE site = ? AND source = ?", (site, source))
+            else:
+                self._conn.execute("INSERT OR REPLACE INTO imports VALUES (?, ?, ?, ?, ?, ?)",
+                                   (site, source, kind, digest, count, time.time()))
+        self.imported += count
+        return count
+
+    # ---- queries ----
+
+    def query(self, kind: str, site: Optional[str] = None, zips: Optional[Iterable[str]] = None, units=None,
+              sold_since=None, sold_before=None, status=None, vintage=None, unit_type: Optional[str] = None,
+              order_by: str = "rank", limit: Optional[int] = None) -> list:
+        """
+        Comps of one kind matching every given filter, as typed store rows. site
+        limits the result to one site's rows (None: every site). units and
+        vintage take a (low, high) pair (inclusive, either end None) or one value;
+        sold_since/sold_before take ISO strings or dates; status takes one value
+        or a list. order_by is a column name, "-" prefixed for descending; the
+        default is export order. Ties break on normalized address, sale date and
+        unit type, so the order never depends on when rows were imported.
+        """
+        where, params = ["kind = ?"], [kind]
+        if site is not None:
+            where.append("site = ?")
+            params.append(site)
+        if zips is not None:
+            zips = list(zips)
+            where.append(f"zip IN ({', '.join('?' * len(zips))})")
+            params += zips
+        for column, value in (("units", units), ("yr", vintage)):
+            if value is None:
+                continue
+            low, high = _range(value)
+            if low is not None:
+                where.append(f"{column} >= ?")
+                params.append(low)
+            if high is not None:
+                where.append(f"{column} <= ?")
+                params.append(high)
+        if sold_since is not None:
+            where.append("sale_date >= ?")
+            params.append(str(sold_since))
+        if sold_before is not None:
+            where.append("sale_date <> '' AND sale_date < ?")
+            params.append(str(sold_before))
+        if status is not None:
+            statuses = [status] if isinstance(status, str) else list(status)
+            where.append(f"status IN ({', '.join('?' * len(statuses))})")
+            params += statuses
+        if unit_type is not None:
+            where.append("unit_type = ?")
+            params.append(unit_type)
+        column = order_by.lstrip("-")
+        if column not in ORDER_COLUMNS:
+            raise ValueError(f"Cannot order comps by {order_by!r}")
+        sql = (f"SELECT {', '.join(COLUMNS)} FROM comps WHERE {' AND '.join(where)} "
+               f"ORDER BY {column} {'DESC' if order_by.startswith('-') else 'ASC'}, key, sale_date, unit_type")
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return [dict(zip(COLUMNS, r)) for r in self._conn.execute(sql, params)]
+
+    def sales(self, **filters) -> list:
+        """Sale comps in the SALE_COMPS shape, numbered in result order."""
+        return [{"num": i, "addr": r["addr"], "city": r["city"] or "Los Angeles", "units": r["units"],
+                 "sf": r["sf"], "yr": r["yr"], "price": r["price"], "ppu": r["ppu"], "psf": r["psf"],
+                 "cap": r["cap"], "grm": r["grm"], "date": _display_date(r["sale_date"]), "notes": r["notes"]}
+                for i, r in enumerate(self.query("sale", **filters), 1)]
+
+    def listings(self, **filters) -> list:
+        """On-market comps in the ACTIVE_COMPS shape, numbered in result order."""
+        return [{"num": i, "addr": r["addr"], "city": r["city"] or "Los Angeles", "units": r["units"],
+                 "price": r["price"], "ppu": r["ppu"], "cap": r["cap"], "grm": r["grm"], "dom": r["dom"],
+                 "status": r["status"], "notes": r["notes"]}
+                for i, r in enumerate(self.query("listing", **filters), 1)]
+
+    def rents(self, **filters) -> list:
+        """Rent comps in the RENT_COMPS shape; dist is left blank for the build to fill from the subject."""
+        return [{"addr": r["addr"], "city": r["city"] or "Los Angeles", "unit_type": r["unit_type"],
+                 "rent": r["rent"], "reno": r["reno"], "dist": "", "features": r["features"]}
+                for r in self.query("rent", **filters)]
+
+    def close(self):
+        self._conn.close()
+
+
+def _display_date(iso: str) -> str:
+    return date.fromisoformat(iso).strftime("%m/%d/%Y") if iso else ""
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Hold-Period DCF for LAAA BOV Builds
+===================================
+Projects NOI, debt service, balloon payoff and exit proceeds over the hold
+period for every scenario in a price_metrics() result at once, and solves
+levered and unlevered IRRs with a vectorized root finder.
+
+irr() runs Newton's method on all scenarios together; rows that fail to
+converge (a bad derivative, a step outside the domain) are finished by
+bisection on a bracket that is widened per row until the NPV changes sign.
+Rows with no sign change at all have no IRR and return NaN.
+
+Usage:
+    This module is imported by build_bov.py and simulation.py. It is NOT run directly.
+    Requires numpy.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from amortization import balloon
+
+
+# ============================================================
+# IRR SOLVER
+# ============================================================
+
+def npv(rate, cash_flows) -> np.ndarray:
+    """NPV of cash_flows (time on the last axis, t = 0..T) at rate (broadcast over the leading axes)."""
+    cash_flows = np.asarray(cash_flows, dtype=float)
+    t = np.arange(cash_flows.shape[-1])
+    return (cash_flows / (1 + np.asarray(rate, dtype=float)[..., None]) ** t).sum(axis=-1)
+
+
+def irr(cash_flows, guess: float = 0.1, tol: float = 1e-10, max_iter: int = 50) -> np.ndarray:
+    """
+    IRR of every cash-flow series in cash_flows (time on the last axis).
+    Returns an array of the leading shape; NaN where no IRR exists.
+    """
+    cash_flows = np.asarray(cash_flows, dtype=float)
+    shape = cash_flows.shape[:-1]
+    flows = cash_flows.reshape(-1, cash_flows.shape[-1])
+    t = np.arange(flows.shape[1])
+
+    rate = np.full(len(flows), guess)
+    done = np.zeros(len(flows), dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for _ in range(max_iter):
+            active = ~done
+            if not active.any():
+                break
+            r = rate[active, None]
+            discount = (1 + r) ** -t
+            f = (flows[active] * discount).sum(axis=1)
+            df = (-t * flows[active] * discount / (1 + r)).sum(axis=1)
+            step = f / df
+            new_rate = rate[active] - step
+            ok = np.isfinite(new_rate) & (new_rate > -1)
+            rate[active] = np.where(ok, new_rate, np.nan)
+            done[active] = ~ok | (np.abs(step) < tol)
+        converged = np.isfinite(rate) & done
+        converged[converged] = np.abs(npv(rate[converged], flows[converged])) <= 1e-6 * np.abs(flows[converged]).sum(axis=1)
+
+    todo = ~converged
+    if todo.any():
+        rate[todo] = _bisect(flows[todo])
+    return rate.reshape(shape)
+
+
+def _bisect(flows: np.ndarray, iterations: int = 200) -> np.ndarray:
+    """Bracketing fallback: widen [lo, hi] per row until the NPV changes sign, then bisect."""
+    lo = np.full(len(flows), -0.999)
+    hi = np.full(len(flows), 1.0)
+    npv_lo = npv(lo, flows)
+    npv_hi = npv(hi, flows)
+    for _ in range(12):   # hi up to 4096 (409,600%)
+        grow = np.sign(npv_lo) == np.sign(npv_hi)
+        if not grow.any():
+            break
+        hi = np.where(grow, hi * 2, hi)
+        npv_hi = np.where(grow, npv(hi, flows), npv_hi)
+    valid = np.sign(npv_lo) != np.sign(npv_hi)
+    for _ in range(iterations):
+        mid = (lo + hi) / 2
+        npv_mid = npv(mid, flows)
+        left = np.sign(npv_mid) == np.sign(npv_lo)
+        lo = np.where(left, mid, lo)
+        npv_lo = np.where(left, npv_mid, npv_lo)
+        hi = np.where(left, hi, mid)
+        if np.all(hi - lo < 1e-12):
+            break
+    return np.where(valid, (lo + hi) / 2, np.nan)
+
+
+# ============================================================
+# HOLD-PERIOD PROJECTION
+# ============================================================
+
+@dataclass(frozen=True)
+class DCFAssumptions:
+    hold_years: int = 5
+    rent_growth: float = 0.03
+    expense_growth: float = 0.03
+    tax_growth: float = 0.02          # Prop 13 cap on assessed value growth
+    exit_cap: float = 0.0575
+    selling_costs: float = 0.03
+    lease_up_years: Optional[int] = None   # years to move from current to pro forma rents; None = stay on current
+
+
+def hold_period_dcf(columns: dict, assumptions, dcf: DCFAssumptions = DCFAssumptions()) -> dict:
+    """
+    Project every scenario in a price_metrics() result over the hold period.
+
+    Returns {name: array}: per-year series (noi, debt_service, cash_flow) with a
+    trailing year axis, and per-scenario exit_value, balloon, sale_proceeds,
+    unlevered_irr, levered_irr (percent) and equity_multiple.
+    """
+    a = assumptions.arrays()
+    price = columns["price"]
+    loan = columns["loan_amount"]
+    equity = columns["down_payment"]
+    years = np.arange(dcf.hold_years + 1)   # + 1 for the forward NOI capitalized at exit
+
+    gsr = a["gsr"][..., None]
+    if dcf.lease_up_years:
+        gsr = gsr + (a["pf_gsr"][..., None] - gsr) * np.minimum(years / dcf.lease_up_years, 1)
+    gsr = gsr * (1 + dcf.rent_growth) ** years
+    egi = gsr * (1 - a["vacancy_pct"][..., None]) + a["other_income"][..., None]
+    expenses = a["non_tax_cur_exp"][..., None] * (1 + dcf.expense_growth) ** years
+    taxes = columns["taxes"][..., None] * (1 + dcf.tax_growth) ** years
+    noi = egi - expenses - taxes
+
+    debt_service = np.broadcast_to(columns["debt_service"][..., None], noi[..., :-1].shape)
+    cash_flow = noi[..., :-1] - debt_service
+    exit_value = noi[..., -1] / dcf.exit_cap
+    net_sale = exit_value * (1 - dcf.selling_costs)
+    payoff = balloon(loan, a["interest_rate"], a["amortization_years"], dcf.hold_years)
+    sale_proceeds = net_sale - payoff
+
+    unlevered = np.concatenate([-price[..., None], noi[..., :-1]], axis=-1)
+    unlevered[..., -1] += net_sale
+    levered = np.concatenate([-equity[..., None], cash_flow], axis=-1)
+    levered[..., -1] += sale_proceeds
+
+    return {
+        "noi": noi[..., :-1], "debt_service": debt_service, "cash_flow": cash_flow,
+        "exit_value": exit_value, "balloon": payoff, "sale_proceeds": sale_proceeds,
+        "unlevered_irr": irr(unlevered) * 100, "levered_irr": irr(levered) * 100,
+        "equity_multiple": (cash_flow.sum(axis=-1) + sale_proceeds) / equity,
+    }
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Debt Product Comparison for LAAA BOV Builds
+===========================================
+Sizes a catalogue of loan programs (bank, agency, interest-only, seller carry)
+against every price in the pricing matrix in a single batched computation.
+
+Each product's terms become one row of (products x 1) arrays and the prices one
+row of (1 x prices), so a single price_metrics() call sizes every first
+mortgage at once: the lesser of the LTV limit and the DCR-supported loan, with
+the binding constraint recorded per cell. Interest-only periods and seller
+carry-back financing are then layered on as array arithmetic over the same
+grid. Adding products adds rows, not passes, so build time stays flat.
+
+Usage:
+    This module is imported by build_bov.py. It is NOT run directly.
+    Requires numpy; build_bov.py skips the comparison without it.
+"""
+
+from dataclasses import dataclass, fields
+
+import numpy as np
+
+from amortization import remaining_balance
+from pricing_engine import Assumptions, price_metrics
+
+
+# ============================================================
+# PRODUCTS
+# ============================================================
+
+@dataclass(frozen=True)
+class DebtProduct:
+    """
+    One loan program. The first mortgage is sized on the amortizing payment even
+    during an interest-only period (lender convention); year-1 debt service is
+    interest-only when io_years > 0. seller_carry_pct of the price is carried
+    back by the seller as an interest-only second, due at term.
+    """
+    name: str
+    interest_rate: float
+    amortization_years: int
+    max_ltv: float
+    min_dcr: float
+    term_years: int = 5
+    io_years: int = 0
+    seller_carry_pct: float = 0.0
+    seller_carry_rate: float = 0.0
+
+
+def _product_columns(products) -> dict:
+    """Product terms as (products, 1) float columns."""
+    return {f.name: np.array([getattr(p, f.name) for p in products], dtype=float)[:, None]
+            for f in fields(DebtProduct) if f.name != "name"}
+
+
+# ============================================================
+# BATCHED SIZING
+# ============================================================
+
+def compare_products(prices, assumptions: Assumptions, products) -> dict:
+    """
+    Size every product at every price. Returns {name: (products, prices) array}:
+    loan_amount, loan_constraint, seller_carry, down_payment, debt_service
+    (year 1, both liens), net_cf_cur, coc_cur, dcr_cur and balloon (both liens, at term).
+    """
+    if not products:
+        raise ValueError("compare_products needs at least one DebtProduct")
+    p = _product_columns(products)
+    price = np.asarray(prices, dtype=float)[None, :]
+    first = price_metrics(price, assumptions, interest_rate=p["interest_rate"],
+                          amortization_years=p["amortization_years"], max_ltv=p["max_ltv"],
+                          min_dcr=p["min_dcr"], loan_term_years=p["term_years"])
+
+    loan = first["loan_amount"]
+    first_ds = np.where(p["io_years"] > 0, loan * p["interest_rate"], first["debt_service"])
+    carry = price * p["seller_carry_pct"]
+    carry = np.minimum(carry, price - loan)   # never finance more than the price
+    debt_service = first_ds + carry * p["seller_carry_rate"]
+    down_payment = price - loan - carry
+    net_cf_cur = first["cur_noi"] - debt_service
+    shape = loan.shape
+    coc_cur = np.divide(net_cf_cur * 100, down_payment, out=np.zeros(shape), where=down_payment > 0)
+    dcr_cur = np.divide(first["cur_noi"], debt_service, out=np.zeros(shape), where=debt_service > 0)
+    amortizing_months = np.maximum(p["term_years"] - p["io_years"], 0) * 12
+    balloon = remaining_balance(loan, p["interest_rate"], p["amortization_years"], amortizing_months) + carry
+
+    return {
+        "price": np.broadcast_to(price, shape),
+        "loan_amount": loan, "loan_constraint": first["loan_constraint"],
+        "seller_carry": np.broadcast_to(carry, shape), "down_payment": down_payment,
+        "debt_service": debt_service, "net_cf_cur": net_cf_cur,
+        "coc_cur": coc_cur, "dcr_cur": dcr_cur,
+        "balloon": balloon,
+    }
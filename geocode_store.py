@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Geocode Store for LAAA BOV Builds
+=================================
+Persistent, SQLite-backed geocoding cache shared by every BOV built on this
+machine. Addresses are keyed by their normalized form (address_index.py), so
+"101 S Kenmore Ave" and "101 South Kenmore Avenue" are one entry. Each build
+looks up all of its comps in one query; only addresses the store has never
+seen go to the geocoding provider, in one batch, and the results are written
+back so the next build geocodes nothing. Pinned coordinates (hand-verified
+points for the few addresses a geocoder places badly) always win and never
+touch the store.
+
+Providers are pluggable: anything with a geocode_batch(addresses) method that
+returns {address: (lat, lng) or None}. StaticProvider answers from a dict of
+known coordinates (seed data, and the local stand-in for firewalled machines),
+NominatimProvider queries OpenStreetMap's Nominatim at its 1 request/second
+usage limit, and ChainProvider tries several in order.
+
+Usage:
+    This module is imported by build_bov.py. It is NOT run directly.
+
+    store = GeocodeStore(os.path.join(CACHE_DIR, "geocode.sqlite"))
+    provider = ChainProvider([StaticProvider(SEED_COORDINATES), NominatimProvider()])
+    index = store.resolve(addresses, provider, pinned=VERIFIED_COORDINATES)
+    index.lookup("101 S Kenmore Ave")   # -> (lat, lng)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Iterable, Optional
+
+from address_index import AddressIndex, normalize_address
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+USER_AGENT = "LAAA-BOV-Builder/1.0"
+
+
+# ============================================================
+# PROVIDERS
+# ============================================================
+
+class StaticProvider:
+    """
+    Geocodes from a fixed {address: (lat, lng)} mapping, matched by normalized
+    address. An address missing from the mapping is not a verdict that it
+    can't be geocoded, so its misses are not stored.
+    """
+
+    name = "static"
+    stores_misses = False
+
+    def __init__(self, coordinates: dict):
+        self._index = AddressIndex(coordinates)
+
+    def geocode_batch(self, addresses: Iterable[str]) -> dict:
+        return {a: self._index.lookup(a) for a in addresses}
+
+
+class NominatimProvider:
+    """
+    OpenStreetMap Nominatim, one request per address, spaced by min_interval
+    seconds (the public server allows 1/s). The first connection-level failure,
+    rate limit (429) or server error (5xx) marks the service unreachable: the
+    rest of the batch comes back None and none of those misses are stored.
+    """
+
+    name = "nominatim"
+    stores_misses = True
+
+    def __init__(self, url: str = NOMINATIM_URL, min_interval: float = 1.0, timeout: float = 10,
+                 country_codes: str = "us"):
+        self.url = url
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self.country_codes = country_codes
+        self.unreachable = False
+        self._last = 0.0
+
+    def _geocode(self, address: str) -> Optional[tuple]:
+        wait = self._last + self.min_interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        query = urllib.parse.urlencode({"q": address, "format": "json", "limit": 1, "countrycodes": self.country_codes})
+        request = urllib.request.Request(f"{self.url}?{query}", headers={"User-Agent": USER_AGENT})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as resp:
+                results = json.load(resp)
+        except urllib.error.HTTPError as e:
+            if e.code == 429 or e.code >= 500:
+                self.unreachable = True
+            return None
+        except (urllib.error.URLError, OSError):
+            self.unreachable = True
+            return None
+        finally:
+            self._last = time.monotonic()
+        if not results:
+            return None
+        return float(results[0]["lat"]), float(results[0]["lon"])
+
+    def geocode_batch(self, addresses: Iterable[str]) -> dict:
+        return {a: None if self.unreachable else self._geocode(a) for a in addresses}
+
+
+class ChainProvider:
+    """Asks each provider in turn for the addresses the previous ones could not place."""
+
+    def __init__(self, providers: list):
+        self.providers = providers
+        self.name = "+".join(p.name for p in providers)
+
+    @property
+    def unreachable(self) -> bool:
+        return any(getattr(p, "unreachable", False) for p in self.providers)
+
+    @property
+    def stores_misses(self) -> bool:
+        return getattr(self.providers[-1], "stores_misses", True)
+
+    def geocode_batch(self, addresses: Iterable[str]) -> dict:
+        results = {a: None for a in addresses}
+        for provider in self.providers:
+            todo = [a for a, v in results.items() if v is None]
+            if not todo:
+                break
+            results.update({a: v for a, v in provider.geocode_batch(todo).items() if v is not None})
+        return results
+
+
+# ============================================================
+# STORE
+# ============================================================
+
+def _store_key(address: str) -> str:
+    return "|".join(normalize_address(address))
+
+
+class GeocodeStore:
+    """
+    SQLite table of normalized address -> (lat, lng). Misses are remembered too
+    (lat/lng NULL) for retry_misses_days, so an address no provider can place
+    is not re-queried on every build.
+    """
+
+    SQLITE_VARS = 500   # stay under SQLite's bound-parameter limit per query
+
+    def __init__(self, path: str, retry_misses_days: float = 7):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.retry_misses_days = retry_misses_days
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocodes ("
+            " key TEXT PRIMARY KEY, address TEXT NOT NULL, lat REAL, lng REAL,"
+            " provider TEXT, updated REAL NOT NULL)"
+        )
+        self.pinned = 0
+        self.hits = 0
+        self.geocoded = 0
+        self.not_found = []
+
+    def get_many(self, addresses: Iterable[str]) -> dict:
+        """{address: (lat, lng), or None for a remembered miss} for the addresses in the store."""
+        by_key = {}
+        for a in addresses:
+            by_key.setdefault(_store_key(a), []).append(a)
+        keys = list(by_key)
+        found = {}
+        miss_cutoff = time.time() - self.retry_misses_days * 86400
+        for i in range(0, len(keys), self.SQLITE_VARS):
+            chunk = keys[i:i + self.SQLITE_VARS]
+            rows = self._conn.execute(
+                f"SELECT key, lat, lng, updated FROM geocodes WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            for key, lat, lng, updated in rows:
+                if lat is None and updated < miss_cutoff:
+                    continue
+                for a in by_key[key]:
+                    found[a] = None if lat is None else (lat, lng)
+        return found
+
+    def put_many(self, results: dict, provider: str = ""):
+        """Record {address: (lat, lng) or None} from one provider batch."""
+        now = time.time()
+        rows = [(_store_key(a), a, *(latlng if latlng else (None, None)), provider, now)
+                for a, latlng in results.items()]
+        with self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def resolve(self, addresses: Iterable[str], provider=None, pinned: Optional[dict] = None) -> AddressIndex:
+        """
+        Coordinates for every address: pinned coordinates first (verified by hand,
+        never stored), then one bulk store lookup, then one provider batch for
+        addresses never seen before (stored for next time). Returns an
+        AddressIndex of everything placed; unplaced addresses are in not_found.
+        """
+        addresses = list(dict.fromkeys(addresses))
+        pins = AddressIndex(pinned)
+        known = {a: pins.lookup(a) for a in addresses}
+        known = {a: v for a, v in known.items() if v is not None}
+        self.pinned += len(known)
+        stored = self.get_many([a for a in addresses if a not in known])
+        self.hits += len(stored)
+        known.update(stored)
+        todo = [a for a in addresses if a not in known]
+        if todo and provider is not None:
+            fresh = provider.geocode_batch(todo)
+            placed = {a: v for a, v in fresh.items() if v is not None}
+            self.geocoded += len(placed)
+            # Don't remember misses from a provider that could not be reached or only knows a fixed table
+            final = getattr(provider, "stores_misses", True) and not getattr(provider, "unreachable", False)
+            remember = fresh if final else placed
+            self.put_many(remember, provider.name)
+            known.update(fresh)
+        self.not_found = [a for a in addresses if known.get(a) is None]
+        return AddressIndex({a: v for a, v in known.items() if v is not None})
+
+    def close(self):
+        self._conn.close()
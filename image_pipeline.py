@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Image Pipeline for LAAA BOV Builds
+==================================
+Content-addressed, disk-backed cache for the image payloads that build_bov.py
+inlines into index.html, a Pillow stage that resizes and recompresses each
+image to the size of the slot it is displayed in, and post-processing passes
+over the final HTML: one keeps each distinct inline image exactly once, the
+other moves every inline image out to a content-hashed file under assets/.
+
+Usage:
+    This module is imported by build_bov.py. It is NOT run directly.
+    The cache lives outside the repo (see CACHE_DIR in build_bov.py) so every
+    BOV site built on the same machine shares the same encoded headshots/logos.
+"""
+
+import io
+import os
+import re
+import json
+import time
+import base64
+import hashlib
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+# ============================================================
+# CONTENT-ADDRESSED IMAGE CACHE
+# ============================================================
+
+class ImageCache:
+    """
+    Disk cache of derived image payloads, keyed by the SHA-256 of the source file.
+
+    Each source file can have any number of named variants (e.g. "datauri").
+    A (path, mtime, size) fast path avoids re-hashing unchanged files, so a warm
+    build never reads the original PNGs at all. Total variant bytes are capped
+    at max_bytes; the least recently used variants are evicted on save().
+
+    Layout:
+        <root>/index.json             file fingerprints + variant usage
+        <root>/blobs/ab/abcd...-name  one file per (digest, variant)
+    """
+
+    INDEX_VERSION = 1
+
+    def __init__(self, root: str, max_bytes: int = 256 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._index_path = os.path.join(root, "index.json")
+        self._files = {}     # abs path -> {"mtime_ns", "size", "sha256"}
+        self._entries = {}   # "sha256/variant" -> {"bytes", "used"}
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") == self.INDEX_VERSION:
+                self._files = index.get("files", {})
+                self._entries = index.get("entries", {})
+        except (OSError, ValueError):
+            pass
+
+    def _blob_path(self, digest: str, variant: str) -> str:
+        return os.path.join(self.root, "blobs", digest[:2], f"{digest}-{variant}")
+
+    def digest(self, path: str) -> str:
+        """Return the SHA-256 of a file, trusting the cached value if mtime and size are unchanged."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        known = self._files.get(path)
+        if known and known["mtime_ns"] == st.st_mtime_ns and known["size"] == st.st_size:
+            return known["sha256"]
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        self._files[path] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": digest}
+        self._dirty = True
+        return digest
+
+    def get(self, digest: str, variant: str) -> Optional[bytes]:
+        """Return a cached variant, or None if it is missing or was evicted from disk."""
+        key = f"{digest}/{variant}"
+        if key not in self._entries:
+            return None
+        try:
+            with open(self._blob_path(digest, variant), "rb") as f:
+                data = f.read()
+        except OSError:
+            del self._entries[key]
+            self._dirty = True
+            return None
+        self._entries[key]["used"] = time.time()
+        self._dirty = True
+        return data
+
+    def put(self, digest: str, variant: str, data: bytes):
+        """Store a variant. Failures (read-only disk, etc.) only cost a cache miss next time."""
+        blob = self._blob_path(digest, variant)
+        try:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            tmp = f"{blob}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, blob)
+        except OSError as e:
+            print(f"  WARNING: Could not write image cache entry ({e})")
+            return
+        self._entries[f"{digest}/{variant}"] = {"bytes": len(data), "used": time.time()}
+        self._dirty = True
+
+    def fetch(self, path: str, variant: str, producer: Callable[[bytes], bytes]) -> bytes:
+        """
+        Return the named variant of an image file, building it on a miss.
+
+        producer receives the raw file bytes and returns the variant bytes.
+        """
+        digest = self.digest(path)
+        data = self.get(digest, variant)
+        if data is not None:
+            self.hits += 1
+            return data
+        self.misses += 1
+        with open(path, "rb") as f:
+            data = producer(f.read())
+        self.put(digest, variant, data)
+        return data
+
+    def save(self):
+        """Evict least recently used variants beyond max_bytes and persist the index."""
+        if not self._dirty:
+            return
+        total = sum(e["bytes"] for e in self._entries.values())
+        if total > self.max_bytes:
+            for key, entry in sorted(self._entries.items(), key=lambda kv: kv[1]["used"]):
+                if total <= self.max_bytes:
+                    break
+                digest, variant = key.split("/", 1)
+                try:
+                    os.remove(self._blob_path(digest, variant))
+                except OSError:
+                    pass
+                total -= entry["bytes"]
+                del self._entries[key]
+        # Forget fingerprints of files that no longer exist
+        self._files = {p: v for p, v in self._files.items() if os.path.exists(p)}
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            tmp = f"{self._index_path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": self.INDEX_VERSION, "files": self._files,
+                           "entries": self._entries}, f)
+            os.replace(tmp, self._index_path)
+            self._dirty = False
+        except OSError as e:
+            print(f"  WARNING: Could not save image cache index ({e})")
+
+
+# ============================================================
+# RESIZE + RECOMPRESS
+# ============================================================
+
+@dataclass(frozen=True)
+class ImageSlot:
+    """Target rendering for a family of <img> placements (already doubled for retina screens)."""
+    width: int
+    height: int
+    fit: str = "contain"         # "contain" fits inside the box, "cover" fills it (circle crops)
+    quality: Optional[int] = 80  # None = lossless
+
+    @property
+    def variant(self) -> str:
+        q = "lossless" if self.quality is None else f"q{self.quality}"
+        return f"opt-{self.width}x{self.height}-{self.fit}-{q}"
+
+    def fitted_size(self, w: int, h: int) -> tuple[int, int]:
+        """Output size for a w x h source (never upscaled)."""
+        if self.fit == "cover":
+            scale = max(self.width / w, self.height / h)
+        else:
+            scale = min(self.width / w, self.height / h)
+        if scale >= 1:
+            return w, h
+        return max(1, round(w * scale)), max(1, round(h * scale))
+
+    def scaled(self, width: int) -> "ImageSlot":
+        """Same slot at a smaller width (for srcset variants)."""
+        return ImageSlot(width, max(1, round(self.height * width / self.width)), self.fit, self.quality)
+
+
+def data_uri_payload_bytes(data_uri: str) -> int:
+    """Decoded size of a base64 data URI, without decoding it."""
+    b64 = data_uri.split(",", 1)[-1]
+    return len(b64) * 3 // 4 - b64[-2:].count("=")
+
+
+def optimize_image(raw: bytes, slot: ImageSlot) -> tuple[bytes, str]:
+    """
+    Downscale an image to its slot size and re-encode it.
+    Returns (encoded bytes, mime type). Never upscales.
+
+    WebP is used when Pillow was built with it (alpha preserved). Otherwise opaque
+    images become progressive JPEG and transparent ones an optimized PNG.
+    """
+    # Pillow is optional, so it is imported only when an image is actually optimized;
+    # without it build_bov.py falls back to inlining the original files
+    from PIL import Image, features
+
+    img = Image.open(io.BytesIO(raw))
+    img.load()
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+    if img.mode == "RGBA" and img.getchannel("A").getextrema() == (255, 255):
+        img = img.convert("RGB")
+
+    size = slot.fitted_size(*img.size)
+    if size != img.size:
+        img = img.resize(size, Image.LANCZOS)
+
+    buf = io.BytesIO()
+    if features.check("webp"):
+        if slot.quality is None:
+            img.save(buf, format="WEBP", lossless=True, method=6)
+        else:
+            img.save(buf, format="WEBP", quality=slot.quality, method=6)
+        return buf.getvalue(), "image/webp"
+    if img.mode == "RGBA" or slot.quality is None:
+        img.save(buf, format="PNG", optimize=True)
+        return buf.getvalue(), "image/png"
+    img.save(buf, format="JPEG", quality=slot.quality, optimize=True, progressive=True)
+    return buf.getvalue(), "image/jpeg"
+
+
+def optimized_data_uri(raw: bytes, slot: ImageSlot) -> bytes:
+    """ImageCache producer: optimized image as an ASCII data URI."""
+    data, mime = optimize_image(raw, slot)
+    return f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}".encode("ascii")
+
+
+def placeholder_data_uri(raw: bytes, width: int = 24) -> bytes:
+    """ImageCache producer: tiny blurred low-quality placeholder (a few hundred bytes)."""
+    from PIL import Image, ImageFilter
+
+    img = Image.open(io.BytesIO(raw)).convert("RGB")
+    img = img.resize((width, max(1, round(img.height * width / img.width))), Image.BILINEAR)
+    img = img.filter(ImageFilter.GaussianBlur(1))
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=40, optimize=True)
+    return f"data:image/jpeg;base64,{base64.b64encode(buf.getvalue()).decode('ascii')}".encode("ascii")
+
+
+# ============================================================
+# INLINE IMAGE DEDUPLICATION
+# ============================================================
+
+_TAG_RE = re.compile(r"<[a-zA-Z][^<>]*>")
+_DATA_URI_RE = re.compile(r"data:image/[a-zA-Z0-9+.-]+;base64,[A-Za-z0-9+/=]+")
+# 1x1 transparent GIF shown until the loader swaps in the shared payload
+_PLACEHOLDER = "data:image/gif;base64,R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7"
+
+# The first occurrence of a repeated payload is tagged "<uri>#iN" (fragments are
+# ignored when rendering). Later occurrences become "<placeholder>#iN" and this
+# loader copies the payload over from the tagged element.
+_DEDUP_LOADER = """<script>
+(function() {
+    var attrs = ['src', 'srcset', 'style'], shared = {};
+    document.querySelectorAll('[data-img-key]').forEach(function(el) { attrs.forEach(function(a) { var v = el.getAttribute(a); if (v) v.replace(/(data:image\\/[\\w+.-]+;base64,[\\w+\\/=]+)#(i\\d+)/g, function(m, uri, key) { shared[key] = uri; }); }); });
+    document.querySelectorAll('[data-img-ref]').forEach(function(el) { attrs.forEach(function(a) { var v = el.getAttribute(a); if (v && v.indexOf('#i') > -1) el.setAttribute(a, v.replace(/data:image\\/gif;base64,[\\w+\\/=]+#(i\\d+)/g, function(m, key) { return shared[key] || m; })); }); });
+})();
+</script>
+"""
+
+
+def _add_attr(tag: str, attr: str) -> str:
+    """Insert an attribute right after the tag name."""
+    name_end = re.match(r"<[a-zA-Z0-9-]+", tag).end()
+    return f"{tag[:name_end]} {attr}{tag[name_end:]}"
+
+
+def dedupe_inline_images(html: str) -> tuple[str, dict]:
+    """
+    Emit every distinct inline image payload exactly once.
+
+    Only data URIs inside HTML tags (src, srcset, style attributes) are touched.
+    Returns (html, stats) where stats has "payloads" (distinct images that were
+    repeated), "references" (occurrences replaced) and "bytes_saved".
+    """
+    counts = {}
+    for tag in _TAG_RE.findall(html):
+        for uri in _DATA_URI_RE.findall(tag):
+            counts[uri] = counts.get(uri, 0) + 1
+    keys = {}
+    stats = {"payloads": 0, "references": 0, "bytes_saved": 0}
+    repeated = {uri for uri, n in counts.items() if n > 1}
+    if not repeated:
+        return html, stats
+
+    def rewrite(m):
+        tag = m.group(0)
+        first, later = False, False
+
+        def swap(u):
+            nonlocal first, later
+            uri = u.group(0)
+            if uri not in repeated:
+                return uri
+            if uri not in keys:
+                keys[uri] = f"i{len(keys)}"
+                first = True
+                return f"{uri}#{keys[uri]}"
+            later = True
+            stats["references"] += 1
+            return f"{_PLACEHOLDER}#{keys[uri]}"
+
+        tag = _DATA_URI_RE.sub(swap, tag)
+        if first:
+            tag = _add_attr(tag, "data-img-key")
+        if later:
+            tag = _add_attr(tag, "data-img-ref")
+        return tag
+
+    html = _TAG_RE.sub(rewrite, html)
+    stats["payloads"] = len(keys)
+    stats["bytes_saved"] = sum(len(uri) * (counts[uri] - 1) for uri in repeated) \
+        - stats["references"] * (len(_PLACEHOLDER) + 20) - len(_DEDUP_LOADER)
+    idx = html.rfind("</body>")
+    if idx == -1:
+        html += _DEDUP_LOADER
+    else:
+        html = html[:idx] + _DEDUP_LOADER + html[idx:]
+    return html, stats
+
+
+# ============================================================
+# EXTERNAL HASHED ASSETS
+# ============================================================
+
+_ASSET_EXT = {"image/png": "png", "image/jpeg": "jpg", "image/webp": "webp", "image/gif": "gif"}
+_ASSET_NAME_RE = re.compile(r"^[0-9a-f]{16}\.(png|jpg|webp|gif)$")
+
+
+def externalize_inline_images(html: str, assets_dir: str, base_url: str = "assets/") -> tuple[str, dict]:
+    """
+    Replace every inline image in tag attributes with a URL to a content-hashed file.
+
+    Files are named <sha256[:16]>.<ext>, so a name never changes meaning and can
+    be served with an immutable, far-future cache policy; identical headshots and
+    logos share one URL across BOV sites when base_url points at a shared CDN.
+    Hashed files from earlier builds that are no longer referenced are removed.
+    Returns (html, stats) with "files", "written" and "bytes".
+    """
+    os.makedirs(assets_dir, exist_ok=True)
+    names = {}
+    stats = {"files": 0, "written": 0, "bytes": 0}
+
+    def to_url(m):
+        uri = m.group(0)
+        if uri not in names:
+            header, b64 = uri.split(",", 1)
+            data = base64.b64decode(b64)
+            mime = header[5:].split(";", 1)[0]
+            name = f"{hashlib.sha256(data).hexdigest()[:16]}.{_ASSET_EXT.get(mime, 'bin')}"
+            path = os.path.join(assets_dir, name)
+            if not os.path.exists(path):
+                with open(path, "wb") as f:
+                    f.write(data)
+                stats["written"] += 1
+            stats["bytes"] += len(data)
+            names[uri] = name
+        return base_url + names[uri]
+
+    html = _TAG_RE.sub(lambda m: _DATA_URI_RE.sub(to_url, m.group(0)), html)
+    stats["files"] = len(set(names.values()))
+    live = set(names.values())
+    for name in os.listdir(assets_dir):
+        if _ASSET_NAME_RE.match(name) and name not in live:
+            os.remove(os.path.join(assets_dir, name))
+    return html, stats
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Live Pricing Calculator for LAAA BOV Builds
+===========================================
+Client-side twin of build_bov.py's calc_metrics(). The build embeds the deal
+assumptions as a small JSON payload plus CALCULATOR_JS, a dependency-free port
+of calc_metrics() and the closed-form amortization in amortization.py, so the
+Financials page can re-price the matrix, loan sizing and returns in the browser
+as price, interest rate and LTV sliders move, without a rebuild.
+
+parity_check() runs CALCULATOR_JS under Node.js against calc_metrics() for a
+grid of prices and slider settings and reports every metric that differs by
+more than float noise, so the browser numbers can never drift from the BOV's.
+
+Usage:
+    This module is imported by build_bov.py. It is NOT run directly.
+    The parity check needs `node` on PATH; build_bov.py skips it with a warning otherwise.
+"""
+
+import json
+import shutil
+import subprocess
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+
+# ============================================================
+# PAYLOAD
+# ============================================================
+
+# calc_metrics() inputs shipped to the browser (same names as pricing_engine.Assumptions)
+PAYLOAD_FIELDS = (
+    "tax_rate", "units", "sf", "gsr", "pf_gsr", "vacancy_pct", "other_income",
+    "non_tax_cur_exp", "non_tax_pf_exp", "interest_rate", "amortization_years",
+    "max_ltv", "min_dcr", "loan_term_years",
+)
+
+
+def calculator_payload(assumptions: dict, list_price: float, prices: list, sliders: dict) -> dict:
+    """
+    JSON payload for the page: {"a": assumptions, "list_price", "prices", "sliders"}.
+    sliders maps "price" / "interest_rate" / "max_ltv" to (min, max, step).
+    """
+    missing = [f for f in PAYLOAD_FIELDS if f not in assumptions]
+    if missing:
+        raise ValueError(f"Calculator payload missing assumptions: {', '.join(missing)}")
+    return {
+        "a": {f: assumptions[f] for f in PAYLOAD_FIELDS},
+        "list_price": list_price,
+        "prices": list(prices),
+        "sliders": {k: list(v) for k, v in sliders.items()},
+    }
+
+
+# ============================================================
+# BROWSER CALCULATOR
+# ============================================================
+
+# ES5, no dependencies. laaaCalcMetrics(price, a) returns the calc_metrics() dict.
+CALCULATOR_JS = r"""
+function laaaPaymentFactor(rate, years) {
+  var r = rate / 12, n = years * 12, g = Math.pow(1 + r, n);
+  return r > 0 ? r * g / (g - 1) : 1 / n;
+}
+function laaaBalance(loan, rate, years, month) {
+  var r = rate / 12, n = years * 12, k = Math.min(month, n), gn = Math.pow(1 + r, n);
+  return loan * (r > 0 ? (gn - Math.pow(1 + r, k)) / (gn - 1) : 1 - k / n);
+}
+function laaaCalcMetrics(price, a) {
+  var constant = laaaPaymentFactor(a.interest_rate, a.amortization_years) * 12;
+  var taxes = price * a.tax_rate;
+  var cur_egi = a.gsr * (1 - a.vacancy_pct) + a.other_income;
+  var pf_egi = a.pf_gsr * (1 - a.vacancy_pct) + a.other_income;
+  var cur_exp = a.non_tax_cur_exp + taxes, pf_exp = a.non_tax_pf_exp + taxes;
+  var cur_noi = cur_egi - cur_exp, pf_noi = pf_egi - pf_exp;
+  var ltv_max_loan = price * a.max_ltv;
+  var dcr_max_loan = constant > 0 ? cur_noi / (a.min_dcr * constant) : ltv_max_loan;
+  var loan_amount = Math.min(ltv_max_loan, dcr_max_loan);
+  var down_payment = price - loan_amount, debt_service = loan_amount * constant;
+  var net_cf_cur = cur_noi - debt_service, net_cf_pf = pf_noi - debt_service;
+  var prin_red = laaaBalance(loan_amount, a.interest_rate, a.amortization_years, 0)
+               - laaaBalance(loan_amount, a.interest_rate, a.amortization_years, 12);
+  var balance_at_term = laaaBalance(loan_amount, a.interest_rate, a.amortization_years, a.loan_term_years * 12);
+  var total_return_cur = net_cf_cur + prin_red, total_return_pf = net_cf_pf + prin_red;
+  function pct(num) { return down_payment > 0 ? num / down_payment * 100 : 0; }
+  return {
+    price: price, taxes: taxes, cur_noi: cur_noi, pf_noi: pf_noi,
+    cur_egi: cur_egi, pf_egi: pf_egi, cur_exp: cur_exp, pf_exp: pf_exp,
+    per_unit: price / a.units, per_sf: price / a.sf,
+    cur_cap: cur_noi / price * 100, pf_cap: pf_noi / price * 100,
+    grm: price / a.gsr, pf_grm: price / a.pf_gsr,
+    loan_amount: loan_amount, down_payment: down_payment,
+    actual_ltv: price > 0 ? loan_amount / price : 0,
+    loan_constraint: ltv_max_loan <= dcr_max_loan ? 'LTV' : 'DCR',
+    debt_service: debt_service, net_cf_cur: net_cf_cur, net_cf_pf: net_cf_pf,
+    coc_cur: pct(net_cf_cur), coc_pf: pct(net_cf_pf),
+    dcr_cur: debt_service > 0 ? cur_noi / debt_service : 0, dcr_pf: debt_service > 0 ? pf_noi / debt_service : 0,
+    prin_red: prin_red, total_return_cur: total_return_cur, total_return_pf: total_return_pf,
+    total_return_pct_cur: pct(total_return_cur), total_return_pct_pf: pct(total_return_pf),
+    balloon: balance_at_term, prin_red_term: loan_amount - balance_at_term
+  };
+}
+"""
+
+
+# ============================================================
+# PARITY CHECK
+# ============================================================
+
+@dataclass
+class ParityResult:
+    cases: int = 0
+    mismatches: list = field(default_factory=list)   # (price, overrides, metric, python, js)
+    skipped: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.skipped is None and not self.mismatches
+
+
+def parity_check(payload: dict, calc_metrics: Callable, cases: list, node: str = "node",
+                 timeout: int = 60) -> ParityResult:
+    """
+    Compare laaaCalcMetrics (under Node.js) with calc_metrics for every
+    (price, overrides) case; overrides are the slider assumptions, passed to
+    calc_metrics as keyword arguments. Metrics must agree to within 1e-9
+    relative (far inside a cent at BOV scale).
+    """
+    node_path = shutil.which(node)
+    if node_path is None:
+        return ParityResult(skipped=f"{node} not found")
+    script = CALCULATOR_JS + (
+        "var input = JSON.parse(require('fs').readFileSync(0, 'utf8'));\n"
+        "process.stdout.write(JSON.stringify(input.cases.map(function(c) {\n"
+        "  var a = {}; for (var k in input.a) a[k] = input.a[k]; for (var o in c[1]) a[o] = c[1][o];\n"
+        "  return laaaCalcMetrics(c[0], a);\n"
+        "})));\n"
+    )
+    stdin = json.dumps({"a": payload["a"], "cases": cases})
+    try:
+        proc = subprocess.run([node_path, "-e", script], input=stdin, capture_output=True,
+                              text=True, timeout=timeout, check=True)
+        js_results = json.loads(proc.stdout)
+    except (OSError, subprocess.SubprocessError, ValueError) as e:
+        return ParityResult(skipped=f"node run failed: {e}")
+
+    result = ParityResult(cases=len(cases))
+    for (price, overrides), js in zip(cases, js_results):
+        py = calc_metrics(price, **overrides)
+        for metric, expected in py.items():
+            actual = js.get(metric)
+            if isinstance(expected, str):
+                same = actual == expected
+            else:
+                same = isinstance(actual, (int, float)) and abs(actual - expected) <= 1e-9 * max(1.0, abs(expected))
+            if not same:
+                result.mismatches.append((price, overrides, metric, expected, actual))
+    return result
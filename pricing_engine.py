@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Pricing Engine for LAAA BOV Builds
+==================================
+Array-native version of build_bov.py's calc_metrics(). Takes a vector of prices
+(and, optionally, a vector for any assumption) and returns every pricing-matrix
+metric as a column in one NumPy pass, so dense pricing tables and sensitivity
+sweeps of tens of thousands of points cost milliseconds instead of a Python
+loop over calc_metrics().
+
+Inputs broadcast against each other with the usual NumPy rules: a (N,) price
+vector with scalar assumptions gives (N,) columns; a (N, 1) price column with a
+(M,) interest-rate vector gives (N, M) grids.
+
+Usage:
+    This module is imported by build_bov.py. It is NOT run directly.
+    Requires numpy; build_bov.py falls back to the scalar calc_metrics() without it.
+"""
+
+from dataclasses import dataclass, fields, replace
+
+import numpy as np
+
+from amortization import loan_constant, principal_reduction, balloon
+
+
+# ============================================================
+# ASSUMPTIONS
+# ============================================================
+
+@dataclass(frozen=True)
+class Assumptions:
+    """Deal assumptions for one BOV. Any field may be a scalar or an array."""
+    tax_rate: float
+    units: int
+    sf: float
+    gsr: float
+    pf_gsr: float
+    vacancy_pct: float
+    other_income: float
+    non_tax_cur_exp: float
+    non_tax_pf_exp: float
+    interest_rate: float
+    amortization_years: int
+    max_ltv: float
+    min_dcr: float
+    loan_term_years: int = 5
+
+    def with_(self, **overrides) -> "Assumptions":
+        """Copy with some assumptions replaced (e.g. interest_rate=np.linspace(...))."""
+        return replace(self, **overrides)
+
+    def arrays(self) -> dict:
+        return {f.name: np.asarray(getattr(self, f.name), dtype=float) for f in fields(self)}
+
+
+# ============================================================
+# PRICE METRICS
+# ============================================================
+
+def _safe_div(num, den, scale=1.0):
+    """num / den * scale, with 0 where den <= 0 (calc_metrics' convention)."""
+    num, den = np.broadcast_arrays(np.asarray(num, dtype=float), np.asarray(den, dtype=float))
+    out = np.zeros(num.shape)
+    np.divide(num, den, out=out, where=den > 0)
+    return out * scale
+
+
+def price_metrics(prices, assumptions: Assumptions, **overrides) -> dict:
+    """
+    Every calc_metrics() metric for each price, as {name: ndarray}.
+
+    overrides replace individual assumptions for this call, e.g.
+    price_metrics(prices[:, None], a, interest_rate=[0.055, 0.06, 0.065]).
+    """
+    a = (assumptions.with_(**overrides) if overrides else assumptions).arrays()
+    price = np.asarray(prices, dtype=float)
+
+    taxes = price * a["tax_rate"]
+    cur_egi = a["gsr"] * (1 - a["vacancy_pct"]) + a["other_income"]
+    pf_egi = a["pf_gsr"] * (1 - a["vacancy_pct"]) + a["other_income"]
+    cur_exp = a["non_tax_cur_exp"] + taxes
+    pf_exp = a["non_tax_pf_exp"] + taxes
+    cur_noi = cur_egi - cur_exp
+    pf_noi = pf_egi - pf_exp
+
+    constant = loan_constant(a["interest_rate"], a["amortization_years"])
+    ltv_max_loan = price * a["max_ltv"]
+    dcr_max_loan = np.where(constant > 0, _safe_div(cur_noi, a["min_dcr"] * constant), ltv_max_loan)
+    loan_amount = np.minimum(ltv_max_loan, dcr_max_loan)
+    down_payment = price - loan_amount
+    debt_service = loan_amount * constant
+    net_cf_cur = cur_noi - debt_service
+    net_cf_pf = pf_noi - debt_service
+    prin_red = principal_reduction(loan_amount, a["interest_rate"], a["amortization_years"], 1)
+    balance_at_term = balloon(loan_amount, a["interest_rate"], a["amortization_years"], a["loan_term_years"])
+    total_return_cur = net_cf_cur + prin_red
+    total_return_pf = net_cf_pf + prin_red
+
+    columns = {
+        "price": price, "taxes": taxes, "cur_noi": cur_noi, "pf_noi": pf_noi,
+        "cur_egi": cur_egi, "pf_egi": pf_egi, "cur_exp": cur_exp, "pf_exp": pf_exp,
+        "per_unit": price / a["units"], "per_sf": price / a["sf"],
+        "cur_cap": cur_noi / price * 100, "pf_cap": pf_noi / price * 100,
+        "grm": price / a["gsr"], "pf_grm": price / a["pf_gsr"],
+        "loan_amount": loan_amount, "down_payment": down_payment,
+        "actual_ltv": _safe_div(loan_amount, price),
+        "loan_constraint": np.where(ltv_max_loan <= dcr_max_loan, "LTV", "DCR"),
+        "debt_service": debt_service, "net_cf_cur": net_cf_cur, "net_cf_pf": net_cf_pf,
+        "coc_cur": _safe_div(net_cf_cur, down_payment, 100), "coc_pf": _safe_div(net_cf_pf, down_payment, 100),
+        "dcr_cur": _safe_div(cur_noi, debt_service), "dcr_pf": _safe_div(pf_noi, debt_service),
+        "prin_red": prin_red, "total_return_cur": total_return_cur, "total_return_pf": total_return_pf,
+        "total_return_pct_cur": _safe_div(total_return_cur, down_payment, 100),
+        "total_return_pct_pf": _safe_div(total_return_pf, down_payment, 100),
+        "balloon": balance_at_term, "prin_red_term": loan_amount - balance_at_term,
+    }
+    shape = np.broadcast_shapes(*(np.shape(v) for v in columns.values()))
+    return {k: np.broadcast_to(v, shape) for k, v in columns.items()}
+
+
+def metrics_rows(columns: dict) -> list[dict]:
+    """Columnar price_metrics() output (1-D) -> list of calc_metrics()-style dicts of Python scalars."""
+    names = list(columns)
+    lists = [np.ravel(columns[k]).tolist() for k in names]
+    return [dict(zip(names, values)) for values in zip(*lists)]
+
+
+# ============================================================
+# SENSITIVITY GRID
+# ============================================================
+
+@dataclass
+class SensitivityGrid:
+    """
+    price_metrics() evaluated over the Cartesian product of several axes.
+
+    axes maps each axis name ("price" or an Assumptions field) to its 1-D values,
+    in dimension order; every column has shape tuple(len(v) for v in axes.values()).
+    """
+    axes: dict
+    columns: dict
+
+    @property
+    def shape(self) -> tuple:
+        return tuple(len(v) for v in self.axes.values())
+
+    def index(self, axis: str, value) -> int:
+        """Position of the axis value nearest to value."""
+        return int(np.abs(self.axes[axis] - value).argmin())
+
+    def slice(self, metric: str, rows: str, cols: str, **fixed) -> np.ndarray:
+        """
+        2-D (rows x cols) slice of one metric; every other axis is pinned to the
+        value given in fixed (nearest grid point) or to its first value.
+        """
+        names = list(self.axes)
+        selector = tuple(slice(None) if n in (rows, cols) else self.index(n, fixed.get(n, self.axes[n][0]))
+                         for n in names)
+        out = self.columns[metric][selector]
+        return out.T if names.index(rows) > names.index(cols) else out
+
+    def to_table(self, metrics=None, decimals: int = 4) -> dict:
+        """
+        Compact columnar form for embedding as JSON: axis values plus one flat
+        row-major list per metric, e.g. value at (i, j, k) is metrics[m][(i*J + j)*K + k].
+        """
+        metrics = metrics or [m for m in self.columns if self.columns[m].dtype.kind == "f"]
+        return {
+            "axes": {n: np.round(v, 6).tolist() for n, v in self.axes.items()},
+            "shape": list(self.shape),
+            "metrics": {m: np.round(self.columns[m], decimals).ravel().tolist() for m in metrics},
+        }
+
+
+def sensitivity(assumptions: Assumptions, axes: dict) -> SensitivityGrid:
+    """
+    Evaluate every metric across the Cartesian product of axes, e.g.
+    sensitivity(a, {"price": prices, "interest_rate": [0.06, 0.065, 0.07], "vacancy_pct": [0.05, 0.07]}).
+
+    Each axis gets its own array dimension and values are broadcast, never
+    materialized per point before use: assumption-only terms such as the loan
+    constant are computed once per (interest_rate, amortization_years) pair
+    rather than once per grid point.
+    """
+    names = list(axes)
+    if "price" not in names:
+        raise ValueError("Sensitivity axes must include price")
+    unknown = set(names) - {"price"} - {f.name for f in fields(Assumptions)}
+    if unknown:
+        raise ValueError(f"Unknown sensitivity axes: {', '.join(sorted(unknown))}")
+    values = {n: np.asarray(axes[n], dtype=float).ravel() for n in names}
+    shaped = {}
+    for dim, n in enumerate(names):
+        shape = [1] * len(names)
+        shape[dim] = len(values[n])
+        shaped[n] = values[n].reshape(shape)
+    prices = shaped.pop("price")
+    columns = price_metrics(prices, assumptions, **shaped)
+    full = tuple(len(v) for v in values.values())
+    return SensitivityGrid(values, {k: np.broadcast_to(v, full) for k, v in columns.items()})
+
+
+# ============================================================
+# GOAL SEEK
+# ============================================================
+
+# Search intervals per solvable variable (the price, or any Assumptions field)
+GOAL_SEEK_BRACKETS = {
+    "price": (50_000, 50_000_000),
+    "gsr": (1_000, 10_000_000),
+    "pf_gsr": (1_000, 10_000_000),
+    "interest_rate": (0.0001, 0.30),
+    "vacancy_pct": (0.0, 0.99),
+    "max_ltv": (0.01, 0.99),
+    "tax_rate": (0.0, 0.10),
+}
+
+
+def goal_seek(assumptions: Assumptions, metric: str, targets, variable: str = "price", price=None,
+              bracket=None, tol: float = 1e-10, max_iter: int = 200) -> np.ndarray:
+    """
+    Value of `variable` at which price_metrics()[metric] equals each target, e.g.
+    goal_seek(a, "cur_cap", [5.5, 6.0]) -> prices, or
+    goal_seek(a, "dcr_cur", 1.30, variable="interest_rate", price=1_275_000) -> rate.
+
+    All targets are solved together by bisection on bracket (default
+    GOAL_SEEK_BRACKETS[variable]); targets the metric never reaches inside the
+    bracket, or only jumps across, come back as NaN. Metrics are in price_metrics() units (cap rates in %).
+    """
+    if variable != "price" and price is None:
+        raise ValueError(f"goal_seek over {variable} needs a fixed price")
+    lo_bound, hi_bound = bracket or GOAL_SEEK_BRACKETS[variable]
+    targets = np.asarray(targets, dtype=float)
+
+    def miss(x):
+        if variable == "price":
+            return price_metrics(x, assumptions)[metric] - targets
+        return price_metrics(price, assumptions, **{variable: x})[metric] - targets
+
+    lo = np.full(targets.shape, float(lo_bound))
+    hi = np.full(targets.shape, float(hi_bound))
+    f_lo = miss(lo)
+    valid = np.sign(f_lo) != np.sign(miss(hi))
+    for _ in range(max_iter):
+        mid = (lo + hi) / 2
+        f_mid = miss(mid)
+        left = np.sign(f_mid) == np.sign(f_lo)
+        lo = np.where(left, mid, lo)
+        f_lo = np.where(left, f_mid, f_lo)
+        hi = np.where(left, hi, mid)
+        if np.all((hi - lo) <= tol * np.maximum(1, np.abs(lo))):
+            break
+    x = (lo + hi) / 2
+    # A sign change across a jump (e.g. where NOI turns negative) is not a solution
+    hit = valid & (np.abs(miss(x)) <= 1e-6 * np.maximum(1, np.abs(targets)))
+    return np.where(hit, x, np.nan)
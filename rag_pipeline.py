@@ -267,9 +267,11 @@ def capture_build_context(build_data: dict) -> list[Document]:
         for c in build_data["sale_comps"]:
             cap_str = f"{c['cap']:.2f}%" if c.get("cap") else "n/a"
             grm_str = f"{c['grm']:.2f}" if c.get("grm") else "n/a"
+            ppu_str = f"${c['ppu']:,}" if c.get("ppu") is not None else "n/a"
+            psf_str = f"${c['psf']:.0f}" if c.get("psf") is not None else "n/a"
             sc_lines.append(
                 f"{c['num']} | {c['addr']} | {c['units']} | "
-                f"${c['price']:,} | ${c['ppu']:,} | ${c['psf']:.0f} | "
+                f"${c['price']:,} | {ppu_str} | {psf_str} | "
                 f"{cap_str} | {grm_str} | {c['date']} | {c.get('notes', '')}"
             )
         docs.append(Document(
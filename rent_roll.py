@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Rent Roll Model for LAAA BOV Builds
+===================================
+Columnar rent roll: unit, type, SF, current rent and market rent are stored as
+parallel arrays, and every aggregate the BOV shows (per-type counts and
+averages, totals, rent per SF, mark-to-market upside) is computed together in
+one grouped pass the first time any of them is read.
+
+With numpy the columns are ndarrays and the grouping is np.unique + np.bincount,
+so a 300+ unit rent roll costs the same handful of array operations as a 7-unit
+one. Without numpy the columns are plain lists and the same aggregates come
+from a single Python loop.
+
+Usage:
+    This module is imported by build_bov.py. It is NOT run directly.
+
+    roll = RentRoll.from_rows(RENT_ROLL)      # (unit, type, sf, current, market) tuples
+    roll.by_type["Studio"].avg_current
+    roll.totals.upside_pct
+"""
+
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# ============================================================
+# AGGREGATES
+# ============================================================
+
+@dataclass(frozen=True)
+class UnitGroup:
+    """Aggregates for one unit type (or the whole building). Rents are monthly."""
+    unit_type: str
+    count: int
+    sf: float
+    current: float
+    market: float
+
+    @property
+    def avg_sf(self) -> float:
+        return self.sf / self.count if self.count else 0
+
+    @property
+    def avg_current(self) -> float:
+        return self.current / self.count if self.count else 0
+
+    @property
+    def avg_market(self) -> float:
+        return self.market / self.count if self.count else 0
+
+    @property
+    def current_psf(self) -> float:
+        return self.current / self.sf if self.sf else 0
+
+    @property
+    def market_psf(self) -> float:
+        return self.market / self.sf if self.sf else 0
+
+    @property
+    def upside(self) -> float:
+        """Monthly mark-to-market upside (market less current)."""
+        return self.market - self.current
+
+    @property
+    def upside_pct(self) -> float:
+        return self.upside / self.current * 100 if self.current else 0
+
+
+# ============================================================
+# RENT ROLL
+# ============================================================
+
+class RentRoll:
+    """Array-backed rent roll; aggregates are computed once, on first use."""
+
+    def __init__(self, units, unit_types, sf, current, market):
+        lengths = {len(units), len(unit_types), len(sf), len(current), len(market)}
+        if len(lengths) > 1:
+            raise ValueError("Rent roll columns must all have the same length")
+        if np is not None:
+            self.units = np.asarray(units, dtype=str)
+            self.unit_types = np.asarray(unit_types, dtype=str)
+            self.sf = np.asarray(sf, dtype=float)
+            self.current = np.asarray(current, dtype=float)
+            self.market = np.asarray(market, dtype=float)
+        else:
+            self.units, self.unit_types = list(units), list(unit_types)
+            self.sf, self.current, self.market = (list(map(float, c)) for c in (sf, current, market))
+        self._by_type = None
+        self._totals = None
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple]) -> "RentRoll":
+        rows = list(rows)
+        return cls(*(zip(*rows) if rows else ((),) * 5))
+
+    def __len__(self) -> int:
+        return len(self.units)
+
+    def rows(self) -> Iterator[tuple]:
+        """(unit, type, sf, current, market) per unit, in rent roll order."""
+        for values in zip(*(self._tolist(c) for c in (self.units, self.unit_types, self.sf, self.current, self.market))):
+            yield values
+
+    @staticmethod
+    def _tolist(column) -> list:
+        return column.tolist() if hasattr(column, "tolist") else list(column)
+
+    # ---- per-unit columns ----
+
+    @property
+    def current_psf(self):
+        return self._per_sf(self.current)
+
+    @property
+    def market_psf(self):
+        return self._per_sf(self.market)
+
+    @property
+    def upside(self):
+        """Monthly mark-to-market upside per unit."""
+        if np is not None:
+            return self.market - self.current
+        return [m - c for c, m in zip(self.current, self.market)]
+
+    def _per_sf(self, rents):
+        if np is not None:
+            return np.divide(rents, self.sf, out=np.zeros(len(self)), where=self.sf > 0)
+        return [r / s if s > 0 else 0 for r, s in zip(rents, self.sf)]
+
+    # ---- aggregates ----
+
+    @property
+    def by_type(self) -> dict:
+        """{unit type: UnitGroup}, in order of first appearance in the rent roll."""
+        if self._by_type is None:
+            self._aggregate()
+        return self._by_type
+
+    @property
+    def totals(self) -> UnitGroup:
+        if self._totals is None:
+            self._aggregate()
+        return self._totals
+
+    def _aggregate(self):
+        if np is not None:
+            types, first, codes = np.unique(self.unit_types, return_index=True, return_inverse=True)
+            n = len(types)
+            counts = np.bincount(codes, minlength=n)
+            sums = [np.bincount(codes, weights=col, minlength=n) for col in (self.sf, self.current, self.market)]
+            order = np.argsort(first)
+            groups = [(str(types[i]), int(counts[i]), *(float(s[i]) for s in sums)) for i in order]
+        else:
+            acc = {}
+            for t, s, c, m in zip(self.unit_types, self.sf, self.current, self.market):
+                g = acc.setdefault(t, [0, 0.0, 0.0, 0.0])
+                g[0] += 1; g[1] += s; g[2] += c; g[3] += m
+            groups = [(t, *g) for t, g in acc.items()]
+        self._by_type = {g[0]: UnitGroup(*g) for g in groups}
+        self._totals = UnitGroup("Total", len(self), *(sum(g[i] for g in groups) for i in (2, 3, 4)))
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo Underwriting for LAAA BOV Builds
+============================================
+Simulates the hold period of the subject to put percentile bands around the
+point estimates in the pricing model. Each path samples market rent growth,
+unit turnover (a turned unit marks to market; the rest get the RSO allowable
+increase), vacancy, expense growth and the exit cap rate, then derives NOI,
+levered cash flow, sale proceeds and IRR.
+
+Paths are simulated in batches as (paths x units x years) NumPy arrays, and
+batches are fanned out across a process pool. Every batch draws from its own
+child of one SeedSequence, so results depend only on the seed, never on the
+number of workers.
+
+Usage:
+    This module is imported by build_bov.py. It is NOT run directly.
+    Requires numpy; build_bov.py skips the simulation without it.
+"""
+
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from amortization import loan_constant, balloon
+from dcf import irr
+
+
+# ============================================================
+# INPUTS
+# ============================================================
+
+@dataclass(frozen=True)
+class DealInputs:
+    """The deal as underwritten at the offered price."""
+    price: float
+    loan_amount: float
+    interest_rate: float
+    amortization_years: int
+    hold_years: int
+    current_rents: tuple      # monthly, one per unit (RENT_ROLL)
+    market_rents: tuple       # monthly, one per unit
+    other_income: float
+    non_tax_expenses: float   # year-1 operating expenses excluding property tax
+    tax_rate: float           # reassessed at sale price, then Prop 13 growth
+    tax_growth: float = 0.02
+    selling_costs: float = 0.03
+
+
+@dataclass(frozen=True)
+class MarketAssumptions:
+    """Distributions sampled per path (normal unless noted; sd = standard deviation)."""
+    rent_growth: float = 0.03
+    rent_growth_sd: float = 0.02
+    turnover: float = 0.15           # annual probability that a unit turns over
+    rso_increase: float = 0.03       # allowable annual increase for in-place tenants
+    vacancy: float = 0.05
+    vacancy_sd: float = 0.02
+    expense_growth: float = 0.03
+    expense_growth_sd: float = 0.01
+    exit_cap: float = 0.0575
+    exit_cap_sd: float = 0.005
+
+
+# ============================================================
+# BATCH SIMULATION
+# ============================================================
+
+def simulate_batch(deal: DealInputs, market: MarketAssumptions, paths: int, seed) -> dict:
+    """
+    Simulate `paths` hold periods. Returns {name: array} with per-year arrays of
+    shape (paths, hold_years) and per-path arrays of shape (paths,).
+    """
+    rng = np.random.default_rng(seed)
+    years = deal.hold_years + 1   # one extra year of NOI to capitalize at exit
+    current = np.asarray(deal.current_rents, dtype=float)
+    market0 = np.asarray(deal.market_rents, dtype=float)
+
+    growth = rng.normal(market.rent_growth, market.rent_growth_sd, (paths, years))
+    # Year 1 market rents are the rent roll's; growth compounds from year 2, as expenses do
+    market_index = np.cumprod(np.concatenate([np.ones((paths, 1)), 1 + growth[:, 1:]], axis=1), axis=1)
+    turned = rng.random((paths, years, len(current))) < market.turnover
+
+    # Year 1 is the rent roll as-is; from year 2 a turned unit re-leases at market and
+    # an in-place tenant gets the RSO increase, capped at market (rents never fall)
+    rents = np.empty((paths, years, len(current)))
+    rent = np.broadcast_to(current, (paths, len(current)))
+    rents[:, 0] = rent
+    for y in range(1, years):
+        market_rent = market0 * market_index[:, y, None]
+        in_place = np.maximum(np.minimum(rent * (1 + market.rso_increase), market_rent), rent)
+        rent = np.where(turned[:, y], market_rent, in_place)
+        rents[:, y] = rent
+    gsr = rents.sum(axis=2) * 12
+
+    vacancy = np.clip(rng.normal(market.vacancy, market.vacancy_sd, (paths, years)), 0, 0.25)
+    expense_growth = rng.normal(market.expense_growth, market.expense_growth_sd, (paths, years))
+    expense_index = np.cumprod(np.concatenate([np.ones((paths, 1)), 1 + expense_growth[:, 1:]], axis=1), axis=1)
+    taxes = deal.price * deal.tax_rate * (1 + deal.tax_growth) ** np.arange(years)
+    egi = gsr * (1 - vacancy) + deal.other_income
+    noi = egi - deal.non_tax_expenses * expense_index - taxes
+
+    debt_service = deal.loan_amount * loan_constant(deal.interest_rate, deal.amortization_years)
+    cash_flow = noi[:, :-1] - debt_service
+    exit_cap = np.clip(rng.normal(market.exit_cap, market.exit_cap_sd, paths), 0.02, None)
+    exit_value = noi[:, -1] / exit_cap
+    payoff = balloon(deal.loan_amount, deal.interest_rate, deal.amortization_years, deal.hold_years)
+    sale_proceeds = exit_value * (1 - deal.selling_costs) - payoff
+
+    equity = deal.price - deal.loan_amount
+    flows = np.concatenate([np.full((paths, 1), -equity), cash_flow], axis=1)
+    flows[:, -1] += sale_proceeds
+    # No IRR exists when the flows never turn positive; those total losses score -100%
+    # instead of dropping out of the percentiles
+    path_irr = irr(flows) * 100
+    path_irr = np.where(np.isnan(path_irr) & (flows.sum(axis=1) < 0), -100.0, path_irr)
+    return {
+        "noi": noi[:, :-1], "cash_flow": cash_flow, "gsr": gsr[:, :-1],
+        "coc": cash_flow / equity * 100,
+        "exit_value": exit_value, "sale_proceeds": sale_proceeds,
+        "irr": path_irr,
+        "equity_multiple": (cash_flow.sum(axis=1) + sale_proceeds) / equity,
+    }
+
+
+# ============================================================
+# PROCESS POOL DRIVER
+# ============================================================
+
+@dataclass
+class SimulationResult:
+    paths: int
+    seconds: float
+    workers: int
+    metrics: dict = field(repr=False)
+
+    @property
+    def paths_per_sec(self) -> float:
+        return self.paths / self.seconds if self.seconds > 0 else float("inf")
+
+    def percentiles(self, name: str, q=(5, 25, 50, 75, 95)) -> np.ndarray:
+        """
+        Percentiles of a metric across paths; per-year metrics give one column per year.
+        NaN paths are left out (see excluded).
+        """
+        return np.nanpercentile(self.metrics[name], q, axis=0)
+
+    def excluded(self, name: str) -> int:
+        """Paths with no value for a per-path metric (NaN), which percentiles() leaves out."""
+        return int(np.isnan(self.metrics[name]).sum())
+
+
+def _run_batch(args):
+    deal, market, paths, seed = args
+    return simulate_batch(deal, market, paths, seed)
+
+
+def _pool_context():
+    """Fork keeps workers from re-running build_bov.py's top level; without it, run serially."""
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return None
+
+
+def run_simulation(deal: DealInputs, market: MarketAssumptions = MarketAssumptions(), paths: int = 20_000,
+                   batch_size: int = 2_500, workers=None, seed: int = 0) -> SimulationResult:
+    """Simulate `paths` paths in batches, across a process pool when there is more than one batch."""
+    sizes = [batch_size] * (paths // batch_size) + ([paths % batch_size] if paths % batch_size else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(deal, market, n, s) for n, s in zip(sizes, seeds)]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    ctx = _pool_context()
+
+    start = time.perf_counter()
+    if workers > 1 and ctx is not None:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            batches = list(pool.map(_run_batch, jobs))
+    else:
+        workers = 1
+        batches = [_run_batch(job) for job in jobs]
+    metrics = {k: np.concatenate([b[k] for b in batches]) for k in batches[0]}
+    return SimulationResult(paths, time.perf_counter() - start, workers, metrics)
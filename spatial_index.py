@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Spatial Index for LAAA BOV Builds
+=================================
+Grid-bucket index over geocoded comps for radius, k-nearest and bounding-box
+queries with exact great-circle (haversine) distances in miles.
+
+Points are hashed into fixed lat/lng cells (cell_miles on a side at the
+equator, so slightly narrower east-west at LA's latitude). A query only visits
+the cells its search area overlaps and refines those candidates with
+haversine, so a radius or nearest-neighbor search over tens of thousands of
+market-wide sales touches a few dozen points rather than all of them.
+
+Usage:
+    This module is imported by build_bov.py. It is NOT run directly.
+
+    index = SpatialIndex()
+    index.add(comp, lat, lng)
+    index.within(SUBJECT_LAT, SUBJECT_LNG, 1.0)   # -> [Neighbor(miles, lat, lng, comp), ...] nearest first
+    index.nearest(SUBJECT_LAT, SUBJECT_LNG, k=5)
+"""
+
+import math
+import heapq
+from itertools import chain
+from typing import Any, Iterable, NamedTuple, Optional
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_MILES / 180
+
+
+def haversine_miles(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in miles."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    h = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(h)))
+
+
+class Neighbor(NamedTuple):
+    miles: float
+    lat: float
+    lng: float
+    item: Any
+
+
+# ============================================================
+# GRID INDEX
+# ============================================================
+
+class SpatialIndex:
+    """Points bucketed into square lat/lng cells of cell_miles (north-south)."""
+
+    def __init__(self, cell_miles: float = 0.5):
+        self.cell_deg = cell_miles / MILES_PER_DEGREE_LAT
+        self._cells = {}
+        self._count = 0
+        self._bounds = None   # occupied cells: (min row, max row, min col, max col)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _cell(self, lat: float, lng: float) -> tuple:
+        return math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg)
+
+    def add(self, item, lat: float, lng: float):
+        i, j = self._cell(lat, lng)
+        self._cells.setdefault((i, j), []).append((lat, lng, item))
+        self._count += 1
+        b = self._bounds
+        self._bounds = (i, i, j, j) if b is None else (min(b[0], i), max(b[1], i), min(b[2], j), max(b[3], j))
+
+    def extend(self, points: Iterable[tuple]):
+        """Add (item, lat, lng) triples."""
+        for item, lat, lng in points:
+            self.add(item, lat, lng)
+
+    def _span(self, lat: float, miles: float) -> tuple:
+        """Cell half-widths (rows, cols) that cover `miles` around latitude lat."""
+        dlat = miles / MILES_PER_DEGREE_LAT
+        widest = math.cos(math.radians(min(89.0, abs(lat) + dlat)))
+        return math.ceil(dlat / self.cell_deg), math.ceil(dlat / max(widest, 1e-6) / self.cell_deg)
+
+    def _scan(self, rows: range, cols: range):
+        """Points in the given cell rows x cols, clipped to the occupied area."""
+        if self._bounds is None:
+            return
+        imin, imax, jmin, jmax = self._bounds
+        for i in range(max(rows.start, imin), min(rows.stop, imax + 1)):
+            for j in range(max(cols.start, jmin), min(cols.stop, jmax + 1)):
+                yield from self._cells.get((i, j), ())
+
+    # ---- queries ----
+
+    def within(self, lat: float, lng: float, miles: float) -> list:
+        """Every point within `miles` of (lat, lng), nearest first."""
+        ci, cj = self._cell(lat, lng)
+        di, dj = self._span(lat, miles)
+        hits = []
+        for plat, plng, item in self._scan(range(ci - di, ci + di + 1), range(cj - dj, cj + dj + 1)):
+            d = haversine_miles(lat, lng, plat, plng)
+            if d <= miles:
+                hits.append(Neighbor(d, plat, plng, item))
+        hits.sort(key=lambda n: n.miles)
+        return hits
+
+    def nearest(self, lat: float, lng: float, k: int = 5, max_miles: Optional[float] = None) -> list:
+        """
+        The k points nearest (lat, lng), nearest first, optionally capped at max_miles.
+        Searches outward ring by ring and stops once no unvisited cell can beat the kth hit.
+        """
+        if k <= 0 or not self._count:
+            return []
+        ci, cj = self._cell(lat, lng)
+        cell_miles = self.cell_deg * MILES_PER_DEGREE_LAT
+        ring_limit = self._span(lat, max_miles)[1] if max_miles is not None else None
+        heap = []   # max-heap on distance via negation: the current k best
+        seen = 0
+        # Rings closer than the occupied area are empty; rings beyond it need not be visited
+        imin, imax, jmin, jmax = self._bounds
+        ring = max(0, imin - ci, ci - imax, jmin - cj, cj - jmax)
+        last_ring = max(ci - imin, imax - ci, cj - jmin, jmax - cj)
+        while True:
+            if ring == 0:
+                points = self._scan(range(ci, ci + 1), range(cj, cj + 1))
+            else:
+                inner = range(ci - ring + 1, ci + ring)
+                points = chain(self._scan(range(ci - ring, ci - ring + 1), range(cj - ring, cj + ring + 1)),
+                               self._scan(range(ci + ring, ci + ring + 1), range(cj - ring, cj + ring + 1)),
+                               self._scan(inner, range(cj - ring, cj - ring + 1)),
+                               self._scan(inner, range(cj + ring, cj + ring + 1)))
+            for plat, plng, item in points:
+                seen += 1
+                d = haversine_miles(lat, lng, plat, plng)
+                if max_miles is not None and d > max_miles:
+                    continue
+                entry = (-d, seen, Neighbor(d, plat, plng, item))
+                if len(heap) < k:
+                    heapq.heappush(heap, entry)
+                elif d < -heap[0][0]:
+                    heapq.heapreplace(heap, entry)
+            # Anything outside this ring is at least `ring` cells away east-west, which
+            # is the narrower direction: ring * cell width in miles at this latitude.
+            reach = ring * cell_miles * math.cos(math.radians(min(89.0, abs(lat) + (ring + 1) * self.cell_deg)))
+            if seen == self._count or ring >= last_ring or (len(heap) == k and reach >= -heap[0][0]):
+                break
+            if ring_limit is not None and ring > ring_limit:
+                break
+            ring += 1
+        return [n for _, _, n in sorted(heap, key=lambda e: (-e[0], e[1]))]
+
+    def in_bbox(self, south: float, west: float, north: float, east: float, lat: Optional[float] = None,
+                lng: Optional[float] = None) -> list:
+        """
+        Every point inside the box; distances are from (lat, lng), default the box
+        centre, nearest first.
+        """
+        lat = (south + north) / 2 if lat is None else lat
+        lng = (west + east) / 2 if lng is None else lng
+        (i0, j0), (i1, j1) = self._cell(south, west), self._cell(north, east)
+        hits = [Neighbor(haversine_miles(lat, lng, plat, plng), plat, plng, item)
+                for plat, plng, item in self._scan(range(i0, i1 + 1), range(j0, j1 + 1))
+                if south <= plat <= north and west <= plng <= east]
+        hits.sort(key=lambda n: n.miles)
+        return hits
@@ -0,0 +1,626 @@
+#!/usr/bin/env python3
+"""
+Static Maps for LAAA BOV Builds
+===============================
+Renders the comp maps embedded in the PDF/print version of the BOV from
+OpenStreetMap tiles, with an on-disk tile cache so rebuilding a BOV whose
+comps have not moved costs no network round-trips, and a small thread pool
+that fetches missing tiles over reused keep-alive connections. All maps of a
+build are rendered from one shared tile mosaic (StaticMapSession), each with
+its viewport fitted to its markers; finished maps are memoized (MapRenderCache)
+so an unchanged map is never redrawn. Tiles can
+instead come from a local MBTiles file or z/x/y directory (open_tile_source)
+for offline or firewalled build machines.
+
+Usage:
+    This module is imported by build_bov.py. It is NOT run directly.
+    Pillow is required for rendering; without it maps come back empty.
+"""
+
+import io
+import os
+import json
+import math
+import time
+import hashlib
+import base64
+import socket
+import threading
+import http.client
+import urllib.parse
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+OSM_TILE_URL = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+USER_AGENT = "LAAA-BOV-Builder/1.0"
+
+
+# ============================================================
+# TILE CACHE
+# ============================================================
+
+class TileCache:
+    """
+    On-disk cache of map tiles keyed by (zoom, x, y).
+
+    Tiles older than ttl_days are refetched when online (the OSM tile policy asks
+    clients to cache for at least 7 days). When the cache grows past max_bytes the
+    oldest tiles are deleted. Stale tiles are still served in offline mode or when
+    a refetch fails.
+
+    Layout: <root>/<z>/<x>/<y>.png
+    """
+
+    def __init__(self, root: str, ttl_days: float = 30, max_bytes: int = 200 * 1024 * 1024):
+        self.root = root
+        self.ttl = ttl_days * 86400
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.stale_hits = 0
+
+    def path(self, z: int, x: int, y: int) -> str:
+        return os.path.join(self.root, str(z), str(x), f"{y}.png")
+
+    def get(self, z: int, x: int, y: int, allow_stale: bool = False) -> Optional[bytes]:
+        """Return a cached tile, or None if missing (or expired unless allow_stale)."""
+        path = self.path(z, x, y)
+        try:
+            age = time.time() - os.path.getmtime(path)
+            if age > self.ttl and not allow_stale:
+                return None
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if age > self.ttl:
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+        return data
+
+    def put(self, z: int, x: int, y: int, data: bytes):
+        path = self.path(z, x, y)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"  WARNING: Could not write tile cache entry ({e})")
+
+    def evict(self):
+        """Delete the oldest tiles until the cache fits in max_bytes."""
+        tiles = []
+        total = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if not name.endswith(".png"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                tiles.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(tiles):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+# ============================================================
+# CONCURRENT TILE FETCHER
+# ============================================================
+
+class TileFetcher:
+    """
+    Fetches tiles through the cache with a bounded thread pool.
+
+    Each worker thread keeps one keep-alive HTTPS connection per host, and at most
+    max_per_host requests are in flight to any host (the OSM tile policy allows 2).
+    Connection errors, timeouts, 429 and 5xx responses are retried with
+    exponential backoff; tiles that still fail are recorded in self.missing. A host
+    that cannot be resolved, or keeps failing at the connection level, is marked
+    unreachable so the rest of its tiles fail fast instead of each waiting out
+    the retries.
+    """
+
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(self, cache: Optional[TileCache] = None, offline: bool = False,
+                 url_template: str = OSM_TILE_URL, max_per_host: int = 2,
+                 retries: int = 3, timeout: float = 10):
+        self.cache = cache
+        self.offline = offline
+        self.url_template = url_template
+        self.max_per_host = max_per_host
+        self.retries = retries
+        self.timeout = timeout
+        self.downloaded = 0
+        self.missing = []
+        self.unreachable = set()
+        self._local = threading.local()
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> str:
+        """Identifies the tile imagery for MapRenderCache keys."""
+        return self.url_template
+
+    def _slot(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_slots[host]
+
+    def _connection(self, scheme: str, host: str) -> http.client.HTTPConnection:
+        conns = self._local.__dict__.setdefault("conns", {})
+        conn = conns.get((scheme, host))
+        if conn is None:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = conns[(scheme, host)] = cls(host, timeout=self.timeout)
+        return conn
+
+    def _drop_connection(self, scheme: str, host: str):
+        conn = self._local.__dict__.get("conns", {}).pop((scheme, host), None)
+        if conn is not None:
+            conn.close()
+
+    def _download(self, z: int, x: int, y: int) -> Optional[bytes]:
+        url = urllib.parse.urlsplit(self.url_template.format(z=z, x=x, y=y))
+        path = url.path + (f"?{url.query}" if url.query else "")
+        connection_failed = False
+        for attempt in range(self.retries + 1):
+            if url.netloc in self.unreachable:
+                return None
+            if attempt:
+                time.sleep(0.5 * 2 ** (attempt - 1))
+            with self._slot(url.netloc):
+                conn = self._connection(url.scheme, url.netloc)
+                try:
+                    conn.request("GET", path, headers={"User-Agent": USER_AGENT})
+                    resp = conn.getresponse()
+                    body = resp.read()
+                except socket.gaierror:
+                    self._drop_connection(url.scheme, url.netloc)
+                    self.unreachable.add(url.netloc)
+                    return None
+                except (OSError, http.client.HTTPException):
+                    self._drop_connection(url.scheme, url.netloc)
+                    connection_failed = True
+                    continue
+            connection_failed = False
+            if resp.status == 200:
+                return body
+            if resp.status not in self.RETRY_STATUS:
+                return None
+        if connection_failed:
+            self.unreachable.add(url.netloc)
+        return None
+
+    def _fetch_one(self, tile: tuple[int, int, int]) -> Optional[bytes]:
+        z, x, y = tile
+        if self.cache:
+            data = self.cache.get(z, x, y, allow_stale=self.offline)
+            if data is not None or self.offline:
+                return data
+        elif self.offline:
+            return None
+        data = self._download(z, x, y)
+        if data is None:
+            return self.cache.get(z, x, y, allow_stale=True) if self.cache else None
+        with self._lock:
+            self.downloaded += 1
+        if self.cache:
+            self.cache.put(z, x, y, data)
+        return data
+
+    def fetch_many(self, tiles: Iterable[tuple[int, int, int]]) -> dict:
+        """Return {(z, x, y): png bytes or None} for every requested tile."""
+        tiles = list(dict.fromkeys(tiles))
+        with ThreadPoolExecutor(max_workers=max(1, self.max_per_host)) as pool:
+            results = dict(zip(tiles, pool.map(self._fetch_one, tiles)))
+        self.missing.extend(t for t, data in results.items() if data is None)
+        return results
+
+
+# ============================================================
+# LOCAL TILE SOURCES (MBTiles / z/x/y directory)
+# ============================================================
+
+class LocalTileSource(ABC):
+    """
+    Base for tile sources that read pre-rendered tiles from local disk.
+
+    Exposes the same fetch_many()/missing/downloaded/unreachable surface as
+    TileFetcher so StaticMapSession and the build report can use either; nothing
+    here touches the network, so renders are deterministic and fast.
+    """
+
+    def __init__(self):
+        self.downloaded = 0
+        self.missing = []
+        self.unreachable = set()
+        self.read = 0
+
+    @property
+    @abstractmethod
+    def version(self) -> str:
+        """Identifies the tile imagery for MapRenderCache keys; changes when the tiles do."""
+
+    @abstractmethod
+    def _read(self, z: int, x: int, y: int) -> Optional[bytes]:
+        """Image bytes for one XYZ tile, or None when the source does not have it."""
+
+    def fetch_many(self, tiles: Iterable[tuple[int, int, int]]) -> dict:
+        """Return {(z, x, y): image bytes or None} for every requested tile."""
+        results = {t: self._read(*t) for t in dict.fromkeys(tiles)}
+        self.read += sum(1 for data in results.values() if data is not None)
+        self.missing.extend(t for t, data in results.items() if data is None)
+        return results
+
+
+class DirectoryTileSource(LocalTileSource):
+    """Tiles laid out as root/z/x/y.<ext> (the layout gdal2tiles, TileCache and most tile exporters write)."""
+
+    EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+    def __init__(self, root: str):
+        super().__init__()
+        self.root = root
+        self._version = None
+
+    @property
+    def version(self) -> str:
+        """
+        Newest mtime and file count over the whole z/x/y tree (a directory's own
+        mtime only changes when its direct entries do), so adding, replacing or
+        removing any tile invalidates rendered maps. Computed once per source.
+        """
+        if self._version is None:
+            newest, count = os.stat(self.root).st_mtime_ns, 0
+            stack = [self.root]
+            while stack:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        st = entry.stat()
+                        newest = max(newest, st.st_mtime_ns)
+                        if entry.is_dir():
+                            stack.append(entry.path)
+                        else:
+                            count += 1
+            self._version = f"dir:{os.path.abspath(self.root)}:{newest}:{count}"
+        return self._version
+
+    def _read(self, z: int, x: int, y: int) -> Optional[bytes]:
+        base = os.path.join(self.root, str(z), str(x), str(y))
+        for ext in self.EXTENSIONS:
+            try:
+                with open(base + ext, "rb") as f:
+                    return f.read()
+            except OSError:
+                continue
+        return None
+
+
+class MBTilesSource(LocalTileSource):
+    """
+    Tiles from an MBTiles file (SQLite, tiles(zoom_level, tile_column, tile_row, tile_data)).
+
+    MBTiles stores rows in TMS order, so the XYZ y is flipped on lookup. The file
+    is opened read-only.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        import sqlite3
+        self.path = path
+        self._conn = sqlite3.connect(f"file:{urllib.parse.quote(os.path.abspath(path))}?mode=ro", uri=True)
+
+    @property
+    def version(self) -> str:
+        st = os.stat(self.path)
+        return f"mbtiles:{os.path.abspath(self.path)}:{st.st_mtime_ns}:{st.st_size}"
+
+    def _read(self, z: int, x: int, y: int) -> Optional[bytes]:
+        row = self._conn.execute(
+            "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+            (z, x, (1 << z) - 1 - y),
+        ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def close(self):
+        self._conn.close()
+
+
+def open_tile_source(spec: str = "", cache: Optional[TileCache] = None, offline: bool = False):
+    """
+    Build the tile source named by spec:
+      ""/"osm"                 - OpenStreetMap through the tile cache (TileFetcher)
+      "https://.../{z}/{x}/{y}" - another XYZ tile server through the tile cache
+      "path/to/file.mbtiles"   - local MBTiles file, no network
+      "path/to/tiles/"         - local z/x/y directory tree, no network
+    """
+    if not spec or spec == "osm":
+        return TileFetcher(cache, offline=offline)
+    if spec.startswith(("http://", "https://")):
+        return TileFetcher(cache, offline=offline, url_template=spec)
+    if spec.endswith(".mbtiles"):
+        if not os.path.isfile(spec):
+            raise FileNotFoundError(f"MBTiles file not found: {spec}")
+        return MBTilesSource(spec)
+    if os.path.isdir(spec):
+        return DirectoryTileSource(spec)
+    raise FileNotFoundError(f"Tile source not found (expected osm, a URL template, .mbtiles or a directory): {spec}")
+
+
+# ============================================================
+# STATIC MAP GENERATOR (for PDF print)
+# ============================================================
+
+RENDER_VERSION = 2   # bump when marker styling or viewport fitting changes; invalidates MapRenderCache
+
+
+def _world_pixel(lat: float, lng: float, z: int) -> tuple[float, float]:
+    """Web Mercator pixel coordinates of a point at zoom z (256px tiles)."""
+    n = 2 ** z
+    lat_rad = math.radians(lat)
+    x = (lng + 180) / 360 * n * 256
+    y = (1 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2 * n * 256
+    return x, y
+
+
+def fit_viewport(points, width: int, height: int, padding: int = 32,
+                 min_zoom: int = 1, max_zoom: int = 16) -> tuple[int, int, int]:
+    """
+    Choose the highest zoom at which every (lat, lng) point fits inside a
+    width x height canvas with padding pixels to spare on each side.
+    Returns (zoom, origin_x, origin_y): the canvas's top-left in world pixels.
+    """
+    world = [_world_pixel(lat, lng, 0) for lat, lng in points]
+    min_x, max_x = min(p[0] for p in world), max(p[0] for p in world)
+    min_y, max_y = min(p[1] for p in world), max(p[1] for p in world)
+    zoom = min_zoom
+    for z in range(max_zoom, min_zoom - 1, -1):
+        scale = 2 ** z
+        if (max_x - min_x) * scale + 2 * padding <= width and (max_y - min_y) * scale + 2 * padding <= height:
+            zoom = z
+            break
+    scale = 2 ** zoom
+    origin_x = round((min_x + max_x) / 2 * scale - width / 2)
+    origin_y = round((min_y + max_y) / 2 * scale - height / 2)
+    return zoom, origin_x, origin_y
+
+
+def _viewport_tiles(zoom: int, origin_x: int, origin_y: int, width: int, height: int) -> list:
+    """The minimal set of tiles covering a canvas (x wraps around the antimeridian; y is clamped)."""
+    n = 2 ** zoom
+    return [(zoom, tx % n, ty)
+            for tx in range(origin_x // 256, (origin_x + width - 1) // 256 + 1)
+            for ty in range(max(0, origin_y // 256), min(n - 1, (origin_y + height - 1) // 256) + 1)]
+
+
+# ============================================================
+# RENDERED MAP MEMO
+# ============================================================
+
+class MapRenderCache:
+    """
+    Finished static map PNGs keyed by everything that determines their pixels:
+    markers, subject, canvas size, zoom/padding, tile-source version and
+    RENDER_VERSION. A hit skips tile fetching, decoding and drawing entirely.
+
+    Only maps rendered with every tile present are stored, so a map with gray
+    gaps is retried on the next build. Entries expire after ttl_days, matching
+    the tile cache, so refreshed tiles eventually reach the maps.
+
+    Layout: <root>/<sha256 key>.png
+    """
+
+    def __init__(self, root: str, ttl_days: float = 30):
+        self.root = root
+        self.ttl = ttl_days * 86400
+        self.hits = 0
+
+    @staticmethod
+    def key(*parts) -> str:
+        return hashlib.sha256(json.dumps([RENDER_VERSION, *parts], sort_keys=True).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = os.path.join(self.root, f"{key}.png")
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes):
+        path = os.path.join(self.root, f"{key}.png")
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"  WARNING: Could not write rendered map cache entry ({e})")
+
+    def evict(self):
+        """Delete expired entries."""
+        if not os.path.isdir(self.root):
+            return
+        now = time.time()
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                if now - os.path.getmtime(path) > self.ttl:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+# ============================================================
+# STATIC MAP GENERATOR (for PDF print)
+# ============================================================
+
+@dataclass
+class _MapPlan:
+    markers: list
+    subject_coords: tuple
+    zoom: int
+    origin_x: int
+    origin_y: int
+    tiles: list
+    memo_key: str = ""
+
+
+class StaticMapSession:
+    """
+    Renders several static maps from shared tile mosaics.
+
+    add() fits each map's viewport to its markers (or uses a fixed zoom);
+    render_all() returns memoized PNGs where inputs are unchanged, fetches the
+    union of the tiles the remaining maps need once from the fetcher (a
+    TileFetcher or LocalTileSource), decodes each tile once into one mosaic per
+    zoom level, then crops and annotates every map from it.
+    """
+
+    def __init__(self, fetcher=None, width: int = 800, height: int = 400, zoom: Optional[int] = None,
+                 padding: int = 32, memo: Optional[MapRenderCache] = None):
+        self.fetcher = fetcher or TileFetcher()
+        self.width = width
+        self.height = height
+        self.zoom = zoom
+        self.padding = padding
+        self.memo = memo
+        self._plans = {}
+        self.tiles_decoded = 0
+        self.rendered = 0
+
+    def add(self, name: str, markers, subject_coords):
+        """Plan a map showing the subject and all of its (num, lat, lng) markers."""
+        markers = [tuple(m) for m in markers]
+        points = [tuple(subject_coords)] + [(m[1], m[2]) for m in markers]
+        if self.zoom is None:
+            zoom, origin_x, origin_y = fit_viewport(points, self.width, self.height, self.padding)
+        else:
+            zoom, origin_x, origin_y = fit_viewport(points, self.width, self.height, self.padding,
+                                                    min_zoom=self.zoom, max_zoom=self.zoom)
+        tiles = _viewport_tiles(zoom, origin_x, origin_y, self.width, self.height)
+        memo_key = MapRenderCache.key(markers, list(subject_coords), self.width, self.height,
+                                      self.zoom, self.padding, getattr(self.fetcher, "version", ""))
+        self._plans[name] = _MapPlan(markers, tuple(subject_coords), zoom, origin_x, origin_y, tiles, memo_key)
+
+    def _build_mosaic(self, Image, plans):
+        """Fetch the union of the plans' tiles and paste each one once into a shared image per zoom."""
+        needed = sorted({t for plan in plans for t in plan.tiles})
+        fetched = self.fetcher.fetch_many(needed)
+        mosaics = {}
+        pasted = set()
+        for zoom in sorted({t[0] for t in needed}):
+            level = [t for t in needed if t[0] == zoom]
+            x0 = min(t[1] for t in level)
+            y0 = min(t[2] for t in level)
+            x1 = max(t[1] for t in level)
+            y1 = max(t[2] for t in level)
+            mosaic = Image.new("RGB", ((x1 - x0 + 1) * 256, (y1 - y0 + 1) * 256), (240, 240, 240))
+            for tile in level:
+                tile_data = fetched.get(tile)
+                if tile_data is None:
+                    continue
+                try:
+                    tile_img = Image.open(io.BytesIO(tile_data))
+                    mosaic.paste(tile_img, ((tile[1] - x0) * 256, (tile[2] - y0) * 256))
+                    self.tiles_decoded += 1
+                    pasted.add(tile)
+                except Exception:
+                    pass
+            mosaics[zoom] = (mosaic, x0 * 256, y0 * 256)
+        return mosaics, pasted
+
+    def _annotate(self, canvas, plan: _MapPlan, ImageDraw):
+        draw = ImageDraw.Draw(canvas)
+        r = 13
+
+        def to_pixel(lat, lng):
+            wx, wy = _world_pixel(lat, lng, plan.zoom)
+            return int(wx - plan.origin_x), int(wy - plan.origin_y)
+
+        for num, lat, lng in plan.markers:
+            px, py = to_pixel(lat, lng)
+            if 0 <= px < self.width and 0 <= py < self.height:
+                draw.ellipse([px - r, py - r, px + r, py + r], fill="#1B3A5C", outline="#fff", width=2)
+                label = str(num)
+                bbox = draw.textbbox((0, 0), label)
+                tw, th = bbox[2] - bbox[0], bbox[3] - bbox[1]
+                draw.text((px - tw // 2, py - th // 2 - 1), label, fill="#fff")
+
+        sx, sy = to_pixel(*plan.subject_coords)
+        if 0 <= sx < self.width and 0 <= sy < self.height:
+            draw.ellipse([sx - r, sy - r, sx + r, sy + r], fill="#C5A258", outline="#fff", width=2)
+            draw.text((sx - 2, sy - 6), "S", fill="#fff")
+
+    def render_all(self) -> dict:
+        """Return {name: PNG data URI or empty string} for every planned map."""
+        def data_uri(png):
+            return f"data:image/png;base64,{base64.b64encode(png).decode('ascii')}"
+
+        maps = {}
+        todo = {}
+        for name, plan in self._plans.items():
+            cached = self.memo.get(plan.memo_key) if self.memo else None
+            if cached is not None:
+                maps[name] = data_uri(cached)
+            else:
+                todo[name] = plan
+        if not todo:
+            return maps
+        try:
+            from PIL import Image, ImageDraw
+        except ImportError:
+            print("WARNING: Pillow not installed. Static maps for PDF will be empty. Install with: pip install Pillow")
+            return {**maps, **{name: "" for name in todo}}
+        try:
+            mosaics, pasted = self._build_mosaic(Image, todo.values())
+        except Exception as e:
+            print(f"WARNING: Static map generation failed: {e}")
+            return {**maps, **{name: "" for name in todo}}
+        for name, plan in todo.items():
+            try:
+                mosaic, mosaic_x, mosaic_y = mosaics[plan.zoom]
+                left, top = plan.origin_x - mosaic_x, plan.origin_y - mosaic_y
+                canvas = mosaic.crop((left, top, left + self.width, top + self.height))
+                self._annotate(canvas, plan, ImageDraw)
+                buf = io.BytesIO()
+                canvas.save(buf, format="PNG", optimize=True)
+                png = buf.getvalue()
+                self.rendered += 1
+                if self.memo and pasted.issuperset(plan.tiles):
+                    self.memo.put(plan.memo_key, png)
+                maps[name] = data_uri(png)
+            except Exception as e:
+                print(f"WARNING: Static map generation failed ({name}): {e}")
+                maps[name] = ""
+        return {name: maps[name] for name in self._plans}
+
+
+def generate_static_map(markers, subject_coords, width=800, height=400, zoom=None, fetcher=None, memo=None):
+    """Generate a single static map PNG using OSM tiles + Pillow. Returns base64 or empty string."""
+    session = StaticMapSession(fetcher, width, height, zoom, memo=memo)
+    session.add("map", markers, subject_coords)
+    return session.render_all().get("map", "")